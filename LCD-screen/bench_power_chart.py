@@ -0,0 +1,98 @@
+import argparse
+import statistics
+import time
+import tkinter as tk
+
+import numpy as np
+
+from power_chart import DEFAULT_WINDOW_S, PowerChart, StreamingLTTB
+
+WIDTH = 760
+HEIGHT = 140
+
+def synthetic_power(start, seconds):
+    """One sample per second of a noisy bell-shaped solar day with passing clouds."""
+    rng = np.random.default_rng(0)
+    timestamps = start + np.arange(seconds, dtype=float)
+    phase = np.linspace(0, np.pi, seconds)
+    clouds = np.where(rng.random(seconds) < 0.02, 0.3, 1.0)
+    watts = 90 * np.sin(phase) ** 1.5 * clouds + rng.normal(0, 1.5, seconds)
+    return timestamps, np.clip(watts, 0, None)
+
+def time_decimation(timestamps, watts, bucket_s):
+    batch = StreamingLTTB(bucket_s)
+    t = time.perf_counter()
+    batch_points = batch.add(timestamps, watts)
+    batch_ms = (time.perf_counter() - t) * 1000
+
+    streaming = StreamingLTTB(bucket_s)
+    t = time.perf_counter()
+    streaming_points = []
+    for timestamp, value in zip(timestamps.tolist(), watts.tolist()):
+        streaming_points += streaming.add([timestamp], [value])
+    per_sample_us = (time.perf_counter() - t) / len(timestamps) * 1e6
+
+    print(f"Decimating {len(timestamps):,} samples to {len(batch_points)} points: {batch_ms:.1f} ms as one array, "
+          f"{per_sample_us:.1f} us per sample one at a time (same points: {batch_points == streaming_points})")
+    kept = np.array([value for _, _, value in batch_points])
+    print(f"  peak kept: {kept.max():.1f} W of {watts.max():.1f} W, cloud dips kept: "
+          f"{(kept < 40).sum()} points under 40 W")
+
+def time_frames(root, timestamps, watts, frames):
+    """Median and worst frame time for the full-redraw baseline and the incremental chart, one new sample per frame."""
+    history = len(timestamps) - frames
+    now = [timestamps[history - 1]]
+
+    # Baseline: delete and redraw every raw sample in the window each frame
+    canvas = tk.Canvas(root, width=WIDTH, height=HEIGHT)
+    canvas.pack()
+    seconds_per_pixel = DEFAULT_WINDOW_S / WIDTH
+    baseline = []
+    for i in range(frames):
+        t = time.perf_counter()
+        end = history + i
+        window = slice(max(0, end - DEFAULT_WINDOW_S), end)
+        xs = WIDTH - 1 - (timestamps[end - 1] - timestamps[window]) / seconds_per_pixel
+        ys = HEIGHT - 1 - watts[window] / 100 * (HEIGHT - 2)
+        canvas.delete("all")
+        canvas.create_line(*np.column_stack([xs, ys]).ravel().tolist(), fill='lime green')
+        root.update_idletasks()
+        baseline.append((time.perf_counter() - t) * 1000)
+    canvas.destroy()
+
+    chart = PowerChart(root, width=WIDTH, height=HEIGHT, clock=lambda: now[0])
+    chart.pack()
+    chart.add_samples(timestamps[:history], watts[:history])
+    chart.refresh()
+    incremental = []
+    for i in range(frames):
+        now[0] = timestamps[history + i]
+        t = time.perf_counter()
+        chart.add_samples(timestamps[history + i:history + i + 1], watts[history + i:history + i + 1])
+        chart.refresh()
+        root.update_idletasks()
+        incremental.append((time.perf_counter() - t) * 1000)
+    items = len(chart.canvas.find_all())
+
+    print(f"Frame time over {frames} frames ({DEFAULT_WINDOW_S // 3600} h window, {WIDTH} px):")
+    print(f"  full redraw:  median {statistics.median(baseline):.2f} ms, max {max(baseline):.2f} ms")
+    print(f"  incremental:  median {statistics.median(incremental):.3f} ms, max {max(incremental):.2f} ms "
+          f"({items} canvas items)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Power chart decimation and frame-time benchmark")
+    parser.add_argument("--frames", type=int, default=600)
+    args = parser.parse_args()
+    start = 1750000000.0 - 1750000000.0 % 86400
+    timestamps, watts = synthetic_power(start, 86400)
+    time_decimation(timestamps, watts, round(DEFAULT_WINDOW_S / WIDTH))
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"No display ({e}), skipping the canvas frame-time comparison")
+        return
+    time_frames(root, timestamps, watts, args.frames)
+    root.destroy()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import tkinter as tk
+
+# Fixed site so the benchmark never needs the network (set before touch_ui imports site_location)
+os.environ.setdefault("CAPSTONE_LATITUDE", "33.97")
+os.environ.setdefault("CAPSTONE_LONGITUDE", "-118.42")
+
+from touch_ui import REFRESH_MS, LiveDataPanel  # also puts the Pi scripts on sys.path
+from live_feed import LiveFeedReader, LiveFeedWriter
+from power_chart import PowerChart
+from site_location import SiteLocationStore
+
+class HeadlessLabel:
+    """Stands in for a tk.Label when there is no display: config() only stores the text."""
+
+    def __init__(self):
+        self.text = None
+
+    def config(self, text):
+        self.text = text
+
+def publish(path, rate_hz, seconds):
+    """The acquisition side: a separate process publishing a sample every 1/rate_hz seconds."""
+    writer = LiveFeedWriter(path)
+    end = time.monotonic() + seconds
+    i = 0
+    while time.monotonic() < end:
+        writer.publish(time.time(), {"load_voltage": 12.0, "solar_voltage": 18.0 + (i % 7) * 0.05,
+                                     "load_current": 0.5, "solar_current": 2.0 + (i % 5) * 0.01},
+                       {"solar": 1500.0 + i * 10.0, "load": 400.0 + i})
+        i += 1
+        time.sleep(1 / rate_hz)
+    writer.close()
+
+class CountingLabel:
+    """Wraps a label to count how often the panel reconfigures it."""
+
+    redraws = 0
+
+    def __init__(self, label):
+        self.label = label
+
+    def config(self, text):
+        CountingLabel.redraws += 1
+        self.label.config(text=text)
+
+def main():
+    parser = argparse.ArgumentParser(description="UI-side CPU of the touch UI's live feed polling at 10 Hz")
+    parser.add_argument("--seconds", type=float, default=20.0, help="length of the paced run")
+    parser.add_argument("--rate", type=float, default=1.0, help="samples per second published by the logger")
+    args = parser.parse_args()
+    names = ("time", "latitude", "longitude", "energy", "voltage", "current", "power")
+    try:
+        root = tk.Tk()
+        labels = {name: tk.Label(root) for name in names}
+        for label in labels.values():
+            label.pack()
+        power_chart = PowerChart(root, width=760, height=140)
+        power_chart.pack()
+        mode = "Tk labels and power chart"
+    except tk.TclError:
+        root = None
+        labels = {name: HeadlessLabel() for name in names}
+        power_chart = None
+        mode = "headless labels, no chart (no display)"
+    labels = {name: CountingLabel(label) for name, label in labels.items()}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "live_feed")
+        LiveFeedWriter(path).close()  # create the file before the reader opens it
+        writer = multiprocessing.Process(target=publish, args=(path, args.rate, args.seconds + 2))
+        writer.start()
+        try:
+            panel = LiveDataPanel(labels, LiveFeedReader(path), SiteLocationStore(), power_chart)
+            time.sleep(0.5)
+
+            # Cost of one poll, back to back
+            count = 2000
+            cpu = time.process_time()
+            for _ in range(count):
+                panel.poll()
+            per_poll_us = (time.process_time() - cpu) / count * 1e6
+
+            # Paced at REFRESH_MS for the whole run, as the Tk main loop would call it
+            panel.polls = CountingLabel.redraws = 0
+            charted = 0
+            worst_ms = 0.0
+            cpu, wall = time.process_time(), time.monotonic()
+            next_poll = wall
+            while time.monotonic() - wall < args.seconds:
+                last_charted = panel.last_charted
+                start = time.perf_counter()
+                panel.poll()
+                if panel.last_charted != last_charted:
+                    charted += 1
+                if root is not None:
+                    root.update()
+                worst_ms = max(worst_ms, (time.perf_counter() - start) * 1000)
+                next_poll += REFRESH_MS / 1000
+                time.sleep(max(0.0, next_poll - time.monotonic()))
+            cpu_s, wall_s = time.process_time() - cpu, time.monotonic() - wall
+        finally:
+            writer.join()
+
+    print(f"UI side, {mode}, logger publishing at {args.rate:g} Hz in another process:")
+    print(f"  one poll (touch_ui.LiveDataPanel.poll):  {per_poll_us:6.1f} µs CPU")
+    print(f"  paced at {1000 // REFRESH_MS} Hz for {wall_s:.0f} s:  {cpu_s / wall_s * 100:6.2f}% CPU, "
+          f"{panel.polls} polls, worst {worst_ms:.2f} ms, {CountingLabel.redraws} label redraws"
+          + (f", {charted} polls with new chart samples" if power_chart is not None else ""))
+    if root is not None:
+        root.destroy()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import datetime
+import math
+import time
+import tkinter as tk
+from collections import deque
+
+DEFAULT_WINDOW_S = 12 * 3600  # Time span shown across the chart
+PANEL_RATED_W = 100.0  # Panel power at 1000 W/m² (sets the initial y scale of the predicted curve)
+GAP_BUCKETS = 3  # Measured points further apart than this many pixels are not joined (logger was down)
+SOLAR_CONSTANT = 1353.0  # W/m² above the atmosphere
+
+def lttb_select(previous, xs, ys, next_point):
+    """
+    Picks the sample of one bucket that Largest-Triangle-Three-Buckets keeps.
+
+    Args:
+        previous: (x, y) of the point kept for the bucket before.
+        xs, ys: The bucket's samples (NumPy arrays, at least one sample).
+        next_point: (x, y) reference for the bucket after.
+
+    Returns:
+        Index into xs/ys of the sample forming the largest triangle with previous and next_point.
+    """
+    import numpy as np
+
+    if previous is None:
+        return int(np.argmax(ys))
+    ax, ay = previous
+    cx, cy = next_point
+    areas = np.abs((ax - cx) * (ys - ay) - (ax - xs) * (cy - ay))
+    return int(np.argmax(areas))
+
+class StreamingLTTB:
+    """
+    Reduces a time series to at most one point per fixed time bucket (one bucket per pixel).
+
+    Buckets are aligned to multiples of bucket_s, so they never move as the chart scrolls. A
+    bucket is decided once a sample arrives in a later bucket: the kept sample is the one making
+    the largest triangle with the previously kept point and that first later sample. Samples can
+    be added one at a time or in arrays (e.g. a day read back from the logs) with the same result.
+    """
+
+    def __init__(self, bucket_s):
+        self.bucket_s = bucket_s
+        self.previous = None  # (timestamp, value) of the last kept point
+        self.open_bucket = None
+        self.open_times = []
+        self.open_values = []
+
+    def bucket_of(self, timestamp):
+        return int(timestamp // self.bucket_s)
+
+    def add(self, timestamps, values):
+        """
+        Adds samples in time order. NaN values (failed reads) are skipped.
+
+        Returns:
+            List of (bucket, timestamp, value) for the buckets decided by these samples.
+        """
+        import numpy as np
+
+        timestamps = np.asarray(timestamps, dtype=float)
+        values = np.asarray(values, dtype=float)
+        keep = ~np.isnan(values)
+        timestamps, values = timestamps[keep], values[keep]
+        if not len(timestamps):
+            return []
+        buckets = np.floor_divide(timestamps, self.bucket_s).astype(np.int64)
+        # Start of each run of samples in the same bucket
+        starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+        ends = np.append(starts[1:], len(buckets))
+        decided = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            bucket = int(buckets[start])
+            if bucket == self.open_bucket:
+                self.open_times.extend(timestamps[start:end].tolist())
+                self.open_values.extend(values[start:end].tolist())
+                continue
+            if self.open_bucket is not None and bucket > self.open_bucket:
+                decided.append(self._close((timestamps[start], values[start])))
+            elif self.open_bucket is not None:
+                continue  # older than the open bucket
+            self.open_bucket = bucket
+            self.open_times = timestamps[start:end].tolist()
+            self.open_values = values[start:end].tolist()
+        return decided
+
+    def _close(self, next_point):
+        import numpy as np
+
+        xs = np.array(self.open_times)
+        ys = np.array(self.open_values)
+        i = lttb_select(self.previous, xs, ys, next_point)
+        self.previous = (self.open_times[i], self.open_values[i])
+        return self.open_bucket, self.open_times[i], self.open_values[i]
+
+    def latest(self):
+        """Returns (timestamp, value) of the newest sample not yet decided, or None."""
+        if not self.open_times:
+            return None
+        return self.open_times[-1], self.open_values[-1]
+
+def clear_sky_power(altitude, rated_w=PANEL_RATED_W):
+    """
+    Predicted panel power (W) for a sun altitude (degrees), assuming a clear sky and a panel facing the sun.
+
+    Direct irradiance uses the Meinel air mass model, I = 1353 * 0.7^(AM^0.678).
+    """
+    if altitude <= 0:
+        return 0.0
+    air_mass = 1 / math.sin(math.radians(altitude))
+    return rated_w * SOLAR_CONSTANT * 0.7 ** (air_mass ** 0.678) / 1000
+
+class PowerChart:
+    """
+    Scrolling power chart on a Tk Canvas: measured power against the sun-path prediction.
+
+    Each pixel column is one time bucket. Every decided bucket adds one short line segment, and
+    when time moves into a new bucket all plotted items are shifted left with a single
+    canvas.move() and the segments that scrolled off are deleted, so the work per update does
+    not grow with the number of samples or points on screen. The y axis only ever grows, by
+    scaling the existing items.
+    """
+
+    def __init__(self, parent, width=760, height=160, window_s=DEFAULT_WINDOW_S, sun_path=None,
+                 rated_w=PANEL_RATED_W, clock=None):
+        self.width = width
+        self.height = height
+        self.bucket_s = max(1, round(window_s / width))
+        self.sun_path = sun_path
+        self.rated_w = rated_w
+        self.clock = clock or time.time
+        self.y_max = rated_w * 1.1
+        self.decimator = StreamingLTTB(self.bucket_s)
+        self.canvas = tk.Canvas(parent, width=width, height=height, bg='black', highlightthickness=0)
+        self.canvas.create_line(0, height - 1, width, height - 1, fill='gray40')
+        self.scale_label = self.canvas.create_text(4, 2, anchor=tk.NW, fill='gray60', font=('Arial', 12),
+                                                   text=self._scale_text())
+        self.canvas.create_text(width - 4, 2, anchor=tk.NE, fill='orange', font=('Arial', 12), text="predicted")
+        self.canvas.create_text(width - 84, 2, anchor=tk.NE, fill='lime green', font=('Arial', 12), text="measured")
+        self.right_bucket = None  # bucket drawn at the right edge
+        self.measured = deque()  # (bucket, item) per segment, oldest first
+        self.predicted = deque()
+        self.last_point = None  # (bucket, value) of the last measured point drawn
+        self.last_predicted = None
+        # Segment from the last decided point to the newest sample, moved every frame
+        self.tail = self.canvas.create_line(0, 0, 0, 0, fill='lime green', state=tk.HIDDEN)
+
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+
+    def _scale_text(self):
+        return f"{self.y_max:.0f} W"
+
+    def _x(self, bucket):
+        return self.width - 1 - (self.right_bucket - bucket)
+
+    def _y(self, value):
+        return self.height - 1 - min(max(value, 0.0), self.y_max) / self.y_max * (self.height - 2)
+
+    def _grow(self, value):
+        """Raises the y scale to fit value, scaling the existing lines instead of redrawing them."""
+        if value <= self.y_max:
+            return
+        new_max = value * 1.1
+        self.canvas.scale("plot", 0, self.height - 1, 1, self.y_max / new_max)
+        self.y_max = new_max
+        self.canvas.itemconfigure(self.scale_label, text=self._scale_text())
+
+    def _scroll_to(self, bucket):
+        if self.right_bucket is None:
+            self.right_bucket = bucket
+            return
+        shift = bucket - self.right_bucket
+        if shift <= 0:
+            return
+        self.right_bucket = bucket
+        self.canvas.move("plot", -shift, 0)
+        first_visible = bucket - self.width
+        for segments in (self.measured, self.predicted):
+            while segments and segments[0][0] < first_visible:
+                self.canvas.delete(segments.popleft()[1])
+        self._extend_prediction()
+
+    def _extend_prediction(self):
+        """
+        Adds predicted segments up to the right edge. Stops at the first bucket whose day's sun
+        path table is not ready yet; it is built off the UI thread and picked up on a later frame.
+        """
+        if self.sun_path is None:
+            return
+        first = self.right_bucket - self.width
+        bucket = first if self.last_predicted is None else max(first, self.last_predicted[0] + 1)
+        while bucket <= self.right_bucket:
+            middle = datetime.datetime.fromtimestamp((bucket + 0.5) * self.bucket_s)
+            position = self.sun_path.lookup_nowait(middle)
+            if position is None:
+                return
+            value = clear_sky_power(position[0], self.rated_w)
+            self._grow(value)
+            if self.last_predicted is not None and self.last_predicted[0] == bucket - 1:
+                item = self.canvas.create_line(self._x(bucket - 1), self._y(self.last_predicted[1]),
+                                               self._x(bucket), self._y(value), fill='orange', tags="plot")
+                self.predicted.append((bucket, item))
+            self.last_predicted = (bucket, value)
+            bucket += 1
+
+    def add_samples(self, timestamps, watts):
+        """Adds measured power samples (in time order) and updates the chart."""
+        for bucket, _, value in self.decimator.add(timestamps, watts):
+            self._grow(value)
+            if self.right_bucket is None or bucket <= self.right_bucket - self.width:
+                self.last_point = (bucket, value)
+                continue
+            if self.last_point is not None and bucket - self.last_point[0] <= GAP_BUCKETS:
+                item = self.canvas.create_line(self._x(self.last_point[0]), self._y(self.last_point[1]),
+                                               self._x(bucket), self._y(value), fill='lime green', tags="plot")
+                self.measured.append((bucket, item))
+            self.last_point = (bucket, value)
+
+    def refresh(self):
+        """Scrolls to the current time and redraws the segment to the newest sample. Call once per frame."""
+        self._scroll_to(self.decimator.bucket_of(self.clock()))
+        if self.last_predicted is None or self.last_predicted[0] < self.right_bucket:
+            self._extend_prediction()
+        newest = self.decimator.latest()
+        if newest is not None and self.last_point is not None \
+                and self.decimator.bucket_of(newest[0]) - self.last_point[0] <= GAP_BUCKETS:
+            self._grow(newest[1])
+            self.canvas.coords(self.tail, self._x(self.last_point[0]), self._y(self.last_point[1]),
+                               self._x(self.decimator.bucket_of(newest[0])), self._y(newest[1]))
+            self.canvas.itemconfigure(self.tail, state=tk.NORMAL)
+        else:
+            self.canvas.itemconfigure(self.tail, state=tk.HIDDEN)
+
+    def load_history(self, query, source="solar"):
+        """Fills the chart from the logged sensor data (a log_query.LogQuery) for the visible window."""
+        now = self.clock()
+        self._scroll_to(self.decimator.bucket_of(now))
+        start = (self.right_bucket - self.width) * self.bucket_s
+        timestamps, watts = query.power(start, now, source)
+        self.add_samples(timestamps, watts)
+        self.refresh()
@@ -1,7 +1,24 @@
 import tkinter as tk
+import math
 import os
+import sys
+import time
 from datetime import datetime
 
+# Shared modules live with the Pi scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pi-and-arduino"))
+from site_location import SiteLocationStore
+from energy import load_energy_totals
+from live_feed import LiveFeedReader
+from log_query import LogQuery
+from sensor_log import DATA_DIR
+from sun_path_table import DailySunPath
+from power_chart import PowerChart
+
+REFRESH_MS = 100  # Poll the live feed at 10 Hz
+SLOW_REFRESH_POLLS = 10  # Clock, location and energy only need updating once a second
+STALE_AFTER_S = 5  # Show "--" if the logger has not published for this long
+
 def shutdown():
     os.system("sudo shutdown now")  # Emergency shutdown
 
@@ -9,164 +26,241 @@ def reset_panel():
     # Add reset panel functionality here
     pass
 
-def exit_ui():
+def exit_ui(root):
     root.attributes('-fullscreen', False)  # Exit fullscreen but maintain size
     root.geometry("800x600")  # Increased height to 600 to ensure everything fits
 
-# Create the main window
-root = tk.Tk()
-root.title("Raspberry Pi Touch UI")
-root.attributes('-fullscreen', True)  # Fullscreen for touch
-root.configure(bg='black')  # Set background to black
-
-# Make elements more touch-friendly
-button_pady = 15  # Reduced from 20 to save space
-button_padx = 40
-button_font = ('Arial', 32)
-label_font = ('Arial', 28)
-small_font = ('Arial', 20)
-
-# Top Frame (Time and Location)
-top_frame = tk.Frame(root, bg='black')
-top_frame.pack(fill=tk.X, padx=10, pady=10)
-
-# Time on left
-time_label = tk.Label(top_frame, text="--:--:--", font=label_font, fg='white', bg='black')
-time_label.pack(side=tk.LEFT, padx=20)
-
-# Location in center (latitude and longitude)
-location_frame = tk.Frame(top_frame, bg='black')
-location_frame.pack(side=tk.LEFT, expand=True)
-
-latitude_label = tk.Label(location_frame, text="Lat: --°", font=small_font, fg='white', bg='black')
-latitude_label.pack(pady=5)
-
-longitude_label = tk.Label(location_frame, text="Lon: --°", font=small_font, fg='white', bg='black')
-longitude_label.pack(pady=5)
-
-# Exit button on right (small but visible)
-exit_btn = tk.Button(
-    top_frame,
-    text="✕",  # Using a simple 'X' symbol
-    font=('Arial', 24),
-    bg='gray20',
-    fg='white',
-    command=exit_ui,
-    activebackground='gray30',
-    activeforeground='white',
-    borderwidth=3,
-    relief=tk.RAISED,
-    padx=10,
-    pady=5
-)
-exit_btn.pack(side=tk.RIGHT, padx=20)
-
-# Middle Frame (Controls and Energy)
-middle_frame = tk.Frame(root, bg='black')
-middle_frame.pack(expand=True, pady=10)  # Reduced pady from 20 to 10
-
-# Reset panel button (larger for touch)
-reset_btn = tk.Button(
-    middle_frame,
-    text="RESET PANEL TO FLAT",
-    font=button_font,
-    bg='gray20',
-    fg='white',
-    command=reset_panel,
-    activebackground='gray30',
-    activeforeground='white',
-    borderwidth=5,
-    relief=tk.RAISED,
-    padx=button_padx,
-    pady=button_pady
-)
-reset_btn.pack(pady=10)  # Reduced from 20 to 10
-
-# Emergency shutdown button (big & red)
-shutdown_btn = tk.Button(
-    middle_frame,
-    text="EMERGENCY SHUT OFF",
-    font=button_font,
-    bg='red',
-    fg='white',
-    command=shutdown,
-    activebackground='darkred',
-    activeforeground='white',
-    borderwidth=5,
-    relief=tk.RAISED,
-    padx=button_padx,
-    pady=button_pady
-)
-shutdown_btn.pack(pady=10)  # Reduced from 20 to 10
-
-# Energy generated today
-energy_label = tk.Label(
-    middle_frame,
-    text="Energy Today: 0.0 kWh",
-    font=label_font,
-    fg='white',
-    bg='black'
-)
-energy_label.pack(pady=10)  # Reduced from 20 to 10
-
-# Bottom Frame (Power metrics)
-bottom_frame = tk.Frame(root, bg='black')
-bottom_frame.pack(fill=tk.X, padx=10, pady=(0, 30))  # Added more bottom padding (30)
-
-# Make bottom metrics larger for touch
-metric_font = ('Arial', 24)
-
-# Power metrics
-power_frame = tk.Frame(bottom_frame, bg='black')
-power_frame.pack(side=tk.LEFT, expand=True)
-
-power_label = tk.Label(power_frame, text="Power: -- W", font=metric_font, fg='white', bg='black')
-power_label.pack(pady=5)  # Reduced from 10 to 5
-
-voltage_frame = tk.Frame(bottom_frame, bg='black')
-voltage_frame.pack(side=tk.LEFT, expand=True)
-
-voltage_label = tk.Label(voltage_frame, text="Voltage: -- V", font=metric_font, fg='white', bg='black')
-voltage_label.pack(pady=5)  # Reduced from 10 to 5
-
-current_frame = tk.Frame(bottom_frame, bg='black')
-current_frame.pack(side=tk.LEFT, expand=True)
-
-current_label = tk.Label(current_frame, text="Current: -- A", font=metric_font, fg='white', bg='black')
-current_label.pack(pady=5)  # Reduced from 10 to 5
-
-# Add visual feedback for touch
-def on_press(btn):
-    btn.config(relief=tk.SUNKEN)
-
-def on_release(btn):
-    btn.config(relief=tk.RAISED)
-    # Execute command after release (more natural for touch)
-    btn.invoke()
-
-# Bind touch feedback to buttons
-for btn in [reset_btn, shutdown_btn, exit_btn]:
-    btn.bind('<ButtonPress-1>', lambda e, b=btn: on_press(b))
-    btn.bind('<ButtonRelease-1>', lambda e, b=btn: on_release(b))
-
-# Update data periodically
-def update_data():
-    # Update time
-    current_time = datetime.now().strftime("%H:%M:%S")
-    time_label.config(text=current_time)
-    
-    # Simulate location data (replace with real GPS data)
-    latitude_label.config(text="Lat: 34.05°")
-    longitude_label.config(text="Lon: -118.24°")
-    
-    # Simulate power metrics (replace with real sensor data)
-    power_label.config(text="Power: 1250 W")
-    voltage_label.config(text="Voltage: 240 V")
-    current_label.config(text="Current: 5.2 A")
-    energy_label.config(text="Energy Today: 12.5 kWh")
-    
-    root.after(1000, update_data)  # Update every second
-
-update_data()  # Start updates
-root.mainloop()
+class LiveDataPanel:
+    """
+    The UI's periodic update, apart from the window so it can be run without one (bench_touch_ui.py).
+
+    poll() never blocks: the sensor values and the day's energy come from the live feed in shared
+    memory (the energy from the logger's checkpoint while the feed is stale) and the location
+    from the site location cache. Only labels whose text changed are reconfigured.
+    """
+
+    def __init__(self, labels, live_feed, site_location, power_chart=None):
+        """
+        Args:
+            labels: {"time", "latitude", "longitude", "energy", "power", "voltage", "current": tk.Label}
+        """
+        self.labels = labels
+        self.live_feed = live_feed
+        self.site_location = site_location
+        self.power_chart = power_chart
+        self.label_texts = {}  # Last text shown on each label
+        self.polls = 0
+        self.last_charted = 0.0  # Timestamp of the newest live feed sample added to the chart
+
+    def set_label(self, name, text):
+        if self.label_texts.get(name) != text:
+            self.label_texts[name] = text
+            self.labels[name].config(text=text)
+
+    def poll(self):
+        # Latest sample and the day's energy from the live feed (a shared-memory read, never waits on the sensors)
+        sample = self.live_feed.latest()
+        if sample is not None and time.time() - sample[0] > STALE_AFTER_S:
+            sample = None
+
+        if self.polls % SLOW_REFRESH_POLLS == 0:
+            # Update time
+            self.set_label("time", datetime.now().strftime("%H:%M:%S"))
+
+            # Location from the site location cache (never blocks on the network)
+            latitude, longitude = self.site_location.get()
+            if latitude is not None and longitude is not None:
+                self.set_label("latitude", f"Lat: {latitude:.2f}°")
+                self.set_label("longitude", f"Lon: {longitude:.2f}°")
+                if self.power_chart is not None and self.power_chart.sun_path is None:
+                    self.power_chart.sun_path = DailySunPath(latitude, longitude)
+
+            # Logger not publishing: fall back to its last checkpointed totals
+            if sample is None:
+                totals = load_energy_totals()
+                energy_today_kwh = totals["today"]["solar"] / 1000 if totals else 0.0
+                self.set_label("energy", f"Energy Today: {energy_today_kwh:.2f} kWh")
+        self.polls += 1
+
+        # Solar power metrics and energy today, as of the latest sample
+        voltage = current = None
+        if sample is not None:
+            _, readings, energy_today = sample
+            voltage = None if math.isnan(readings["solar_voltage"]) else readings["solar_voltage"]
+            current = None if math.isnan(readings["solar_current"]) else readings["solar_current"]
+            if not math.isnan(energy_today["solar"]):
+                self.set_label("energy", f"Energy Today: {energy_today['solar'] / 1000:.2f} kWh")
+        self.set_label("voltage", f"Voltage: {voltage:.1f} V" if voltage is not None else "Voltage: -- V")
+        self.set_label("current", f"Current: {current:.2f} A" if current is not None else "Current: -- A")
+        if voltage is not None and current is not None:
+            self.set_label("power", f"Power: {voltage * current:.0f} W")
+        else:
+            self.set_label("power", "Power: -- W")
+
+        # Append new samples to the chart (only the newest few since the last poll)
+        if self.power_chart is not None:
+            new_samples = [(ts, r) for ts, r in self.live_feed.recent(64) if ts > self.last_charted]
+            if new_samples:
+                self.last_charted = new_samples[-1][0]
+                self.power_chart.add_samples([ts for ts, _ in new_samples],
+                                             [r["solar_voltage"] * r["solar_current"] for _, r in new_samples])
+            self.power_chart.refresh()
+
+def main():
+    # Create the main window
+    root = tk.Tk()
+    root.title("Raspberry Pi Touch UI")
+    root.attributes('-fullscreen', True)  # Fullscreen for touch
+    root.configure(bg='black')  # Set background to black
+
+    # Make elements more touch-friendly
+    button_pady = 15  # Reduced from 20 to save space
+    button_padx = 40
+    button_font = ('Arial', 32)
+    label_font = ('Arial', 28)
+    small_font = ('Arial', 20)
+
+    # Top Frame (Time and Location)
+    top_frame = tk.Frame(root, bg='black')
+    top_frame.pack(fill=tk.X, padx=10, pady=10)
+
+    # Time on left
+    time_label = tk.Label(top_frame, text="--:--:--", font=label_font, fg='white', bg='black')
+    time_label.pack(side=tk.LEFT, padx=20)
+
+    # Location in center (latitude and longitude)
+    location_frame = tk.Frame(top_frame, bg='black')
+    location_frame.pack(side=tk.LEFT, expand=True)
+
+    latitude_label = tk.Label(location_frame, text="Lat: --°", font=small_font, fg='white', bg='black')
+    latitude_label.pack(pady=5)
+
+    longitude_label = tk.Label(location_frame, text="Lon: --°", font=small_font, fg='white', bg='black')
+    longitude_label.pack(pady=5)
+
+    # Exit button on right (small but visible)
+    exit_btn = tk.Button(
+        top_frame,
+        text="✕",  # Using a simple 'X' symbol
+        font=('Arial', 24),
+        bg='gray20',
+        fg='white',
+        command=lambda: exit_ui(root),
+        activebackground='gray30',
+        activeforeground='white',
+        borderwidth=3,
+        relief=tk.RAISED,
+        padx=10,
+        pady=5
+    )
+    exit_btn.pack(side=tk.RIGHT, padx=20)
+
+    # Middle Frame (Controls and Energy)
+    middle_frame = tk.Frame(root, bg='black')
+    middle_frame.pack(expand=True, pady=10)  # Reduced pady from 20 to 10
+
+    # Reset panel button (larger for touch)
+    reset_btn = tk.Button(
+        middle_frame,
+        text="RESET PANEL TO FLAT",
+        font=button_font,
+        bg='gray20',
+        fg='white',
+        command=reset_panel,
+        activebackground='gray30',
+        activeforeground='white',
+        borderwidth=5,
+        relief=tk.RAISED,
+        padx=button_padx,
+        pady=button_pady
+    )
+    reset_btn.pack(pady=10)  # Reduced from 20 to 10
+
+    # Emergency shutdown button (big & red)
+    shutdown_btn = tk.Button(
+        middle_frame,
+        text="EMERGENCY SHUT OFF",
+        font=button_font,
+        bg='red',
+        fg='white',
+        command=shutdown,
+        activebackground='darkred',
+        activeforeground='white',
+        borderwidth=5,
+        relief=tk.RAISED,
+        padx=button_padx,
+        pady=button_pady
+    )
+    shutdown_btn.pack(pady=10)  # Reduced from 20 to 10
+
+    # Energy generated today
+    energy_label = tk.Label(
+        middle_frame,
+        text="Energy Today: 0.0 kWh",
+        font=label_font,
+        fg='white',
+        bg='black'
+    )
+    energy_label.pack(pady=10)  # Reduced from 20 to 10
+
+    # Bottom Frame (Power metrics)
+    bottom_frame = tk.Frame(root, bg='black')
+    bottom_frame.pack(fill=tk.X, padx=10, pady=(0, 30))  # Added more bottom padding (30)
+
+    # Make bottom metrics larger for touch
+    metric_font = ('Arial', 24)
+
+    # Power metrics
+    power_frame = tk.Frame(bottom_frame, bg='black')
+    power_frame.pack(side=tk.LEFT, expand=True)
+
+    power_label = tk.Label(power_frame, text="Power: -- W", font=metric_font, fg='white', bg='black')
+    power_label.pack(pady=5)  # Reduced from 10 to 5
+
+    voltage_frame = tk.Frame(bottom_frame, bg='black')
+    voltage_frame.pack(side=tk.LEFT, expand=True)
+
+    voltage_label = tk.Label(voltage_frame, text="Voltage: -- V", font=metric_font, fg='white', bg='black')
+    voltage_label.pack(pady=5)  # Reduced from 10 to 5
+
+    current_frame = tk.Frame(bottom_frame, bg='black')
+    current_frame.pack(side=tk.LEFT, expand=True)
+
+    current_label = tk.Label(current_frame, text="Current: -- A", font=metric_font, fg='white', bg='black')
+    current_label.pack(pady=5)  # Reduced from 10 to 5
+
+    # Today's solar power against the sun-path prediction, above the metrics
+    power_chart = PowerChart(root, width=760, height=140)
+    power_chart.pack(after=middle_frame, pady=(0, 10))
+    power_chart.load_history(LogQuery(DATA_DIR))
+
+    # Add visual feedback for touch
+    def on_press(btn):
+        btn.config(relief=tk.SUNKEN)
+
+    def on_release(btn):
+        btn.config(relief=tk.RAISED)
+        # Execute command after release (more natural for touch)
+        btn.invoke()
+
+    # Bind touch feedback to buttons
+    for btn in [reset_btn, shutdown_btn, exit_btn]:
+        btn.bind('<ButtonPress-1>', lambda e, b=btn: on_press(b))
+        btn.bind('<ButtonRelease-1>', lambda e, b=btn: on_release(b))
+
+    # Site location from the configured coordinates or the cached last-known fix; latest samples
+    # published by sensorScript.py through shared memory
+    panel = LiveDataPanel({"time": time_label, "latitude": latitude_label, "longitude": longitude_label,
+                           "energy": energy_label, "power": power_label, "voltage": voltage_label,
+                           "current": current_label}, LiveFeedReader(), SiteLocationStore(), power_chart)
+
+    # Update data periodically
+    def update_data():
+        panel.poll()
+        root.after(REFRESH_MS, update_data)
+
+    update_data()  # Start updates
+    root.mainloop()
 
+if __name__ == "__main__":
+    main()
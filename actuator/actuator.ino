@@ -19,18 +19,45 @@ const int TCA9548A_ADDRESS = 0x70; // I2C address of TCA9548A
 const int TCA9548A_CHANNEL = 7;   // Channel 7 (SCL/SDA7)
 const int ARDUINO_I2C_ADDRESS = 0x09; // Arduino's I2C Address
 
-// Global variables for actuator state
-int currentActuator = 0;       // 0: none, 1: actuator 1, 2: actuator 2
-int currentDirection = 0;    // 0: stopped, 1: forward, -1: backward
-unsigned long moveStartTime = 0; // Time when movement started
-unsigned long moveDuration = 0;  // Duration of current movement
-bool isMoving = false;
-bool receivedCommand = false; // Flag to indicate a command was received
+// Protocol v2 (see actuator_protocol.py on the Pi). The first byte of every write is the register.
+const byte PROTOCOL_VERSION = 2;
+const byte REG_LEGACY_MOVE = 0x00; // Original frame: int actuator, float mm (big endian)
+const byte REG_MOVE = 0x10;        // version, seq, actuator mask, float mm x2 (little endian), CRC-8
+const byte REG_STATUS = 0x11;      // Read: version, seq, busy flags, error, float position x2, CRC-8
+const int LEGACY_FRAME_SIZE = 9;   // register + 8 bytes
+const int MOVE_FRAME_SIZE = 13;    // register + 12 bytes
+const int STATUS_SIZE = 13;
+
+const byte ERR_OK = 0;
+const byte ERR_BUSY = 1;
+const byte ERR_CRC = 2;
+const byte ERR_VERSION = 3;
+const byte ERR_LENGTH = 4;
+
+const int RPWM_PINS[3] = {0, RPWM_ACT1, RPWM_ACT2};
+const int LPWM_PINS[3] = {0, LPWM_ACT1, LPWM_ACT2};
+
+// Per-actuator state (index 1 and 2; index 0 unused)
+bool moving[3] = {false, false, false};
+int moveDirection[3] = {0, 0, 0};         // 1: forward, -1: backward
+unsigned long moveStartTime[3] = {0, 0, 0};
+unsigned long moveDuration[3] = {0, 0, 0};
+float positionMM[3] = {0.0, 0.0, 0.0};    // Dead-reckoned position since power-up
+
+// Last frame received, copied out of the I2C interrupt and handled in loop()
+volatile byte frame[32];
+volatile int frameLength = 0;
+volatile bool frameReady = false;
+
+// Reported in the status register
+volatile byte lastSeq = 0;
+volatile byte lastError = ERR_OK;
 
 void setup() {
   Wire.begin(9); // Join I2C bus as slave with address 9
   Serial.begin(9600); // For debugging
   Wire.onReceive(receiveEvent);
+  Wire.onRequest(requestEvent);
 
   // pinMode declarations
   pinMode(R_EN_ACT1, OUTPUT);
@@ -55,121 +82,190 @@ void setup() {
 }
 
 void loop() {
-   //this is needed for the arduino to receive commands
+  if (frameReady) {
+    handleFrame();
+  }
   manageActuators();           // Handle actuator movement
 }
 
-void moveActuator(int actuatorNum, int direction, unsigned long duration) {
-  // Only start movement if not already moving
-  if (!isMoving) {
-    isMoving = true;
-    currentActuator = actuatorNum;
-    currentDirection = direction;
-    moveStartTime = millis();
-    moveDuration = duration;
-
-    Serial.print("moveActuator: Actuator = ");
-    Serial.print(actuatorNum);
-    Serial.print(", Direction = ");
-    Serial.print(direction);
-    Serial.print(", Duration = ");
-    Serial.println(duration);
-
-    if (actuatorNum == 1) {
-      if (direction > 0) {
-        analogWrite(RPWM_ACT1, 255);
-        analogWrite(LPWM_ACT1, 0);
-      } else {
-        analogWrite(RPWM_ACT1, 0);
-        analogWrite(LPWM_ACT1, 255);
-      }
-    } else if (actuatorNum == 2) {
-      if (direction > 0) {
-        analogWrite(RPWM_ACT2, 255);
-        analogWrite(LPWM_ACT2, 0);
-      } else {
-        analogWrite(RPWM_ACT2, 0);
-        analogWrite(LPWM_ACT2, 255);
-      }
+// CRC-8, polynomial 0x07, initial value 0 (crc8() in actuator_protocol.py)
+byte crc8(const byte *data, int length) {
+  byte crc = 0;
+  for (int i = 0; i < length; i++) {
+    crc ^= data[i];
+    for (int bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x80) ? (byte)((crc << 1) ^ 0x07) : (byte)(crc << 1);
     }
-  } else {
+  }
+  return crc;
+}
+
+unsigned long durationForMM(float mm) {
+  return abs(long(mm / MM_PER_INCH / SPEED_INCHES_PER_SEC * 1000));
+}
+
+void moveActuator(int actuatorNum, int direction, unsigned long duration) {
+  // Only start movement if this actuator is not already moving
+  if (actuatorNum < 1 || actuatorNum > 2) {
+    return;
+  }
+  if (moving[actuatorNum]) {
     Serial.println("moveActuator: Already moving");
+    return;
+  }
+  moving[actuatorNum] = true;
+  moveDirection[actuatorNum] = direction;
+  moveStartTime[actuatorNum] = millis();
+  moveDuration[actuatorNum] = duration;
+
+  Serial.print("moveActuator: Actuator = ");
+  Serial.print(actuatorNum);
+  Serial.print(", Direction = ");
+  Serial.print(direction);
+  Serial.print(", Duration = ");
+  Serial.println(duration);
+
+  if (direction > 0) {
+    analogWrite(RPWM_PINS[actuatorNum], 255);
+    analogWrite(LPWM_PINS[actuatorNum], 0);
+  } else {
+    analogWrite(RPWM_PINS[actuatorNum], 0);
+    analogWrite(LPWM_PINS[actuatorNum], 255);
   }
 }
 
 void manageActuators() {
-  if (isMoving) {
-    if (millis() - moveStartTime >= moveDuration) {
+  for (int actuatorNum = 1; actuatorNum <= 2; actuatorNum++) {
+    if (moving[actuatorNum] && millis() - moveStartTime[actuatorNum] >= moveDuration[actuatorNum]) {
       // Stop the actuator
-      if (currentActuator == 1) {
-        analogWrite(RPWM_ACT1, 0);
-        analogWrite(LPWM_ACT1, 0);
-        digitalWrite(R_EN_ACT1, HIGH); // Stop Actuator 1
-        digitalWrite(L_EN_ACT1, HIGH);
-      } else if (currentActuator == 2) {
-        analogWrite(RPWM_ACT2, 0);
-        analogWrite(LPWM_ACT2, 0);
-        digitalWrite(R_EN_ACT2, HIGH); // Stop Actuator 2
-        digitalWrite(L_EN_ACT2, HIGH);
-      }
-      isMoving = false;
-      currentActuator = 0;
-      currentDirection = 0;
-      Serial.println("Target reached");
-      //  No need to send "OK" back to the Pi in this version.
+      analogWrite(RPWM_PINS[actuatorNum], 0);
+      analogWrite(LPWM_PINS[actuatorNum], 0);
+      positionMM[actuatorNum] += (float)moveDirection[actuatorNum] * (moveDuration[actuatorNum] / 1000.0)
+                                 * SPEED_INCHES_PER_SEC * MM_PER_INCH;
+      moving[actuatorNum] = false;
+      moveDirection[actuatorNum] = 0;
+      Serial.print("Target reached: Actuator = ");
+      Serial.println(actuatorNum);
     }
   }
 }
 
+float readFloatLE(const byte *data) {
+  union {
+    float f;
+    byte b[4];
+  } u;
+  for (int i = 0; i < 4; i++) {
+    u.b[i] = data[i];
+  }
+  return u.f;
+}
+
+void handleLegacyFrame(const byte *data) {
+  // Extract data from the received bytes (Big Endian)
+  int actuatorNum = data[4];
+  union {
+    float f;
+    byte b[4];
+  } u;
+  u.b[3] = data[5];
+  u.b[2] = data[6];
+  u.b[1] = data[7];
+  u.b[0] = data[8];
+  float targetDistanceMM = u.f;
 
+  Serial.print("Received: Actuator = ");
+  Serial.print(actuatorNum);
+  Serial.print(", MM = ");
+  Serial.println(targetDistanceMM, 4);
 
-void receiveEvent(int howMany) {
-  Serial.print("receiveEvent called.  Received ");
-  Serial.print(howMany);
-  Serial.println(" bytes.");
-
-  if (howMany == 9) { // Expecting  9 bytes
-    byte data[9];
-    // Read the  9 bytes
-    for (int i = 0; i < 9; i++) {
-      data[i] = Wire.read();
-      Serial.print("data[");
-      Serial.print(i);
-      Serial.print("] = ");
-      Serial.print(data[i], HEX);
-      Serial.print(" ");
+  // Move the actuator
+  moveActuator(actuatorNum, targetDistanceMM > 0 ? 1 : -1, durationForMM(targetDistanceMM));
+}
+
+void handleMoveFrame(const byte *data, int length) {
+  if (length != MOVE_FRAME_SIZE) {
+    lastError = ERR_LENGTH;
+    return;
+  }
+  byte error = ERR_OK;
+  if (crc8(data + 1, MOVE_FRAME_SIZE - 2) != data[MOVE_FRAME_SIZE - 1]) {
+    error = ERR_CRC;
+  } else if (data[1] != PROTOCOL_VERSION) {
+    error = ERR_VERSION;
+  } else {
+    byte mask = data[3];
+    float moves[3] = {0.0, readFloatLE(data + 4), readFloatLE(data + 8)};
+    // Start nothing unless every actuator in the frame is free
+    for (int actuatorNum = 1; actuatorNum <= 2; actuatorNum++) {
+      if ((mask & (1 << (actuatorNum - 1))) && moving[actuatorNum]) {
+        error = ERR_BUSY;
+        Serial.println("handleMoveFrame: Already moving");
+      }
+    }
+    if (error == ERR_OK) {
+      for (int actuatorNum = 1; actuatorNum <= 2; actuatorNum++) {
+        if ((mask & (1 << (actuatorNum - 1))) && moves[actuatorNum] != 0.0) {
+          moveActuator(actuatorNum, moves[actuatorNum] > 0 ? 1 : -1, durationForMM(moves[actuatorNum]));
+        }
+      }
     }
-    Serial.println();
-
-    // Extract data from the received bytes (Big Endian)
-    int actuatorNum = data[4];
-    union {
-      float f;
-      byte b[4];
-    } u;
-    u.b[3] = data[5];
-    u.b[2] = data[6];
-    u.b[1] = data[7];  
-    u.b[0] = data[8];
-    float targetDistanceMM = u.f;
-
-    Serial.print("Received: Actuator = ");
-    Serial.print(actuatorNum);
-    Serial.print(", MM = ");
-    Serial.println(targetDistanceMM, 4);
-
-    // Calculate the duration
-    unsigned long targetTimeMS = abs(long(targetDistanceMM / MM_PER_INCH / SPEED_INCHES_PER_SEC * 1000));
-
-    // Move the actuator
-    moveActuator(actuatorNum, targetDistanceMM > 0 ? 1 : -1, targetTimeMS);
-    receivedCommand = true; // Set the flag
+  }
+  // Publish the result only once the moves have started, so a status read never pairs
+  // the new sequence number with the previous frame's error or busy flags
+  noInterrupts();
+  lastError = error;
+  lastSeq = data[2];
+  interrupts();
+}
+
+void handleFrame() {
+  byte data[32];
+  noInterrupts();
+  int length = frameLength;
+  for (int i = 0; i < length; i++) {
+    data[i] = frame[i];
+  }
+  frameReady = false;
+  interrupts();
+
+  if (data[0] == REG_LEGACY_MOVE && length == LEGACY_FRAME_SIZE) {
+    handleLegacyFrame(data);
+  } else if (data[0] == REG_MOVE) {
+    handleMoveFrame(data, length);
   } else {
     Serial.print("Received ");
-    Serial.print(howMany);
-    Serial.println(" bytes. Expected 9.");
-    while (Wire.available()) {
-      Wire.read();
+    Serial.print(length);
+    Serial.println(" bytes for an unknown register.");
+  }
+}
+
+void receiveEvent(int howMany) {
+  // A single byte only selects the register for the next read; REG_STATUS is the only readable one
+  if (howMany == 1) {
+    Wire.read();
+    return;
+  }
+  int length = 0;
+  while (Wire.available()) {
+    byte value = Wire.read();
+    if (length < 32) {
+      frame[length++] = value;
     }
   }
-}
\ No newline at end of file
+  frameLength = length;
+  frameReady = true;
+}
+
+void requestEvent() {
+  byte status[STATUS_SIZE];
+  status[0] = PROTOCOL_VERSION;
+  status[1] = lastSeq;
+  // Until loop() has handled a new frame, lastSeq still names the previous one
+  status[2] = (moving[1] ? 1 : 0) | (moving[2] ? 2 : 0);
+  status[3] = lastError;
+  memcpy(status + 4, &positionMM[1], 4);
+  memcpy(status + 8, &positionMM[2], 4);
+  status[12] = crc8(status, STATUS_SIZE - 1);
+  Wire.write(status, STATUS_SIZE);
+}
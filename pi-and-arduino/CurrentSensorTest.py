@@ -1,14 +1,14 @@
-import spidev
 import time
+from hardware import get_spi
+import hardware
+from mcp3008_sampler import MCP3008Sampler
 
-# Initialize SPI
-spi = spidev.SpiDev()
-spi.open(0, 0)  # Bus 0, Device 0 (default CS pin)
-spi.max_speed_hz = 1000000  # 1 MHz (adjust if needed)
-spi.mode = 0b01  # Mode 1: CPOL=0, CPHA=1
+# SPI is opened on first read (Bus 0, Device 0, 1 MHz, Mode 1), see hardware.py
 
 # MCP3008 channel connected to ACS712 (0-7)
 ACS712_CHANNEL = 0
+# Conversions averaged into each oversampled reading
+OVERSAMPLE = 64
 
 def read_mcp3008(channel):
     """Reads the analog value from the MCP3008 ADC on the specified channel."""
@@ -24,7 +24,7 @@ def read_mcp3008(channel):
     command_bytes = [command, 0b00000000, 0b00000000] #add 2 zero bytes
 
     # Send the command and read the response
-    response = spi.xfer2(command_bytes)
+    response = get_spi().xfer2(command_bytes)
 
     # Extract the 10-bit ADC value from the response bytes
     # The first byte is junk, and the next three contain the 10 bits we want
@@ -60,6 +60,8 @@ def get_current(adc_value):
 
 
 if __name__ == "__main__":
+    # Lookup table of get_current() for every ADC code, used for the oversampled reading
+    sampler = MCP3008Sampler({ACS712_CHANNEL: [get_current(code) for code in range(1024)]}, oversample=OVERSAMPLE)
     try:
         while True:
             # Read the ADC value from the MCP3008
@@ -68,11 +70,15 @@ if __name__ == "__main__":
             # Convert the ADC value to current
             current_amps = get_current(adc_value)
 
+            # Oversampled reading for comparison
+            averaged_amps = sampler.sample()[ACS712_CHANNEL]
+
             # Print the results
-            print(f"ADC Value: {adc_value}, Current: {current_amps:.3f} A")
+            print(f"ADC Value: {adc_value}, Current: {current_amps:.3f} A, "
+                  f"Averaged ({OVERSAMPLE}x): {averaged_amps:.3f} A at {sampler.last_sample_rate:.0f} samples/s")
             time.sleep(0.5)  # Read every half second
 
     except KeyboardInterrupt:
         print("Script stopped by user")
     finally:
-        spi.close()  # Clean up the SPI connection
+        hardware.close()  # Clean up the SPI connection
@@ -1,8 +1,6 @@
-import smbus
 import time
-
-# I2C bus
-bus = smbus.SMBus(1)
+from hardware import get_i2c_bus
+import hardware
 
 # TCA9548A address
 TCA9548A_ADDRESS = 0x70
@@ -11,7 +9,7 @@ TCA9548A_CHANNEL = 7  # Define the TCA9548A channel
 def select_i2c_channel(channel):
     """Selects the I2C channel on the TCA9548A."""
     try:
-        bus.write_byte_data(TCA9548A_ADDRESS, 0, 1 << channel)
+        get_i2c_bus().write_byte_data(TCA9548A_ADDRESS, 0, 1 << channel)
         time.sleep(0.001)
         return True
     except Exception as e:
@@ -24,6 +22,7 @@ def scan_i2c_bus(channel):
         print(f"Failed to select channel {channel}, cannot scan.")
         return
 
+    bus = get_i2c_bus()
     found_addresses = []
     for address in range(128):
         try:
@@ -37,5 +36,10 @@ def scan_i2c_bus(channel):
         print(f"No devices found on channel {channel}")
     return found_addresses
 
-# Select the TCA9548A channel and scan
-scan_i2c_bus(TCA9548A_CHANNEL) # Pass the channel to the function
+if __name__ == "__main__":
+    try:
+        # Select the TCA9548A channel and scan
+        scan_i2c_bus(TCA9548A_CHANNEL) # Pass the channel to the function
+    finally:
+        hardware.close()
+
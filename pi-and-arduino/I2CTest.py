@@ -1,10 +1,8 @@
-from ina219 import INA219
-from ina219 import DeviceRangeError
 import time
-import smbus  # Still need to import smbus for TCA9548A
+import hardware
+from i2c_mux import get_muxed_bus
 
-# TCA9548A address
-TCA9548A_ADDRESS = 0x70
+# TCA9548A channel (the mux address is in i2c_mux.py)
 TCA9548A_CHANNEL = 0  # Change this if your INA219 is on a different channel
 
 # INA219 default address
@@ -13,29 +11,45 @@ INA219_ADDRESS = 0x40  # Or 0x41, depending on address select pins
 # Shunt resistor value (in Ohms). Adjust if your sensor has a different value.
 SHUNT_OHMS = 0.1
 
-# Initialize I2C bus
-bus = smbus.SMBus(1)
+def select_i2c_channel(channel):
+    """Selects the I2C channel on the TCA9548A (skipped if it is already selected)."""
+    return get_muxed_bus().select(channel)
 
-def select_i2c_channel(bus, channel):
-    """Selects the I2C channel on the TCA9548A."""
-    try:
-        bus.write_byte_data(TCA9548A_ADDRESS, 0, 1 << channel)
-        time.sleep(0.001)
-        return True
-    except Exception as e:
-        print(f"Error selecting channel {channel}: {e}")
-        return False
+class RegisterINA219:
+    """Bus-voltage-only INA219 reader on the shared bus, used with the simulated backend (the ina219 library opens its own bus)."""
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def bus_voltage(self):
+        value = get_muxed_bus().read_word(self.channel, INA219_ADDRESS, 0x02)
+        if value is None:
+            raise OSError("bus voltage read failed")
+        return (value >> 3) * 4 / 1000.0
+
+def make_ina219(bus_number, channel):
+    """Creates and configures an INA219 driver. The mux channel must already be selected."""
+    if hardware.BUS_BACKEND == "sim":
+        return RegisterINA219(channel)
+    from ina219 import INA219  # Imported on first use, it pulls in the Adafruit I2C stack
+
+    ina = INA219(SHUNT_OHMS, address=INA219_ADDRESS, busnum=bus_number)
+    ina.configure()
+    return ina
 
 def get_bus_voltage_ina219(channel, bus_number=1):  # Default to bus 1
-    if not select_i2c_channel(bus, channel):
+    mux = get_muxed_bus()
+    # Configured once per channel and reused on every later read
+    ina = mux.driver(channel, ("ina219", INA219_ADDRESS), lambda: make_ina219(bus_number, channel))
+    if ina is None or not select_i2c_channel(channel):
         print("Failed to select TCA9548A channel. Aborting read.")
         return None
     try:
-        ina = INA219(SHUNT_OHMS, address=INA219_ADDRESS, busnum=bus_number)
-        ina.configure()
         return ina.bus_voltage()
     except Exception as e:
         print(f"Error reading INA219 voltage: {e}")
+        mux.invalidate()
+        mux.drop_driver(channel, ("ina219", INA219_ADDRESS))
         return None
 
 if __name__ == "__main__":
@@ -51,4 +65,4 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         print("Script stopped by user")
     finally:
-        bus.close()
\ No newline at end of file
+        hardware.close()
\ No newline at end of file
@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of recent ticks kept for the jitter and cycle time percentiles
+JITTER_WINDOW = 1000
+
+class AcquisitionScheduler:
+    """
+    Runs sensor reads at a fixed cadence on the monotonic clock.
+
+    Tick k is scheduled at start + k * period, so the cadence does not drift with the time
+    spent reading and writing. Readers run in parallel (one worker each, e.g. one for the
+    I2C bus and one for SPI) and their results are merged into one sample. If a cycle runs
+    past the next tick, the missed ticks are counted and skipped rather than run late.
+    """
+
+    def __init__(self, rate_hz, readers, on_sample, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            rate_hz: Ticks per second.
+            readers: {name: callable returning a dict of readings}.
+            on_sample: Called as on_sample(timestamp, readings) after every tick, where
+                       timestamp is the wall-clock time.time() of the tick.
+        """
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        self.period = 1.0 / rate_hz
+        self.readers = readers
+        self.on_sample = on_sample
+        self.clock = clock
+        self.sleep = sleep
+        self.ticks = 0
+        self.missed_deadlines = 0
+        self.max_jitter = 0.0
+        self.total_jitter = 0.0
+        self.max_cycle_time = 0.0
+        self.recent_jitter = deque(maxlen=JITTER_WINDOW)
+        self.recent_cycle_times = deque(maxlen=JITTER_WINDOW)
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Makes run() return after the current tick."""
+        self._stop.set()
+
+    def _read_all(self, pool):
+        if pool is None:
+            results = [reader() for reader in self.readers.values()]
+        else:
+            futures = [pool.submit(reader) for reader in self.readers.values()]
+            results = [future.result() for future in futures]
+        readings = {}
+        for result in results:
+            readings.update(result)
+        return readings
+
+    def run(self, max_ticks=None):
+        """Runs until stop() is called or max_ticks ticks have run."""
+        pool = ThreadPoolExecutor(max_workers=len(self.readers)) if len(self.readers) > 1 else None
+        try:
+            start = self.clock()
+            tick = 0
+            while not self._stop.is_set() and (max_ticks is None or self.ticks < max_ticks):
+                scheduled = start + tick * self.period
+                now = self.clock()
+                if now < scheduled:
+                    self.sleep(scheduled - now)
+                    now = self.clock()
+
+                jitter = now - scheduled
+                self.ticks += 1
+                self.total_jitter += jitter
+                self.max_jitter = max(self.max_jitter, jitter)
+                self.recent_jitter.append(jitter)
+
+                timestamp = time.time()
+                self.on_sample(timestamp, self._read_all(pool))
+
+                finished = self.clock()
+                self.max_cycle_time = max(self.max_cycle_time, finished - now)
+                self.recent_cycle_times.append(finished - now)
+                # Next tick that has not already passed
+                next_tick = int((finished - start) / self.period) + 1
+                self.missed_deadlines += max(0, next_tick - tick - 1)
+                tick = next_tick
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def stats(self):
+        """Returns tick count, missed deadlines, jitter and cycle time statistics (milliseconds)."""
+        def percentile(values, p):
+            return values[min(len(values) - 1, int(p * len(values)))] * 1000 if values else 0.0
+        recent = sorted(self.recent_jitter)
+        cycles = sorted(self.recent_cycle_times)
+        return {
+            "ticks": self.ticks,
+            "missed_deadlines": self.missed_deadlines,
+            "mean_jitter_ms": self.total_jitter / self.ticks * 1000 if self.ticks else 0.0,
+            "p50_jitter_ms": percentile(recent, 0.50),
+            "p99_jitter_ms": percentile(recent, 0.99),
+            "max_jitter_ms": self.max_jitter * 1000,
+            "p50_cycle_ms": percentile(cycles, 0.50),
+            "p99_cycle_ms": percentile(cycles, 0.99),
+            "max_cycle_ms": self.max_cycle_time * 1000,
+        }
+
+    def format_stats(self):
+        """Returns stats() as one line for printing."""
+        s = self.stats()
+        return (f"{s['ticks']} ticks, {s['missed_deadlines']} missed deadlines, jitter mean "
+                f"{s['mean_jitter_ms']:.2f} ms / p99 {s['p99_jitter_ms']:.2f} ms / max {s['max_jitter_ms']:.2f} ms, "
+                f"longest cycle {s['max_cycle_ms']:.2f} ms")
@@ -0,0 +1,320 @@
+import struct
+import time
+
+from hardware import get_i2c_bus
+
+# Arduino I2C address (same as arduino_address in test.py)
+ARDUINO_ADDRESS = 0x08
+
+# Protocol v2 registers (the SMBus command byte). Register 0 is the original 8-byte '>if' frame.
+PROTOCOL_VERSION = 2
+REG_LEGACY_MOVE = 0x00
+REG_MOVE = 0x10
+REG_STATUS = 0x11
+
+# Move frame: version, sequence number, actuator mask (bit 0 = actuator 1, bit 1 = actuator 2),
+# move of actuator 1 and 2 in mm (little-endian floats), CRC-8 of the preceding bytes
+MOVE_FORMAT = "<BBBff"
+MOVE_FRAME_SIZE = struct.calcsize(MOVE_FORMAT) + 1
+# Status: version, sequence number of the last frame received, busy flags (bit 0/1 = actuator
+# 1/2 moving), error code for that frame, dead-reckoned position of actuator 1 and 2 (mm), CRC-8
+STATUS_FORMAT = "<BBBBff"
+STATUS_SIZE = struct.calcsize(STATUS_FORMAT) + 1
+
+ERR_OK = 0
+ERR_BUSY = 1  # an actuator in the frame was still moving; nothing was started
+ERR_CRC = 2
+ERR_VERSION = 3
+ERR_LENGTH = 4
+ERROR_NAMES = {ERR_OK: "ok", ERR_BUSY: "busy", ERR_CRC: "bad checksum", ERR_VERSION: "unsupported version",
+               ERR_LENGTH: "bad length"}
+
+ACTUATOR_SPEED_MM_S = 0.51 * 25.4  # Matches SPEED_INCHES_PER_SEC in actuator.ino
+POLL_INTERVAL_S = 0.02  # Status polling interval once a move is due to finish
+ACK_TIMEOUT_S = 0.5  # Time allowed for the Arduino to pick up a frame
+COMPLETION_MARGIN_S = 1.0  # Extra time allowed over the expected move duration
+
+def crc8(data):
+    """CRC-8 (polynomial 0x07, initial value 0), as computed by crc8() in actuator.ino."""
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+def pack_move_frame(seq, moves):
+    """Returns the move frame bytes for {actuator_num: mm} (actuators 1 and/or 2)."""
+    mask = sum(1 << (num - 1) for num in moves)
+    body = struct.pack(MOVE_FORMAT, PROTOCOL_VERSION, seq & 0xFF, mask, moves.get(1, 0.0), moves.get(2, 0.0))
+    return body + bytes([crc8(body)])
+
+def unpack_move_frame(frame):
+    """Returns (seq, {actuator_num: mm}) from a move frame. Raises ValueError on a bad frame."""
+    if len(frame) != MOVE_FRAME_SIZE:
+        raise ValueError("bad length")
+    if crc8(frame[:-1]) != frame[-1]:
+        raise ValueError("bad checksum")
+    version, seq, mask, first, second = struct.unpack(MOVE_FORMAT, frame[:-1])
+    if version != PROTOCOL_VERSION:
+        raise ValueError("unsupported version")
+    moves = {}
+    if mask & 1:
+        moves[1] = first
+    if mask & 2:
+        moves[2] = second
+    return seq, moves
+
+def pack_status(seq, busy, error, positions):
+    """Returns the status register bytes. busy is {actuator_num: bool}, positions {actuator_num: mm}."""
+    flags = (1 if busy.get(1) else 0) | (2 if busy.get(2) else 0)
+    body = struct.pack(STATUS_FORMAT, PROTOCOL_VERSION, seq & 0xFF, flags, error, positions[1], positions[2])
+    return body + bytes([crc8(body)])
+
+class ActuatorStatus:
+    """One reading of the Arduino's status register."""
+
+    def __init__(self, version, seq, busy, error, positions):
+        self.version = version
+        self.seq = seq
+        self.busy = busy  # {actuator_num: bool}
+        self.error = error
+        self.positions = positions  # {actuator_num: mm moved since the Arduino started}
+
+    @classmethod
+    def unpack(cls, data):
+        data = bytes(data)
+        if len(data) != STATUS_SIZE or crc8(data[:-1]) != data[-1]:
+            raise ValueError("bad status checksum")
+        version, seq, flags, error, first, second = struct.unpack(STATUS_FORMAT, data[:-1])
+        return cls(version, seq, {1: bool(flags & 1), 2: bool(flags & 2)}, error, {1: first, 2: second})
+
+    @property
+    def idle(self):
+        return not any(self.busy.values())
+
+    def __repr__(self):
+        return (f"ActuatorStatus(seq={self.seq}, busy={self.busy}, error={ERROR_NAMES.get(self.error, self.error)}, "
+                f"positions={self.positions})")
+
+class ActuatorError(Exception):
+    """The Arduino rejected a move, did not finish it in time or could not be reached."""
+
+class ActuatorRejected(ActuatorError):
+    """The Arduino never started the move (rejected or never acknowledged it, or the frame never went out)."""
+
+class ActuatorSendError(ActuatorRejected):
+    """The move frame could not be written to the bus, so the Arduino never got it."""
+
+class ActuatorUnconfirmed(ActuatorError):
+    """The move frame went out but its outcome could not be read back (bus errors or bad status checksums)."""
+
+class ActuatorStatusError(ActuatorError):
+    """One read of the status register failed on the bus or had a bad checksum."""
+
+class ActuatorClient:
+    """
+    Sends protocol v2 move frames and waits for the moves to finish by polling the status register.
+
+    Both actuators can be moved with one frame. After sending, the client waits until the
+    status echoes the frame's sequence number (raising if the Arduino rejected it), sleeps
+    for the expected travel time, then polls until both actuators report idle. No fixed
+    sleeps, and a dropped command is reported instead of being assumed done.
+    """
+
+    def __init__(self, bus=None, address=ARDUINO_ADDRESS, clock=time.monotonic, sleep=time.sleep):
+        self._bus = bus
+        self.address = address
+        self.clock = clock
+        self.sleep = sleep
+        self.seq = None
+        self.polls = 0
+        self.last_status = None
+
+    @property
+    def bus(self):
+        if self._bus is None:
+            self._bus = get_i2c_bus()
+        return self._bus
+
+    def status(self):
+        """Reads the status register. Raises ActuatorStatusError on a bus error or a bad checksum."""
+        self.polls += 1
+        try:
+            self.last_status = ActuatorStatus.unpack(self.bus.read_i2c_block_data(self.address, REG_STATUS, STATUS_SIZE))
+        except Exception as e:
+            raise ActuatorStatusError(f"Error reading Arduino status: {e}") from e
+        return self.last_status
+
+    def idle_positions(self):
+        """
+        Returns the Arduino's positions from the last status read if it showed both actuators idle
+        (as after a finished move), else None. Costs no bus transaction; for the move journal.
+        """
+        if self.last_status is None or not self.last_status.idle:
+            return None
+        return dict(self.last_status.positions)
+
+    def _next_seq(self):
+        if self.seq is None:
+            # Continue from whatever the Arduino saw last, so the first frame is never mistaken for an old one
+            try:
+                self.seq = self.status().seq
+            except Exception:
+                self.seq = 0
+        self.seq = (self.seq + 1) & 0xFF
+        return self.seq
+
+    def send(self, moves):
+        """Sends one move frame for {actuator_num: mm} without waiting. Returns its sequence number."""
+        seq = self._next_seq()
+        try:
+            self.bus.write_i2c_block_data(self.address, REG_MOVE, list(pack_move_frame(seq, moves)))
+        except Exception as e:
+            raise ActuatorSendError(f"Error sending move {seq}: {e}") from e
+        return seq
+
+    def wait_for_ack(self, seq, timeout=ACK_TIMEOUT_S):
+        """
+        Polls until the Arduino reports frame seq. Raises ActuatorRejected if it was rejected or
+        never seen, ActuatorUnconfirmed if no status at all could be read before the deadline.
+        """
+        deadline = self.clock() + timeout
+        read, error = False, None
+        while True:
+            try:
+                status = self.status()
+            except ActuatorStatusError as e:
+                error = e  # a glitch on one read; try again until the deadline
+            else:
+                read = True
+                if status.seq == seq:
+                    if status.error != ERR_OK:
+                        raise ActuatorRejected(f"Arduino rejected move {seq}: "
+                                               f"{ERROR_NAMES.get(status.error, status.error)}")
+                    return status
+            if self.clock() >= deadline:
+                if not read:
+                    # The frame went out, so the Arduino may well be moving
+                    raise ActuatorUnconfirmed(f"Move {seq} sent but not confirmed: {error}") from error
+                raise ActuatorRejected(f"Arduino did not acknowledge move {seq}")
+            self.sleep(POLL_INTERVAL_S)
+
+    def wait_until_idle(self, timeout):
+        """Polls until no actuator is moving. Returns the final status."""
+        deadline = self.clock() + timeout
+        while True:
+            try:
+                status = self.status()
+            except ActuatorStatusError as e:
+                if self.clock() >= deadline:
+                    raise ActuatorUnconfirmed(f"Move not confirmed finished within {timeout:.1f} s: {e}") from e
+            else:
+                if status.idle:
+                    return status
+                if self.clock() >= deadline:
+                    raise ActuatorError(f"Move did not finish within {timeout:.1f} s: {status}")
+            self.sleep(POLL_INTERVAL_S)
+
+    def move(self, moves):
+        """
+        Moves one or both actuators ({actuator_num: mm}, relative) and returns once they have stopped.
+
+        Returns:
+            The ActuatorStatus read after the move finished.
+        """
+        moves = {num: mm for num, mm in moves.items() if mm != 0}
+        if not moves:
+            return self.status()
+        expected_s = max(abs(mm) for mm in moves.values()) / ACTUATOR_SPEED_MM_S
+        start = self.clock()
+        seq = self.send(moves)
+        self.wait_for_ack(seq)
+        # Nothing to ask the Arduino until the move is due to end
+        remaining = expected_s - (self.clock() - start)
+        if remaining > POLL_INTERVAL_S:
+            self.sleep(remaining)
+        return self.wait_until_idle(expected_s + COMPLETION_MARGIN_S)
+
+_client = None
+
+def get_client():
+    """Returns the shared ActuatorClient on the shared I2C bus."""
+    global _client
+    if _client is None:
+        _client = ActuatorClient()
+    return _client
+
+class ArduinoSimulator:
+    """
+    Python stand-in for actuator.ino, answering on the SMBus calls the Pi makes.
+
+    Implements protocol v2 (move frames and the status register) and the original 8-byte
+    frame, with moves timed from the same speed constant, both actuators able to run at once,
+    and the firmware's rule of ignoring a command for an actuator that is still moving.
+    Pass it as the bus of an ActuatorClient to exercise the protocol without hardware.
+    """
+
+    def __init__(self, address=ARDUINO_ADDRESS, clock=time.monotonic):
+        self.address = address
+        self.clock = clock
+        self.positions = {1: 0.0, 2: 0.0}
+        self.moves = {}  # actuator_num -> (start time, duration, signed mm)
+        self.last_seq = 0
+        self.last_error = ERR_OK
+        self.dropped = 0
+        self.frames = 0
+
+    def _check_address(self, address):
+        if address != self.address:
+            raise OSError(121, "Remote I/O error")
+
+    def _update(self):
+        now = self.clock()
+        for num, (start, duration, mm) in list(self.moves.items()):
+            if now - start >= duration:
+                self.positions[num] += mm
+                del self.moves[num]
+
+    def _start(self, num, mm):
+        self.moves[num] = (self.clock(), abs(mm) / ACTUATOR_SPEED_MM_S, mm)
+
+    def write_i2c_block_data(self, address, register, data):
+        self._check_address(address)
+        self._update()
+        self.frames += 1
+        data = bytes(data)
+        if register == REG_LEGACY_MOVE:
+            if len(data) != 8:
+                return
+            num, mm = struct.unpack(">if", data)
+            if num in self.moves or num not in self.positions:
+                self.dropped += 1  # "moveActuator: Already moving"
+                return
+            self._start(num, mm)
+        elif register == REG_MOVE:
+            if len(data) != MOVE_FRAME_SIZE:
+                self.last_error = ERR_LENGTH
+                return
+            self.last_seq = data[1]
+            try:
+                _, moves = unpack_move_frame(data)
+            except ValueError as e:
+                self.last_error = ERR_CRC if "checksum" in str(e) else ERR_VERSION
+                return
+            if any(num in self.moves for num in moves):
+                self.last_error = ERR_BUSY
+                self.dropped += 1
+                return
+            self.last_error = ERR_OK
+            for num, mm in moves.items():
+                if mm != 0:
+                    self._start(num, mm)
+
+    def read_i2c_block_data(self, address, register, length):
+        self._check_address(address)
+        self._update()
+        if register != REG_STATUS:
+            return [0] * length
+        busy = {num: num in self.moves for num in self.positions}
+        return list(pack_status(self.last_seq, busy, self.last_error, self.positions)[:length])
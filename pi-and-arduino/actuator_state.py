@@ -0,0 +1,246 @@
+import math
+import mmap
+import os
+import struct
+import time
+import zlib
+
+from hardware import RUNTIME_SUFFIX
+
+# State and journal live next to this script, like the other runtime files
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(BASE_DIR, f"actuator_state{RUNTIME_SUFFIX}.bin")
+JOURNAL_FILE = os.path.join(BASE_DIR, f"actuator_journal{RUNTIME_SUFFIX}.bin")
+# Old text file written by test.py, imported once if there is no state file yet
+LEGACY_EXTENSION_FILE = "actuator_extensions.txt"
+
+ACTUATORS = (1, 2)
+STATE_MAGIC = b"CAPSACT\0"
+# Slot: sequence number, extension of actuator 1 and 2 (mm from flat), CRC32 of the preceding fields
+SLOT_FORMAT = "<Qdd"
+SLOT_SIZE = struct.calcsize(SLOT_FORMAT) + 4
+STATE_SIZE = len(STATE_MAGIC) + 2 * SLOT_SIZE
+# Journal: a header, then one entry per command: sequence number, Unix time, actuator mask (bit 0 =
+# actuator 1, bit 1 = actuator 2), move of actuator 1 and 2 (mm), extensions after the command, the
+# Arduino's dead-reckoned positions before it (mm, NaN if unknown), CRC32 of the preceding fields
+JOURNAL_MAGIC = b"CAPSJRN2"
+JOURNAL_FORMAT = "<QdBdddddd"
+JOURNAL_SIZE = struct.calcsize(JOURNAL_FORMAT) + 4
+JOURNAL_MAX_BYTES = 1 << 20  # The journal is rotated to .1 once it passes this size
+# Largest difference (mm) between the Arduino's position change and a journaled move still counted as that move
+POSITION_TOLERANCE_MM = 0.1
+
+def _pack_slot(seq, extensions):
+    body = struct.pack(SLOT_FORMAT, seq, extensions[1], extensions[2])
+    return body + struct.pack("<I", zlib.crc32(body))
+
+def _unpack_slot(data):
+    """Returns (seq, extensions) for a slot, or None if its checksum does not match."""
+    body, (crc,) = data[:-4], struct.unpack("<I", data[-4:])
+    if zlib.crc32(body) != crc:
+        return None
+    seq, first, second = struct.unpack(SLOT_FORMAT, body)
+    return seq, {1: first, 2: second}
+
+def _pack_journal_entry(seq, moves, extensions, positions):
+    mask = sum(1 << (actuator - 1) for actuator in moves)
+    positions = positions or {1: math.nan, 2: math.nan}
+    body = struct.pack(JOURNAL_FORMAT, seq, time.time(), mask, moves.get(1, 0.0), moves.get(2, 0.0),
+                       extensions[1], extensions[2], positions[1], positions[2])
+    return body + struct.pack("<I", zlib.crc32(body))
+
+def read_journal(path):
+    """
+    Returns the valid journal entries as (seq, timestamp, moves, extensions, positions), stopping
+    at a torn entry. moves is {actuator: mm}; positions is None if they were not known.
+    """
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(JOURNAL_MAGIC):
+        return entries
+    for offset in range(len(JOURNAL_MAGIC), len(data) - JOURNAL_SIZE + 1, JOURNAL_SIZE):
+        record = data[offset:offset + JOURNAL_SIZE]
+        body, (crc,) = record[:-4], struct.unpack("<I", record[-4:])
+        if zlib.crc32(body) != crc:
+            break
+        seq, timestamp, mask, first, second, extension_1, extension_2, position_1, position_2 = \
+            struct.unpack(JOURNAL_FORMAT, body)
+        moves = {actuator: mm for actuator, mm in ((1, first), (2, second)) if mask & (1 << (actuator - 1))}
+        positions = None if math.isnan(position_1) else {1: position_1, 2: position_2}
+        entries.append((seq, timestamp, moves, {1: extension_1, 2: extension_2}, positions))
+    return entries
+
+class ActuatorStateStore:
+    """
+    Crash-safe record of the actuator extensions.
+
+    The state file holds two checksummed slots in a memory-mapped file; each save writes the
+    slot the latest state is not in, so a power cut mid-write leaves the other slot intact.
+    On open the valid slot with the higher sequence number wins.
+
+    Before a command is sent, begin_moves() appends it to a journal as one checksummed entry
+    holding every actuator it moves (and fsyncs it), so a command is replayed whole or not at
+    all, as the Arduino runs it. If the Pi dies after the actuators moved but before save(),
+    the journal entry is newer than the saved state and is replayed on the next open. A torn
+    journal entry can only be from a command that was never sent, so it is ignored. If a
+    journaled move turns out not to have happened, saving the unchanged extensions supersedes
+    it; check_recovered() does that for a replayed move, from the Arduino's positions.
+    """
+
+    def __init__(self, path=STATE_FILE, journal_path=JOURNAL_FILE, durable=True, legacy_path=LEGACY_EXTENSION_FILE):
+        """
+        Args:
+            durable: msync/fsync every update. Turn off only for simulations.
+        """
+        self.path = path
+        self.journal_path = journal_path
+        self.durable = durable
+        self.seq = 0
+        self.extensions = {actuator: 0.0 for actuator in ACTUATORS}
+        self.recovered_moves = 0
+        self.recovered = None  # (extensions before, moves, Arduino positions before) of a replayed command
+        new_file = not os.path.exists(path)
+        if not new_file and os.path.getsize(path) != STATE_SIZE:
+            print(f"Error: {path} has the wrong size. Rebuilding it from the journal.")
+            os.replace(path, path + ".bad")
+            new_file = True
+        if new_file:
+            with open(path + ".tmp", "wb") as f:
+                f.write(STATE_MAGIC + _pack_slot(0, {1: 0.0, 2: 0.0}) + bytes(SLOT_SIZE))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), STATE_SIZE)
+        entries = self._trim_journal()
+        self._journal = open(journal_path, "ab")
+        self._load()
+        if new_file and not entries and legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+        self._recover(entries)
+
+    def _trim_journal(self):
+        """Reads the journal and cuts off a torn last entry so new entries follow the valid ones."""
+        entries = read_journal(self.journal_path)
+        if not os.path.exists(self.journal_path) or os.path.getsize(self.journal_path) < len(JOURNAL_MAGIC):
+            with open(self.journal_path, "wb") as f:
+                f.write(JOURNAL_MAGIC)
+        else:
+            with open(self.journal_path, "rb") as f:
+                magic = f.read(len(JOURNAL_MAGIC))
+            if magic != JOURNAL_MAGIC:
+                print(f"Error: {self.journal_path} is not a journal of this version. Moving it to .bad.")
+                os.replace(self.journal_path, self.journal_path + ".bad")
+                with open(self.journal_path, "wb") as f:
+                    f.write(JOURNAL_MAGIC)
+            elif os.path.getsize(self.journal_path) > len(JOURNAL_MAGIC) + len(entries) * JOURNAL_SIZE:
+                print(f"Trimming a torn entry from {self.journal_path}")
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(len(JOURNAL_MAGIC) + len(entries) * JOURNAL_SIZE)
+        return entries
+
+    def _load(self):
+        best = None
+        if self._map[:len(STATE_MAGIC)] == STATE_MAGIC:
+            for slot in range(2):
+                offset = len(STATE_MAGIC) + slot * SLOT_SIZE
+                state = _unpack_slot(self._map[offset:offset + SLOT_SIZE])
+                if state is not None and (best is None or state[0] > best[0]):
+                    best = state
+        if best is not None:
+            self.seq, self.extensions = best
+        else:
+            print(f"Error: no valid slot in {self.path}. Rebuilding the state from the journal.")
+
+    def _import_legacy(self, legacy_path):
+        try:
+            with open(legacy_path, "r") as f:
+                lines = f.readlines()
+            extensions = {1: float(lines[0].strip()), 2: float(lines[1].strip())}
+            self.save(extensions)
+            print(f"Imported actuator extensions from {legacy_path}")
+        except Exception as e:
+            print(f"Error importing {legacy_path}: {e}")
+
+    def _recover(self, entries):
+        newer = [entry for entry in entries if entry[0] > self.seq]
+        if newer:
+            seq, _, moves, extensions, positions = newer[-1]
+            self.recovered_moves = len(newer)
+            self.recovered = ({actuator: extensions[actuator] - moves.get(actuator, 0.0) for actuator in ACTUATORS},
+                              moves, positions)
+            print(f"Recovered {len(newer)} unsaved move(s) from {self.journal_path}")
+            self._write_slot(seq, extensions)
+
+    def check_recovered(self, positions):
+        """
+        Checks the command replayed from the journal on open against the Arduino's dead-reckoned
+        positions ({actuator: mm}, from its status register) and saves the extensions from before
+        it if the actuators did not move. Nothing is changed if the positions from before the
+        command were not journaled or do not match either outcome (e.g. the Arduino restarted).
+
+        Returns:
+            True if the replayed command was undone.
+        """
+        if self.recovered is None:
+            return False
+        extensions, moves, before = self.recovered
+        self.recovered = None
+        if before is None:
+            return False
+        moved = {actuator: positions[actuator] - before[actuator] for actuator in ACTUATORS}
+        if all(abs(mm) <= POSITION_TOLERANCE_MM for mm in moved.values()):
+            print("The Arduino did not run the recovered move, restoring the extensions from before it")
+            self.save(extensions)
+            return True
+        if any(abs(moved[actuator] - moves.get(actuator, 0.0)) > POSITION_TOLERANCE_MM for actuator in ACTUATORS):
+            print(f"Arduino positions {positions} match neither outcome of the recovered move, keeping it")
+        return False
+
+    def _write_slot(self, seq, extensions):
+        offset = len(STATE_MAGIC) + (seq % 2) * SLOT_SIZE
+        self._map[offset:offset + SLOT_SIZE] = _pack_slot(seq, extensions)
+        if self.durable:
+            self._map.flush()
+        self.seq = seq
+        self.extensions = dict(extensions)
+
+    def begin_move(self, actuator, move_mm, positions=None):
+        """Journals a move before its command is sent. Returns the extensions after the move."""
+        return self.begin_moves({actuator: move_mm}, positions)
+
+    def begin_moves(self, moves, positions=None):
+        """
+        Journals moves of several actuators sent in one command ({actuator: mm}). Returns the extensions after them.
+
+        positions are the Arduino's dead-reckoned positions before the command, if known, for check_recovered().
+        """
+        extensions = dict(self.extensions)
+        for actuator, move_mm in moves.items():
+            extensions[actuator] += move_mm
+        self._journal.write(_pack_journal_entry(self.seq + 1, moves, extensions, positions))
+        self._journal.flush()
+        if self.durable:
+            os.fsync(self._journal.fileno())
+        return extensions
+
+    def save(self, extensions):
+        """Stores the extensions as the new state ({actuator: mm from flat})."""
+        self._write_slot(self.seq + 1, extensions)
+        if self._journal.tell() > JOURNAL_MAX_BYTES:
+            self._rotate_journal()
+
+    def _rotate_journal(self):
+        """Starts a new journal; everything in the old one is already in the saved state."""
+        self._journal.close()
+        os.replace(self.journal_path, self.journal_path + ".1")
+        self._journal = open(self.journal_path, "ab")
+        self._journal.write(JOURNAL_MAGIC)
+
+    def close(self):
+        self._journal.close()
+        self._map.close()
+        self._file.close()
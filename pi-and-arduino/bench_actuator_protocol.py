@@ -0,0 +1,75 @@
+import argparse
+import random
+import struct
+
+from actuator_protocol import (ACTUATOR_SPEED_MM_S, ActuatorClient, ActuatorRejected, ArduinoSimulator,
+                               REG_LEGACY_MOVE)
+
+class VirtualClock:
+    """Simulated time: sleeping advances the clock instantly, so a day of moves runs in milliseconds."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+def legacy_moves(simulator, clock, moves, wait_s):
+    """The original pattern: one 8-byte frame per actuator, then a fixed sleep. Returns elapsed seconds."""
+    start = clock()
+    for move in moves:
+        for num, mm in move.items():
+            simulator.write_i2c_block_data(simulator.address, REG_LEGACY_MOVE, list(struct.pack(">if", num, mm)))
+            clock.sleep(wait_s)
+    return clock() - start
+
+def protocol_moves(client, clock, moves):
+    """Protocol v2: one frame for both actuators, waiting on the status register. Returns elapsed seconds."""
+    start = clock()
+    for move in moves:
+        client.move(move)
+    return clock() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Legacy fixed-sleep commands vs protocol v2 against the Arduino simulator")
+    parser.add_argument("--moves", type=int, default=200)
+    parser.add_argument("--max-mm", type=float, default=40.0)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    moves = [{1: rng.uniform(-args.max_mm, args.max_mm), 2: rng.uniform(-args.max_mm, args.max_mm)}
+             for _ in range(args.moves)]
+    commanded = {num: sum(move[num] for move in moves) for num in (1, 2)}
+
+    for wait_s in (1.0, 2.0):
+        clock = VirtualClock()
+        simulator = ArduinoSimulator(clock=clock)
+        elapsed = legacy_moves(simulator, clock, moves, wait_s)
+        clock.sleep(10)
+        simulator.read_i2c_block_data(simulator.address, 0x11, 13)  # let the simulator finish the last move
+        drift = max(abs(simulator.positions[num] - commanded[num]) for num in (1, 2))
+        print(f"Legacy frames + {wait_s:.0f} s sleep: {elapsed:.0f} s for {len(moves)} moves, "
+              f"{simulator.dropped} commands dropped, position off by up to {drift:.1f} mm")
+
+    clock = VirtualClock()
+    simulator = ArduinoSimulator(clock=clock)
+    client = ActuatorClient(bus=simulator, clock=clock, sleep=clock.sleep)
+    elapsed = protocol_moves(client, clock, moves)
+    drift = max(abs(simulator.positions[num] - commanded[num]) for num in (1, 2))
+    ideal = sum(max(abs(mm) for mm in move.values()) for move in moves) / ACTUATOR_SPEED_MM_S
+    print(f"Protocol v2: {elapsed:.0f} s for {len(moves)} moves (travel time {ideal:.0f} s), "
+          f"{simulator.dropped} dropped, position off by {drift:.1e} mm, "
+          f"{client.polls / len(moves):.1f} status reads and {simulator.frames / len(moves):.0f} frame per move")
+
+    # A frame sent while an actuator is still running is reported, not silently dropped
+    simulator.write_i2c_block_data(simulator.address, REG_LEGACY_MOVE, list(struct.pack(">if", 1, 15.0)))
+    try:
+        client.move({1: 5.0})
+        print("Busy actuator: move was accepted (unexpected)")
+    except ActuatorRejected as e:
+        print(f"Busy actuator: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import argparse
+import os
+import random
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from actuator_state import (ActuatorStateStore, JOURNAL_SIZE, SLOT_SIZE, STATE_MAGIC, _pack_slot)
+
+def move_for(seq):
+    """Deterministic move number seq (1-based) used by the crash test: (actuator, mm)."""
+    return 1 + seq % 2, ((seq * 7919) % 41 - 20) / 10
+
+def expected_extensions(seq):
+    """Extensions after the first seq moves from move_for()."""
+    extensions = {1: 0.0, 2: 0.0}
+    for k in range(1, seq + 1):
+        actuator, mm = move_for(k)
+        extensions[actuator] += mm
+    return extensions
+
+def legacy_write(path, extensions, durable):
+    """The original test.py write_extensions (optionally with the fsync it lacked)."""
+    with open(path, "w") as f:
+        f.write(str(extensions[1]) + "\n")
+        f.write(str(extensions[2]) + "\n")
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+
+def time_ms(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), max(times)
+
+def bench_latency(directory, repeats):
+    legacy_path = os.path.join(directory, "actuator_extensions.txt")
+    extensions = {1: 1.5, 2: -2.5}
+    rows = [("text rewrite (old)", lambda: legacy_write(legacy_path, extensions, False)),
+            ("text rewrite + fsync", lambda: legacy_write(legacy_path, extensions, True))]
+    for durable in (False, True):
+        store = ActuatorStateStore(os.path.join(directory, f"state_{durable}.bin"),
+                                   os.path.join(directory, f"journal_{durable}.bin"), durable=durable, legacy_path=None)
+        label = "durable" if durable else "no sync"
+        rows.append((f"slot save ({label})", lambda store=store: store.save(store.extensions)))
+
+        def full_move(store=store):
+            store.save(store.begin_move(1, 0.1))
+        rows.append((f"journal + save ({label})", full_move))
+    print(f"Update latency over {repeats} updates (median / max ms):")
+    for label, function in rows:
+        median, worst = time_ms(function, repeats)
+        print(f"  {label:<26} {median:8.3f} / {worst:8.3f}")
+
+def crash_child(directory, count):
+    """Runs moves forever-ish, reporting each saved seq on stdout, until killed."""
+    store = ActuatorStateStore(os.path.join(directory, "state.bin"), os.path.join(directory, "journal.bin"),
+                               legacy_path=None)
+    for _ in range(count):
+        seq = store.seq + 1
+        actuator, mm = move_for(seq)
+        extensions = store.begin_move(actuator, mm)
+        store.save(extensions)
+        print(seq, flush=True)
+
+def crash_test_kill(directory, rounds):
+    """Kills a process doing moves at random points and checks the recovered state every time."""
+    failures = 0
+    for _ in range(rounds):
+        child = subprocess.Popen([sys.executable, __file__, "--crash-child", directory],
+                                 stdout=subprocess.PIPE, text=True)
+        # Let it run for a random number of moves, then kill it without any cleanup
+        target = random.randint(1, 40)
+        last_saved = 0
+        for line in child.stdout:
+            last_saved = int(line)
+            if last_saved >= target:
+                break
+        time.sleep(random.uniform(0, 0.002))
+        child.send_signal(signal.SIGKILL)
+        child.wait()
+        store = ActuatorStateStore(os.path.join(directory, "state.bin"), os.path.join(directory, "journal.bin"),
+                                   legacy_path=None)
+        if store.seq < last_saved or store.extensions != expected_extensions(store.seq):
+            failures += 1
+            print(f"  FAIL: recovered seq {store.seq} {store.extensions}, last saved {last_saved}")
+        store.close()
+    print(f"Killed a moving process {rounds} times: {rounds - failures} recovered correctly")
+    return failures
+
+def crash_test_torn_writes(directory):
+    """Simulates a power cut at every byte of a slot write and of a journal append."""
+    failures = 0
+    state_path = os.path.join(directory, "torn_state.bin")
+    journal_path = os.path.join(directory, "torn_journal.bin")
+    for path in (state_path, journal_path):
+        if os.path.exists(path):
+            os.remove(path)
+    store = ActuatorStateStore(state_path, journal_path, legacy_path=None)
+    for seq in range(1, 6):
+        actuator, mm = move_for(seq)
+        store.save(store.begin_move(actuator, mm))
+    seq = store.seq
+    store.close()
+    with open(state_path, "rb") as f:
+        good_state = f.read()
+    with open(journal_path, "rb") as f:
+        good_journal = f.read()
+
+    # Slot write of move seq + 1 cut after every byte, with its journal entry complete
+    actuator, mm = move_for(seq + 1)
+    new_slot = _pack_slot(seq + 1, expected_extensions(seq + 1))
+    offset = len(STATE_MAGIC) + ((seq + 1) % 2) * SLOT_SIZE
+    store = ActuatorStateStore(state_path, journal_path, legacy_path=None)
+    store.begin_move(actuator, mm)
+    store.close()
+    with open(journal_path, "rb") as f:
+        journal_with_entry = f.read()
+    for cut in range(SLOT_SIZE + 1):
+        torn = bytearray(good_state)
+        torn[offset:offset + cut] = new_slot[:cut]
+        with open(state_path, "wb") as f:
+            f.write(torn)
+        with open(journal_path, "wb") as f:
+            f.write(journal_with_entry)
+        store = ActuatorStateStore(state_path, journal_path, legacy_path=None)
+        if store.seq != seq + 1 or store.extensions != expected_extensions(seq + 1):
+            failures += 1
+            print(f"  FAIL: slot cut at byte {cut}: seq {store.seq}")
+        store.close()
+
+    # Journal append cut after every byte (power lost before the command was sent)
+    for cut in range(JOURNAL_SIZE):
+        with open(state_path, "wb") as f:
+            f.write(good_state)
+        with open(journal_path, "wb") as f:
+            f.write(journal_with_entry[:len(good_journal) + cut])
+        store = ActuatorStateStore(state_path, journal_path, legacy_path=None)
+        ok = store.seq == seq and store.extensions == expected_extensions(seq)
+        # A move journaled after the torn entry must still be found after the next restart
+        next_actuator, next_mm = move_for(seq + 1)
+        store.begin_move(next_actuator, next_mm)
+        store.close()
+        store = ActuatorStateStore(state_path, journal_path, legacy_path=None)
+        ok = ok and store.seq == seq + 1 and store.extensions == expected_extensions(seq + 1)
+        if not ok:
+            failures += 1
+            print(f"  FAIL: journal cut at byte {cut}: seq {store.seq}")
+        store.close()
+
+    # State file lost entirely: rebuilt from the journal
+    os.remove(state_path)
+    with open(journal_path, "wb") as f:
+        f.write(journal_with_entry)
+    store = ActuatorStateStore(state_path, journal_path, legacy_path=None)
+    if store.extensions != expected_extensions(seq + 1):
+        failures += 1
+        print(f"  FAIL: state rebuilt from journal: {store.extensions}")
+    store.close()
+    print(f"Torn slot writes ({SLOT_SIZE + 1} cut points), torn journal appends ({JOURNAL_SIZE} cut points) and a "
+          f"lost state file: {'all recovered' if not failures else f'{failures} failures'}")
+    return failures
+
+def crash_test_two_actuators(directory):
+    """
+    Power cut at every byte of the journal entry of a command moving both actuators, then the
+    recovered move checked against the Arduino's positions for both outcomes.
+    """
+    failures = 0
+    state_path = os.path.join(directory, "both_state.bin")
+    journal_path = os.path.join(directory, "both_journal.bin")
+    for path in (state_path, journal_path):
+        if os.path.exists(path):
+            os.remove(path)
+    store = ActuatorStateStore(state_path, journal_path, legacy_path=None)
+    store.save({1: 1.0, 2: 1.0})
+    store.close()
+    with open(journal_path, "rb") as f:
+        good_journal = f.read()
+    store = ActuatorStateStore(state_path, journal_path, legacy_path=None)
+    store.begin_moves({1: 2.0, 2: 3.0}, positions={1: 10.0, 2: 20.0})
+    store.close()
+    with open(journal_path, "rb") as f:
+        journal_with_entry = f.read()
+    with open(state_path, "rb") as f:
+        good_state = f.read()
+    before, after = {1: 1.0, 2: 1.0}, {1: 3.0, 2: 4.0}
+    for cut in range(JOURNAL_SIZE + 1):
+        with open(state_path, "wb") as f:
+            f.write(good_state)
+        with open(journal_path, "wb") as f:
+            f.write(journal_with_entry[:len(good_journal) + cut])
+        store = ActuatorStateStore(state_path, journal_path, legacy_path=None)
+        if store.extensions != (after if cut == JOURNAL_SIZE else before):
+            failures += 1
+            print(f"  FAIL: two-actuator entry cut at byte {cut}: {store.extensions}")
+        store.close()
+
+    # The replayed command checked against the Arduino: it ran, or it never did
+    for positions, expected in (({1: 12.0, 2: 23.0}, after), ({1: 10.0, 2: 20.0}, before)):
+        with open(state_path, "wb") as f:
+            f.write(good_state)
+        with open(journal_path, "wb") as f:
+            f.write(journal_with_entry)
+        store = ActuatorStateStore(state_path, journal_path, legacy_path=None)
+        store.check_recovered(positions)
+        store.close()
+        store = ActuatorStateStore(state_path, journal_path, legacy_path=None)
+        if store.extensions != expected:
+            failures += 1
+            print(f"  FAIL: recovered move with Arduino positions {positions}: {store.extensions}")
+        store.close()
+    print(f"Torn two-actuator journal entry ({JOURNAL_SIZE + 1} cut points) and the recovered move checked "
+          f"against the Arduino: {'all recovered' if not failures else f'{failures} failures'}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Actuator state store latency and crash recovery")
+    parser.add_argument("--repeats", type=int, default=500)
+    parser.add_argument("--kills", type=int, default=20)
+    parser.add_argument("--crash-child", metavar="DIR", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.crash_child:
+        crash_child(args.crash_child, 1000000)
+        return
+
+    directory = tempfile.mkdtemp()
+    try:
+        bench_latency(directory, args.repeats)
+        failures = crash_test_torn_writes(directory)
+        failures += crash_test_two_actuators(directory)
+        failures += crash_test_kill(directory, args.kills)
+    finally:
+        shutil.rmtree(directory)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import os
+import statistics
+import time
+
+# Everything below talks to the simulated bench, whatever the environment says
+os.environ["CAPSTONE_BUS_BACKEND"] = "sim"
+
+import bus_backends
+from acquisition import AcquisitionScheduler
+from actuator_protocol import ACTUATOR_SPEED_MM_S, ActuatorClient
+from bench_suite import timed, timings
+from i2c_mux import get_muxed_bus
+from sensorScript import (INA219_ADDRESS, INA219_BUS_VOLTAGE_REGISTER, LOAD_CURRENT_CHANNEL, LOAD_VOLTAGE_CHANNEL,
+                          SOLAR_VOLTAGE_CHANNEL, make_current_sampler, read_currents, read_mcp3008, read_voltages)
+
+def bench_operations(repeats):
+    mux = get_muxed_bus()
+    mux.invalidate()
+    channels = [LOAD_VOLTAGE_CHANNEL, SOLAR_VOLTAGE_CHANNEL]
+    state = {"i": 0}
+
+    def alternate_read():
+        state["i"] += 1
+        mux.read_word(channels[state["i"] % 2], INA219_ADDRESS, INA219_BUS_VOLTAGE_REGISTER)
+    rows = [("INA219 read, same channel", lambda: mux.read_word(LOAD_VOLTAGE_CHANNEL, INA219_ADDRESS,
+                                                                INA219_BUS_VOLTAGE_REGISTER)),
+            ("INA219 read, switching channel", alternate_read),
+            ("MCP3008 conversion", lambda: read_mcp3008(LOAD_CURRENT_CHANNEL))]
+    for label, function in rows:
+        print(f"  {label:<32} {statistics.median(timings(function, repeats)) * 1e6:8.0f} µs")
+
+def bench_acquisition(ticks):
+    """Runs the sensorScript readers as fast as the scheduler allows, serial and with parallel buses."""
+    sampler = make_current_sampler()
+    readers = {"i2c": read_voltages, "spi": lambda: read_currents(sampler)}
+
+    def serial():
+        readings = read_voltages()
+        readings.update(read_currents(sampler))
+        return readings
+    for label, scheduler_readers in (("serial buses", {"both": serial}), ("parallel buses", readers)):
+        samples = []
+        scheduler = AcquisitionScheduler(10000, scheduler_readers, lambda ts, readings: samples.append(readings))
+        elapsed, _ = timed(lambda: scheduler.run(max_ticks=ticks))
+        s = scheduler.stats()
+        print(f"  {label:<16} {ticks / elapsed:7.1f} samples/s, cycle {elapsed / ticks * 1000:6.2f} ms "
+              f"(longest {s['max_cycle_ms']:.2f} ms)")
+
+def bench_control(moves):
+    world = bus_backends.get_world()
+    client = ActuatorClient(bus=bus_backends.SimulatedSMBus(world=world))
+    start = time.perf_counter()
+    transactions = world.i2c_transactions
+    for k in range(moves):
+        client.move({1: 1.0 if k % 2 == 0 else -1.0, 2: 0.5})
+    elapsed = time.perf_counter() - start
+    travel = moves * 1.0 / ACTUATOR_SPEED_MM_S
+    print(f"  {moves} two-actuator moves of 1 mm: {elapsed:.2f} s ({travel:.2f} s of travel), "
+          f"{(world.i2c_transactions - transactions) / moves:.1f} I2C transactions per move")
+
+def main():
+    parser = argparse.ArgumentParser(description="Acquisition and control throughput on the simulated bus backend")
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--moves", type=int, default=5)
+    args = parser.parse_args()
+    world = bus_backends.get_world()
+    for scale in (1.0, 0.0):
+        world.latency_scale = scale
+        print(f"Modelled bus latency x{scale:g}" + (" (Python overhead only)" if scale == 0 else "") + ":")
+        bench_operations(args.repeats)
+        bench_acquisition(args.ticks)
+    world.latency_scale = 1.0
+    print("Actuator control:")
+    bench_control(args.moves)
+
+if __name__ == "__main__":
+    main()
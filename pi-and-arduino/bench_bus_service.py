@@ -0,0 +1,115 @@
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+# The service and its clients run against the simulated bench, whatever the environment says
+os.environ["CAPSTONE_BUS_BACKEND"] = "sim"
+
+from actuator_protocol import ActuatorClient
+from bench_suite import percentile, timings
+from bus_backends import SimulatedSMBus, SimulatedSpiDev, SimulatedWorld
+from bus_service import PRIORITY_TELEMETRY, ArbitratedSMBus, BusArbiter, BusServer, RemoteSMBus
+from i2c_mux import MuxedI2CBus
+from sensorScript import INA219_ADDRESS, INA219_BUS_VOLTAGE_REGISTER, decode_bus_voltage
+
+# Constant readings, so a read that lands on the wrong sensor is obvious
+VOLTAGES = {"load_voltage": 12.4, "solar_voltage": 18.0, "load_current": 1.0, "solar_current": 2.0}
+# Two clients, each reading the INA219 on its own mux channel
+CLIENT_CHANNELS = {6: VOLTAGES["load_voltage"], 4: VOLTAGES["solar_voltage"]}
+
+def make_arbiter(world, prioritize=True):
+    spi = SimulatedSpiDev(world=world)
+    spi.open(0, 0)
+    return BusArbiter(SimulatedSMBus(world=world), spi, prioritize=prioritize)
+
+def wrong_reads(make_bus, reads):
+    """Two clients with their own mux state read their channel concurrently. Returns (wrong, failed, total)."""
+    counts = {"wrong": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def client(channel, expected):
+        mux = MuxedI2CBus(bus=make_bus(), settle_s=0.0005)
+        for _ in range(reads):
+            value = mux.read_word(channel, INA219_ADDRESS, INA219_BUS_VOLTAGE_REGISTER)
+            with lock:
+                if value is None:
+                    counts["failed"] += 1
+                elif abs(decode_bus_voltage(value) - expected) > 0.01:
+                    counts["wrong"] += 1
+    threads = [threading.Thread(target=client, args=item) for item in CLIENT_CHANNELS.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts["wrong"], counts["failed"], reads * len(CLIENT_CHANNELS)
+
+def actuator_latency(world, prioritize, telemetry_threads, polls):
+    """Actuator status reads while telemetry threads keep the I2C bus busy. Returns latencies (s)."""
+    arbiter = make_arbiter(world, prioritize)
+    stop = threading.Event()
+
+    def telemetry(index):
+        mux = MuxedI2CBus(bus=ArbitratedSMBus(arbiter, f"telemetry-{index}", PRIORITY_TELEMETRY), settle_s=0.0005)
+        while not stop.is_set():
+            mux.read_word(6, INA219_ADDRESS, INA219_BUS_VOLTAGE_REGISTER)
+    threads = [threading.Thread(target=telemetry, args=(i,)) for i in range(telemetry_threads)]
+    for thread in threads:
+        thread.start()
+    client = ActuatorClient(bus=ArbitratedSMBus(arbiter, "actuator"))
+    latencies = []
+    time.sleep(0.05)
+    for _ in range(polls):
+        start = time.perf_counter()
+        client.status()
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.005)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    arbiter.close()
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Bus service: mux races, actuator priority and request overhead")
+    parser.add_argument("--reads", type=int, default=300)
+    parser.add_argument("--telemetry-threads", type=int, default=4)
+    parser.add_argument("--polls", type=int, default=200)
+    args = parser.parse_args()
+    world = SimulatedWorld(waveforms=lambda channel, t: VOLTAGES[channel])
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bus.sock")
+        arbiter = make_arbiter(world)
+        server = BusServer(arbiter, path)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            print(f"Two clients reading INA219s on mux channels {list(CLIENT_CHANNELS)} at the same time:")
+            for label, make_bus in (("each opens the bus", lambda: SimulatedSMBus(world=world)),
+                                    ("through the service", lambda: RemoteSMBus(path=path))):
+                wrong, failed, total = wrong_reads(make_bus, args.reads)
+                print(f"  {label:<20} {wrong:>5} of {total} reads from the wrong sensor, {failed} failed")
+            print(f"  Mux re-selected by the service {arbiter.reselects} times")
+
+            world.latency_scale = 0.0
+            remote = RemoteSMBus(path=path)
+            local = SimulatedSMBus(world=world)
+            direct = statistics.median(timings(lambda: local.read_i2c_block_data(0x08, 0x11, 13), 2000)) * 1e6
+            served = statistics.median(timings(lambda: remote.read_i2c_block_data(0x08, 0x11, 13), 2000)) * 1e6
+            print(f"Request overhead with no bus delay: direct {direct:.0f} µs, through the service {served:.0f} µs")
+            remote.close()
+            world.latency_scale = 1.0
+        finally:
+            server.shutdown()
+            server.server_close()
+            arbiter.close()
+
+    print(f"Actuator status reads with {args.telemetry_threads} telemetry threads saturating the I2C bus:")
+    for label, prioritize in (("arrival order", False), ("priority queue", True)):
+        latencies = actuator_latency(world, prioritize, args.telemetry_threads, args.polls)
+        print(f"  {label:<15} p50 {percentile(latencies, 0.5) * 1000:6.2f} ms, p99 {percentile(latencies, 0.99) * 1000:6.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import datetime
+import os
+import random
+import tempfile
+
+# The fleet runs against the simulated bench, whatever the environment says
+os.environ["CAPSTONE_BUS_BACKEND"] = "sim"
+
+from actuator_protocol import ArduinoSimulator
+from actuator_state import ActuatorStateStore
+from bench_actuator_protocol import VirtualClock
+from bench_suite import per_call_us
+from bus_backends import SimulatedINA219, SimulatedSMBus, SimulatedWorld, scripted_day
+from fleet import MOTOR_INRUSH_A, Fleet, FleetScheduler
+from i2c_mux import MuxedI2CBus
+from instrumentation import Metrics
+from sun_path_table import DailySunPath
+from tracker import TrackerMetrics, aim_tilts, pointing_error, target_tilts
+
+MUX_CHANNELS = 8
+FIRST_ADDRESS = 0x09  # 0x08 is the bench's own Arduino before the mux
+FIRST_SENSOR_ADDRESS = 0x41  # 0x40 is taken by the bench's INA219s on channels 4 and 6
+# A morning tick, with every tracker a little behind the sun
+WHEN = datetime.datetime(2025, 6, 21, 9, 0)
+
+def make_fleet(count, directory, sun_path, scheduler_options):
+    """
+    Builds a simulated fleet: tracker i on mux channel i % 8 with its Arduino and INA219 at the
+    next free addresses, every third tracker with a longer N-S base arm, and extensions that
+    put each tracker 2-10° off the sun. Returns (fleet, world, clock).
+    """
+    clock = VirtualClock()
+    world = SimulatedWorld(waveforms=lambda channel, t: scripted_day(channel, 1750500000 + t), clock=clock,
+                           sleep=clock.sleep)
+    mux = MuxedI2CBus(bus=SimulatedSMBus(world=world), settle_s=0.0, metrics=Metrics(enabled=False))
+    trackers = []
+    for i in range(count):
+        channel, row = i % MUX_CHANNELS, i // MUX_CHANNELS
+        world.add_device(FIRST_ADDRESS + row, ArduinoSimulator(FIRST_ADDRESS + row, clock), channel)
+        world.add_device(FIRST_SENSOR_ADDRESS + row, SimulatedINA219(world, "solar_voltage", "solar_current"), channel)
+        trackers.append({"name": f"tracker-{i:03d}", "arduino_address": FIRST_ADDRESS + row, "mux_channel": channel,
+                         "sensors": {"solar_voltage": {"channel": channel, "address": FIRST_SENSOR_ADDRESS + row}},
+                         "geometry": {"ns": {"base_mm": 44.0}} if i % 3 == 0 else {}})
+
+    rng = random.Random(count)
+    target = target_tilts(sun_path, WHEN)
+
+    def open_state(name):
+        path = os.path.join(directory, name)
+        for suffix in (".bin", "_journal.bin"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        return ActuatorStateStore(path + ".bin", path + "_journal.bin", durable=False, legacy_path=None)
+
+    scheduler = FleetScheduler(mux, clock=clock, sleep=clock.sleep, **scheduler_options)
+    fleet = Fleet({"trackers": trackers}, sun_path, state_factory=open_state, scheduler=scheduler,
+                  metrics=TrackerMetrics(os.path.join(directory, "metrics.json")), mux=mux, clock=clock,
+                  sleep=clock.sleep)
+    for tracker in fleet.trackers:
+        behind = [target[0] - rng.uniform(2.0, 7.0), target[1] - rng.uniform(2.0, 7.0)]
+        tracker.state.save({num: tracker.kinematics[num].extension(tilt) for num, tilt in zip((1, 2), behind)})
+    return fleet, world, clock
+
+def per_tracker_plan(fleet, when):
+    """The single-tracker logic of tracker.py run once per tracker, for comparison with Fleet.plan()."""
+    moves = []
+    for tracker in fleet.trackers:
+        kinematics, extensions = tracker.kinematics, tracker.state.extensions
+        current = tuple(kinematics[num].tilt(extensions[num]) for num in (1, 2))
+        if pointing_error(target_tilts(fleet.sun_path, when), current) <= fleet.deadband_deg:
+            continue
+        aim = aim_tilts(fleet.sun_path, when, fleet.deadband_deg, fleet.max_lead_s)
+        moves.append({num: kinematics[num].extension(tilt) - extensions[num] for num, tilt in zip((1, 2), aim)})
+    return moves
+
+def peak_bytes_per_s(bus_log, window_s=1.0):
+    """Largest number of bytes sent in any window_s-long window."""
+    peak, total, first = 0, 0, 0
+    for when, nbytes in bus_log:
+        total += nbytes
+        while bus_log[first][0] <= when - window_s:
+            total -= bus_log[first][1]
+            first += 1
+        peak = max(peak, total)
+    return peak / window_s
+
+def run_sequential(fleet, clock):
+    """One blocking ActuatorClient.move() per tracker, as separate tracker.py loops on one bus would do."""
+    start = clock()
+    for move in fleet.plan(WHEN):
+        move.tracker.client.move(move.moves)
+    return clock() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet mode on the simulated bench: batched targets and "
+                                                 "concurrent moves under bus and supply limits")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="fleet sizes")
+    parser.add_argument("--lat", type=float, default=33.97)
+    parser.add_argument("--lon", type=float, default=-118.42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        sun_path = DailySunPath(args.lat, args.lon, table_dir=directory)
+        sun_path.lookup(WHEN)  # build the day's table outside the timings
+
+        print("Target computation per tick (CPU):")
+        for count in args.sizes:
+            fleet, _, _ = make_fleet(count, directory, sun_path, {})
+            batch = per_call_us(lambda: fleet.plan(WHEN), 1) / 1000
+            single = per_call_us(lambda: per_tracker_plan(fleet, WHEN), 1) / 1000
+            print(f"  {count:>4} trackers: per tracker {single:8.2f} ms, batched {batch:7.2f} ms "
+                  f"({single / batch:.1f}x)")
+            fleet.close()
+
+        print("Moving every tracker back onto the sun (simulated time, modelled bus delays):")
+        print(f"  {'':<28} {'makespan':>9} {'peak supply':>12} {'peak bus':>10} {'I2C txns':>9}")
+        strategies = [("one tracker at a time", None),
+                      ("all at once", {"bus_budget_bytes_s": None, "max_supply_a": float("inf")}),
+                      ("budgeted (defaults)", {})]
+        for count in args.sizes:
+            for label, options in strategies:
+                fleet, world, clock = make_fleet(count, directory, sun_path, options or {})
+                if options is None:
+                    makespan = run_sequential(fleet, clock)
+                    supply, bus = 2 * MOTOR_INRUSH_A, None
+                else:
+                    start = clock()
+                    moves = fleet.step(WHEN)[0]
+                    makespan = clock() - start
+                    failed = sum(move.outcome != "done" for move in moves)
+                    if failed:
+                        print(f"  {failed} moves did not complete")
+                    supply, bus = fleet.scheduler.peak_supply_a, peak_bytes_per_s(fleet.scheduler.bus_log)
+                bus_text = f"{bus:>6.0f} B/s" if bus is not None else f"{'-':>10}"
+                print(f"  {count:>4} x {label:<21} {makespan:>8.2f}s {supply:>10.0f} A {bus_text} "
+                      f"{world.i2c_transactions:>9}")
+                fleet.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import contextlib
+import io
+import os
+
+# Scans run against the simulated bench, with its modelled bus delays
+os.environ["CAPSTONE_BUS_BACKEND"] = "sim"
+
+import I2CScanner
+from bench_suite import timed
+from bus_backends import SimulatedINA219, get_world
+from i2c_discovery import MUX_CHANNELS, full_scan, present_addresses, verify
+from i2c_mux import get_muxed_bus
+
+def scan_every_channel():
+    """The I2CScanner approach: all 128 addresses, one channel at a time."""
+    found = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for channel in MUX_CHANNELS:
+            found += [(channel, address) for address in I2CScanner.scan_i2c_bus(channel) or []]
+    get_muxed_bus().invalidate()
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description="I2C discovery: full scan and startup verify on the simulated bench")
+    parser.add_argument("--extra-sensors", type=int, default=0,
+                        help="INA219s to add behind the mux (0x41 up, spread over the channels)")
+    args = parser.parse_args()
+    world = get_world()
+    for i in range(args.extra_sensors):
+        world.add_device(0x41 + i // len(MUX_CHANNELS), SimulatedINA219(world, "solar_voltage", "solar_current"),
+                         i % len(MUX_CHANNELS))
+
+    before = world.i2c_transactions
+    seconds, found = timed(scan_every_channel)
+    print(f"128 addresses on each channel:  {seconds * 1000:7.1f} ms, {world.i2c_transactions - before:5} "
+          f"transactions ({len(set(address for _, address in found))} addresses found)")
+    before = world.i2c_transactions
+    seconds, devices = timed(full_scan)
+    print(f"Full scan (three passes):       {seconds * 1000:7.1f} ms, {world.i2c_transactions - before:5} "
+          f"transactions ({len(devices)} devices)")
+    before = world.i2c_transactions
+    seconds, missing = timed(lambda: verify(devices))
+    print(f"Verify the inventory at start:  {seconds * 1000:7.1f} ms, {world.i2c_transactions - before:5} "
+          f"transactions ({len(missing)} missing)")
+    before = world.i2c_transactions
+    seconds, present = timed(present_addresses)
+    print(f"New-address pass (mux all on):  {seconds * 1000:7.1f} ms, {world.i2c_transactions - before:5} "
+          f"transactions ({len(present - set(address for _, address in devices))} new)")
+
+if __name__ == "__main__":
+    main()
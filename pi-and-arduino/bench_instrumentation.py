@@ -0,0 +1,66 @@
+import argparse
+import os
+import tempfile
+import time
+
+# The sampling loop runs against the simulated bench with its delays off, so only CPU time is measured
+os.environ["CAPSTONE_BUS_BACKEND"] = "sim"
+os.environ["CAPSTONE_SIM_LATENCY_SCALE"] = "0"
+
+import i2c_mux
+from energy import EnergyAccumulator
+from instrumentation import Metrics, get_metrics
+from live_feed import LiveFeedWriter
+from rollups import RollupStore
+from sensor_log import BinarySensorLog
+from sensorScript import make_current_sampler, make_recorder, make_scheduler
+
+SAMPLE_RATE_HZ = 50
+
+def observe_cost_us(calls):
+    metrics = Metrics(enabled=True)
+    start = time.perf_counter()
+    for i in range(calls):
+        metrics.observe("stage", 0.000123)
+    return (time.perf_counter() - start) / calls * 1e6
+
+def loop_cpu_per_sample_us(directory, enabled, ticks):
+    """CPU time per sample of the full sampling loop, with the shared metrics registry on or off."""
+    metrics = get_metrics()
+    metrics.enabled = enabled
+    metrics.path = os.path.join(directory, "metrics.prom")
+    i2c_mux.get_muxed_bus().invalidate()
+    binary_log = BinarySensorLog(os.path.join(directory, f"log_{enabled}"))
+    energy = EnergyAccumulator(os.path.join(directory, "energy_state.json"))
+    rollups = RollupStore(os.path.join(directory, f"rollups_{enabled}"))
+    live_feed = LiveFeedWriter(os.path.join(directory, "live_feed"))
+    scheduler = make_scheduler(100000, make_current_sampler(),
+                               make_recorder(binary_log, energy, rollups, live_feed, echo=False))
+    start = time.process_time()
+    scheduler.run(max_ticks=ticks)
+    cpu = time.process_time() - start
+    binary_log.close()
+    rollups.close()
+    live_feed.close()
+    return cpu / ticks * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of the sampling-loop instrumentation")
+    parser.add_argument("--ticks", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    print(f"Metrics.observe: {observe_cost_us(200000):.2f} µs per call")
+    with tempfile.TemporaryDirectory() as directory:
+        results = {False: [], True: []}
+        for _ in range(args.rounds):
+            for enabled in (False, True):
+                results[enabled].append(loop_cpu_per_sample_us(directory, enabled, args.ticks))
+        off, on = min(results[False]), min(results[True])
+        observations = sum(h.count for h in get_metrics().stages.values()) / (args.ticks * args.rounds)
+        print(f"Sampling loop CPU per sample: {off:.0f} µs without metrics, {on:.0f} µs with "
+              f"({observations:.0f} observations per sample)")
+        print(f"Overhead at {SAMPLE_RATE_HZ} Hz: {(on - off) * SAMPLE_RATE_HZ / 1e4:.3f}% of one core")
+        print(get_metrics().format_summary())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import datetime
+import math
+import time
+
+import numpy as np
+
+from kinematics import ACTUATOR_AXES, AxisKinematics, AXIS_GEOMETRY, extension_schedule, get_axis
+
+def exact_tilt(axis, extension):
+    """Closed-form inverse of the law of cosines, the per-call trig the tables replace."""
+    length = axis.flat_length + extension
+    cos_angle = (axis.base_mm ** 2 + axis.panel_mm ** 2 - length ** 2) / (2 * axis.base_mm * axis.panel_mm)
+    return math.degrees(math.acos(cos_angle)) - axis.flat_angle_deg
+
+def time_per_call(function, values):
+    start = time.perf_counter()
+    for value in values:
+        function(value)
+    return (time.perf_counter() - start) / len(values) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Kinematics table accuracy and speed")
+    parser.add_argument("--lat", type=float, default=33.97)
+    parser.add_argument("--lon", type=float, default=-118.42)
+    args = parser.parse_args()
+
+    for name, geometry in AXIS_GEOMETRY.items():
+        start = time.perf_counter()
+        AxisKinematics(**geometry)
+        build_ms = (time.perf_counter() - start) * 1000
+        axis = get_axis(name)
+        limit = axis.tilt_limit_deg
+        tilts = np.random.default_rng(0).uniform(-limit, limit, 20000)
+        exact_mm = np.array([axis.length(t) - axis.flat_length for t in tilts])
+        forward_error = np.abs(axis.extensions(tilts) - exact_mm).max()
+        inverse_error = np.abs(axis.tilts(exact_mm) - tilts).max()
+        round_trip = max(abs(axis.tilt(axis.extension(t)) - t) for t in tilts[:2000].tolist())
+        values = exact_mm[:2000].tolist()
+        print(f"{name}: ±{limit:.0f}° -> {axis.min_extension:+.2f} to {axis.max_extension:+.2f} mm, "
+              f"tables built in {build_ms:.1f} ms")
+        print(f"  max error vs law of cosines: forward {forward_error:.1e} mm, inverse {inverse_error:.1e}°, "
+              f"round trip {round_trip:.1e}°")
+        print(f"  inverse per call: table {time_per_call(axis.tilt, values):.2f} us, "
+              f"acos {time_per_call(lambda mm: exact_tilt(axis, mm), values):.2f} us")
+
+    day = np.datetime64(datetime.date(2025, 6, 21), "ms")
+    times = day + np.arange(0, 86400, 60) * np.timedelta64(1000, "ms")
+    start = time.perf_counter()
+    schedule = extension_schedule(times, args.lat, args.lon)
+    total_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for num, axis in ACTUATOR_AXES.items():
+        get_axis(axis).extensions(schedule[f"{axis}_tilt"])
+    kinematics_ms = (time.perf_counter() - start) * 1000
+    print(f"Whole-day schedule ({len(times)} steps): {total_ms:.1f} ms including sun angles, "
+          f"{kinematics_ms:.2f} ms for the tilt -> extension step, "
+          + ", ".join(f"actuator {num} {schedule[num].min():+.1f} to {schedule[num].max():+.1f} mm"
+                      for num in ACTUATOR_AXES))
+
+if __name__ == "__main__":
+    main()
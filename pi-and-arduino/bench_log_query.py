@@ -0,0 +1,90 @@
+import argparse
+import datetime
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from log_query import LogQuery, TextLogIndex, get_text_log_path
+from sensor_log import BinarySensorLog, parse_text_log
+
+def generate_year(directory, days, interval_s, text):
+    """Writes days of synthetic logs, one sample every interval_s seconds. Returns the number of samples."""
+    count = 0
+    first = datetime.date(2025, 1, 1)
+    log = None if text else BinarySensorLog(directory, flush_interval_s=float("inf"))
+    for d in range(days):
+        date = first + datetime.timedelta(days=d)
+        midnight = datetime.datetime.combine(date, datetime.time()).timestamp()
+        timestamps = midnight + np.arange(0, 86400, interval_s)
+        solar = np.clip(np.sin((timestamps - midnight) / 86400 * 2 * np.pi - np.pi / 2), 0, None) * 5
+        if text:
+            lines = []
+            for timestamp, current in zip(timestamps, solar):
+                stamp = datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+                lines.append(f"{stamp}, Load Voltage: 12.000 V\n{stamp}, Solar Voltage: 18.500 V\n"
+                             f"{stamp}, Load Current: 1.250 A\n{stamp}, Solar Current: {current:.3f} A\n")
+            with open(get_text_log_path(directory, date), "w") as f:
+                f.writelines(lines)
+        else:
+            for timestamp, current in zip(timestamps.tolist(), solar.tolist()):
+                log.append(timestamp, {"load_voltage": 12.0, "solar_voltage": 18.5,
+                                       "load_current": 1.25, "solar_current": current})
+        count += len(timestamps)
+    if log is not None:
+        log.close()
+    return count
+
+def time_queries(query, windows, channels):
+    """Returns the median milliseconds to fetch each window as arrays."""
+    times = []
+    for start, end in windows:
+        t = time.perf_counter()
+        query.arrays(start, end, channels)
+        times.append((time.perf_counter() - t) * 1000)
+    return statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser(description="Point and range query benchmark over a year of logs")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between synthetic samples")
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    first = datetime.datetime(2025, 1, 1).timestamp()
+
+    def random_windows(length_s):
+        starts = first + rng.uniform(0, args.days * 86400 - length_s, args.queries)
+        return [(s, s + length_s) for s in starts]
+
+    for fmt in ("text", "binary"):
+        with tempfile.TemporaryDirectory() as directory:
+            t = time.perf_counter()
+            samples = generate_year(directory, args.days, args.interval, fmt == "text")
+            size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+            print(f"{fmt}: {samples:,} samples over {args.days} days, {size / 1e6:.1f} MB "
+                  f"(generated in {time.perf_counter() - t:.1f} s)")
+
+            if fmt == "text":
+                t = time.perf_counter()
+                for name in sorted(os.listdir(directory)):
+                    TextLogIndex(os.path.join(directory, name)).update()
+                print(f"  index build for all files: {time.perf_counter() - t:.2f} s")
+
+                # Baseline: answer a point query by parsing the whole day's file
+                start, end = random_windows(args.interval)[0]
+                path = get_text_log_path(directory, datetime.date.fromtimestamp(start))
+                t = time.perf_counter()
+                [r for ts, r in parse_text_log(path) if start <= ts < end]
+                print(f"  full-file scan for one point: {(time.perf_counter() - t) * 1000:.1f} ms")
+
+            query = LogQuery(directory)
+            point = time_queries(query, random_windows(args.interval), ["solar_current"])
+            two_hours = time_queries(query, random_windows(2 * 3600), ["solar_voltage", "solar_current"])
+            week = time_queries(query, random_windows(7 * 86400), ["solar_current"])
+            print(f"  point query: {point:.2f} ms, 2 h range: {two_hours:.2f} ms, 1 week range: {week:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from sensor_log import BinarySensorLog, convert_text_log, parse_text_log, read_log, RECORD_SIZE
+from sensorScript import format_sample
+
+def make_samples(n, start=1735718400.0):
+    """Returns n synthetic samples one second apart."""
+    return [(start + i, {"load_voltage": 12.0 + (i % 7) * 0.01, "solar_voltage": 18.5 - (i % 11) * 0.01,
+                         "load_current": 1.25 + (i % 5) * 0.01, "solar_current": 2.5 - (i % 3) * 0.01})
+            for i in range(n)]
+
+def write_text(directory, samples):
+    """The original sensorScript writer: open, append four lines and close for every sample."""
+    path = os.path.join(directory, "sensor_data_2025-01-01.txt")
+    for timestamp, readings in samples:
+        with open(path, "a") as f:
+            for line in format_sample(timestamp, readings):
+                f.write(line + "\n")
+    return path
+
+def write_binary(directory, samples, flush_interval_s, fsync):
+    log = BinarySensorLog(directory, flush_interval_s=flush_interval_s, fsync=fsync)
+    for timestamp, readings in samples:
+        log.append(timestamp, readings)
+    log.close()
+    return log.path
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Text vs binary sensor log throughput")
+    parser.add_argument("--samples", type=int, default=50_000)
+    args = parser.parse_args()
+    samples = make_samples(args.samples)
+
+    with tempfile.TemporaryDirectory() as text_dir, tempfile.TemporaryDirectory() as binary_dir:
+        text_time, text_path = timed(write_text, text_dir, samples)
+        print(f"{'writer':<28} {'samples/s':>12} {'bytes/sample':>13}")
+        print(f"{'text (open per sample)':<28} {args.samples / text_time:>12,.0f} "
+              f"{os.path.getsize(text_path) / args.samples:>13.1f}")
+
+        for label, flush_interval_s, fsync in (("binary, flush every 5 s", 5.0, False),
+                                               ("binary, flush every sample", 0.0, False),
+                                               ("binary, fsync every 1 s", 1.0, True)):
+            with tempfile.TemporaryDirectory() as directory:
+                binary_time, binary_path = timed(write_binary, directory, samples, flush_interval_s, fsync)
+                size = os.path.getsize(binary_path)
+            print(f"{label:<28} {args.samples / binary_time:>12,.0f} {size / args.samples:>13.1f}")
+
+        convert_time, _ = timed(convert_text_log, text_path, binary_dir)
+        print(f"Converted text log in {convert_time:.2f} s")
+
+        parse_time, parsed = timed(lambda: sum(r["solar_current"] for _, r in parse_text_log(text_path)))
+        binary_path = os.path.join(binary_dir, sorted(os.listdir(binary_dir))[0])
+        read_time, total = timed(lambda: float(np.sum(read_log(binary_path)["solar_current"], dtype=np.float64)))
+        print(f"Sum of solar current: text parse {parse_time * 1000:.1f} ms, memmap read {read_time * 1000:.2f} ms "
+              f"({parsed:.1f} vs {total:.1f})")
+        print(f"Record size: {RECORD_SIZE} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import datetime
+import time
+
+import numpy as np
+
+from optimal_angles import (calculate_declination, calculate_hour_angle, calculate_altitude_angle,
+                            calculate_azimuth_angle, calculate_optimal_tilts, calculate_solar_angles_batch)
+
+# Fixed site so the benchmark never needs the network or the timezone lookup
+LATITUDE = 33.97   # LMU campus
+LONGITUDE = -118.42
+UTC_OFFSET = -8.0
+
+# Python loops get slow past 10^5 points, so larger sizes are extrapolated from this many
+MAX_LOOP_POINTS = 100_000
+
+def make_timestamps(n):
+    """Returns n whole-minute timestamps spread over a year (the scalar API has minute resolution)."""
+    start = np.datetime64("2025-01-01T00:00")
+    return start + np.arange(n) % (365 * 24 * 60) * np.timedelta64(1, "m")
+
+def scalar_loop(timestamps):
+    """Runs the existing scalar functions once per timestamp."""
+    results = []
+    for ts in timestamps.astype(datetime.datetime):
+        day_of_year = ts.timetuple().tm_yday
+        declination = calculate_declination(day_of_year)
+        hour_angle = calculate_hour_angle(ts.hour, ts.minute, day_of_year, LATITUDE, LONGITUDE, UTC_OFFSET)
+        altitude = calculate_altitude_angle(LATITUDE, declination, hour_angle)
+        try:
+            azimuth = calculate_azimuth_angle(LATITUDE, declination, altitude, hour_angle)
+        except ValueError:
+            azimuth = float("nan")  # acos rounding error right at the meridian
+        ns_tilt, ew_tilt = calculate_optimal_tilts(altitude, azimuth)
+        results.append((altitude, azimuth, ns_tilt, ew_tilt))
+    return np.array(results)
+
+def check_matches_scalar(n=20_000):
+    """Compares the batch output against the scalar functions and returns the max abs error per field."""
+    timestamps = make_timestamps(n)
+    expected = scalar_loop(timestamps)
+    batch = calculate_solar_angles_batch(timestamps, LATITUDE, LONGITUDE, UTC_OFFSET)
+    errors = {}
+    for i, key in enumerate(("altitude", "azimuth", "ns_tilt", "ew_tilt")):
+        valid = ~np.isnan(expected[:, i])
+        errors[key] = float(np.max(np.abs(batch[key][valid] - expected[valid, i])))
+    return errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch vs scalar solar-angle benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**5, 10**6, 10**7])
+    args = parser.parse_args()
+
+    errors = check_matches_scalar()
+    print("Max abs difference vs scalar: " + ", ".join(f"{k}={v:.2e}" for k, v in errors.items()))
+    assert max(errors.values()) < 1e-6, "batch results diverge from the scalar functions"
+
+    print(f"{'points':>10} {'loop (s)':>10} {'batch (s)':>10} {'speedup':>8}")
+    for n in args.sizes:
+        timestamps = make_timestamps(n)
+
+        loop_n = min(n, MAX_LOOP_POINTS)
+        start = time.perf_counter()
+        scalar_loop(timestamps[:loop_n])
+        loop_time = (time.perf_counter() - start) * n / loop_n
+
+        start = time.perf_counter()
+        calculate_solar_angles_batch(timestamps, LATITUDE, LONGITUDE, UTC_OFFSET)
+        batch_time = time.perf_counter() - start
+
+        note = "" if loop_n == n else " (loop extrapolated)"
+        print(f"{n:>10} {loop_time:>10.3f} {batch_time:>10.3f} {loop_time / batch_time:>7.0f}x{note}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+
+import numpy as np
+
+from bench_suite import per_call_us, timed
+from optimal_angles import (calculate_declination, calculate_hour_angle, calculate_altitude_angle,
+                            calculate_azimuth_angle, calculate_solar_angles_batch)
+from solar_spa import CachedSolarPosition, spa_position
+
+# Fixed site so the benchmark never needs the network or the timezone lookup (same as bench_solar_batch.py)
+LATITUDE = 33.97
+LONGITUDE = -118.42
+UTC_OFFSET = -8.0
+YEAR_START = np.datetime64("2025-01-01T00:00")
+
+def angular_error(alt1, az1, alt2, az2):
+    """Great-circle angle (degrees) between two sun positions, elementwise."""
+    alt1, az1, alt2, az2 = (np.radians(np.asarray(v, dtype=float)) for v in (alt1, az1, alt2, az2))
+    cos_angle = np.sin(alt1) * np.sin(alt2) + np.cos(alt1) * np.cos(alt2) * np.cos(az1 - az2)
+    return np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+
+def formula_scalar(day_of_year, hour, minute):
+    declination = calculate_declination(day_of_year)
+    hour_angle = calculate_hour_angle(hour, minute, day_of_year, LATITUDE, LONGITUDE, UTC_OFFSET)
+    altitude = calculate_altitude_angle(LATITUDE, declination, hour_angle)
+    try:
+        return altitude, calculate_azimuth_angle(LATITUDE, declination, altitude, hour_angle)
+    except ValueError:
+        return altitude, float("nan")  # acos rounding error right at the meridian
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy and speed of the cached SPA against the full SPA "
+                                                 "and the existing formula")
+    parser.add_argument("--points", type=int, default=5000, help="random instants over 2025 checked against the full SPA")
+    args = parser.parse_args()
+    rng = np.random.default_rng(2025)
+    # Whole minutes, so the scalar formula (minute resolution) sees the same instants
+    local = YEAR_START + np.sort(rng.integers(0, 365 * 1440, args.points)) * np.timedelta64(1, "m")
+    unix_times = (local - np.datetime64("1970-01-01T00:00")) / np.timedelta64(1, "s") - UTC_OFFSET * 3600
+
+    seconds, reference = timed(lambda: np.array([spa_position(t, LATITUDE, LONGITUDE) for t in unix_times]))
+    full_us = seconds / len(unix_times) * 1e6
+    cached = CachedSolarPosition(LATITUDE, LONGITUDE)
+    seconds, scalar = timed(lambda: np.array([cached.position(t) for t in unix_times]))
+    first_us = seconds / len(unix_times) * 1e6
+    batch_spa = calculate_solar_angles_batch(local, LATITUDE, LONGITUDE, UTC_OFFSET, mode="spa")
+    formula = calculate_solar_angles_batch(local, LATITUDE, LONGITUDE, UTC_OFFSET, mode="formula")
+
+    day = reference[:, 0] > 0
+    print(f"Error against the full SPA, {args.points} instants over 2025 ({day.sum()} with the sun up):")
+    for label, altitude, azimuth in (("cached SPA, scalar", scalar[:, 0], scalar[:, 1]),
+                                     ("cached SPA, batch", batch_spa["altitude"], batch_spa["azimuth"]),
+                                     ("formula (optimal_angles)", formula["altitude"], formula["azimuth"])):
+        error = angular_error(altitude[day], azimuth[day], reference[day, 0], reference[day, 1])
+        altitude_error = np.abs(altitude - reference[:, 0])
+        print(f"  {label:<26} sun up: max {error.max():.1e}°, mean {error.mean():.1e}°; "
+              f"altitude any time: max {altitude_error.max():.1e}°")
+
+    # Per-call cost on a warm cache (one node set per UTC day, as a tracker running for a day would have)
+    one_day = [t for t in unix_times[:1]] + list(unix_times[0] + np.arange(2000) * 30.0)
+    dates = [(d.timetuple().tm_yday, d.hour, d.minute) for d in local[:2000].astype(object)]
+    cached_day = CachedSolarPosition(LATITUDE, LONGITUDE)
+    for t in one_day:
+        cached_day.position(t)
+    print("Cost per call:")
+    formula_us = per_call_us(lambda: [formula_scalar(*date) for date in dates], 1, rounds=3) / len(dates)
+    warm_us = per_call_us(lambda: [cached_day.position(t) for t in one_day], 1, rounds=3) / len(one_day)
+    print(f"  formula (scalar chain)     {formula_us:8.2f} µs")
+    print(f"  cached SPA, warm           {warm_us:8.2f} µs")
+    print(f"  cached SPA, over the year  {first_us:8.2f} µs (including {cached.nodes_computed} node computations)")
+    print(f"  full SPA                   {full_us:8.2f} µs")
+    seconds, _ = timed(lambda: CachedSolarPosition(LATITUDE, LONGITUDE).nodes(int(unix_times[0] // 86400)))
+    print(f"  node set for one UTC day   {seconds * 1000:8.2f} ms")
+
+    minutes = YEAR_START + np.arange(365 * 1440) * np.timedelta64(1, "m")
+    # The first spa run computes the year's nodes (CACHED_DAYS keeps only the last few, so a
+    # second run over the year would compute them again); a day of minutes shows the warm cost
+    for label, times in (("a year of minutes", minutes), ("a day of minutes", minutes[-1440:])):
+        for mode in ("formula", "spa"):
+            elapsed, _ = timed(lambda: calculate_solar_angles_batch(times, LATITUDE, LONGITUDE, UTC_OFFSET, mode=mode))
+            print(f"  batch, {label:<18} {mode:<8} {elapsed / len(times) * 1e9:6.0f} ns per point "
+                  f"({elapsed * 1000:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
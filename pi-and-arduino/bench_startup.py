@@ -0,0 +1,88 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Startup budgets (seconds, including interpreter start) on a Raspberry Pi 4
+TARGET_FIRST_ANGLE_S = 1.0
+TARGET_FIRST_SAMPLE_S = 0.3
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Each snippet runs in a fresh interpreter, timed from process launch to exit
+FIRST_ANGLE = """
+from optimal_angles import (calculate_declination, calculate_hour_angle, calculate_altitude_angle,
+                            get_utc_offset)
+day_of_year = 172
+declination = calculate_declination(day_of_year)
+hour_angle = calculate_hour_angle(12, 0, day_of_year, 33.97, -118.42, get_utc_offset(33.97, -118.42))
+calculate_altitude_angle(33.97, declination, hour_angle)
+"""
+
+FIRST_SAMPLE = """
+from sensorScript import read_mcp3008, get_current, ACS712_LOAD_SENSITIVITY, LOAD_CURRENT_CHANNEL
+get_current(read_mcp3008(LOAD_CURRENT_CHANNEL), ACS712_LOAD_SENSITIVITY)
+"""
+
+IMPORT_ONLY = "import {module}"
+
+def time_snippet(code, runs):
+    """Returns (median seconds from process launch to exit, None), or (None, error) if the snippet failed."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", code], cwd=SCRIPT_DIR, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        times.append(elapsed)
+    return statistics.median(times), None
+
+def import_times(code):
+    """Returns {module: cumulative microseconds} from python -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=SCRIPT_DIR, capture_output=True, text=True)
+    entries = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                entries[name.strip()] = int(cumulative)
+    return entries
+
+def slowest_imports(module, count):
+    """Returns the slowest (cumulative microseconds, module) pairs imported by a module, excluding interpreter startup."""
+    startup = import_times("pass")
+    entries = [(us, name) for name, us in import_times(f"import {module}").items() if name not in startup]
+    return sorted(entries, reverse=True)[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description="Time from interpreter start to first angle and first sample")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline, _ = time_snippet("pass", args.runs)
+    print(f"Bare interpreter start: {baseline * 1000:.0f} ms")
+
+    for module in ("optimal_angles", "sensorScript", "CurrentSensorTest", "test"):
+        elapsed, error = time_snippet(IMPORT_ONLY.format(module=module), args.runs)
+        status = f"{elapsed * 1000:.0f} ms" if error is None else f"failed: {error}"
+        print(f"import {module}: {status}")
+
+    for name, code, target in (("first angle", FIRST_ANGLE, TARGET_FIRST_ANGLE_S),
+                               ("first sample", FIRST_SAMPLE, TARGET_FIRST_SAMPLE_S)):
+        elapsed, error = time_snippet(code, args.runs)
+        if error is not None:
+            print(f"Time to {name}: skipped ({error})")
+            continue
+        verdict = "OK" if elapsed <= target else "OVER BUDGET"
+        print(f"Time to {name}: {elapsed * 1000:.0f} ms (target {target * 1000:.0f} ms) {verdict}")
+
+    print("Slowest imports for optimal_angles (cumulative):")
+    for cumulative, name in slowest_imports("optimal_angles", 5):
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
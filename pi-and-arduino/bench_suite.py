@@ -0,0 +1,285 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(SCRIPT_DIR, "bench_results")
+
+# Fixed site so nothing needs the network or the timezone lookup (same as bench_solar_batch.py)
+LATITUDE = 33.97
+LONGITUDE = -118.42
+UTC_OFFSET = -8.0
+
+# A change bigger than this (percent, in the worse direction) is flagged by --compare
+REGRESSION_THRESHOLD_PCT = 10.0
+
+# Timing helpers shared by the bench_*.py scripts
+
+def timed(function):
+    """Runs function once. Returns (seconds, its result)."""
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def timings(function, repeats, calls=1):
+    """Returns repeats timings (seconds), each the mean time per call over calls back-to-back calls."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        times.append((time.perf_counter() - start) / calls)
+    return times
+
+def per_call_us(function, calls, rounds=5):
+    """Returns the best of rounds of the mean time per call (µs). Best-of filters out scheduler noise."""
+    return min(timings(function, rounds, calls)) * 1e6
+
+def percentile(values, p):
+    """Nearest-rank percentile of values, p from 0 to 1."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+def bench_angles(quick):
+    """Scalar solar-angle chain per call and the NumPy batch API per point."""
+    import numpy as np
+    from optimal_angles import (calculate_declination, calculate_hour_angle, calculate_altitude_angle,
+                                calculate_azimuth_angle, calculate_optimal_tilts, calculate_solar_angles_batch)
+
+    def scalar():
+        declination = calculate_declination(172)
+        hour_angle = calculate_hour_angle(10, 30, 172, LATITUDE, LONGITUDE, UTC_OFFSET)
+        altitude = calculate_altitude_angle(LATITUDE, declination, hour_angle)
+        azimuth = calculate_azimuth_angle(LATITUDE, declination, altitude, hour_angle)
+        return calculate_optimal_tilts(altitude, azimuth)
+    points = 10**5 if quick else 10**6
+    timestamps = np.datetime64("2025-01-01T00:00") + np.arange(points) % (365 * 1440) * np.timedelta64(1, "m")
+    start = time.perf_counter()
+    calculate_solar_angles_batch(timestamps, LATITUDE, LONGITUDE, UTC_OFFSET)
+    batch_s = time.perf_counter() - start
+    return {"scalar_chain_us": per_call_us(scalar, 2000 if quick else 20000),
+            "batch_ns_per_point": batch_s / points * 1e9,
+            "batch_points_per_s": points / batch_s}
+
+def bench_spa(quick):
+    """Cached SPA per call on a warm cache, the full SPA per call and the batch API in SPA mode per point."""
+    import numpy as np
+    from optimal_angles import calculate_solar_angles_batch
+    from solar_spa import CachedSolarPosition, spa_position
+
+    times = (1750500000.0 + np.arange(200 if quick else 2000) * 30.0).tolist()
+    cached = CachedSolarPosition(LATITUDE, LONGITUDE)
+    for t in times:
+        cached.position(t)
+    minutes = np.datetime64("2025-06-21T00:00") + np.arange(1440) * np.timedelta64(1, "m")
+    calculate_solar_angles_batch(minutes, LATITUDE, LONGITUDE, UTC_OFFSET, mode="spa")  # the day's nodes
+    rounds = 2 if quick else 5
+    return {"cached_warm_us": per_call_us(lambda: [cached.position(t) for t in times], 1, rounds) / len(times),
+            "full_spa_us": per_call_us(lambda: [spa_position(t, LATITUDE, LONGITUDE) for t in times[:200]], 1,
+                                       rounds) / 200,
+            "batch_ns_per_point": per_call_us(lambda: calculate_solar_angles_batch(minutes, LATITUDE, LONGITUDE,
+                                                                                   UTC_OFFSET, mode="spa"),
+                                              1, rounds) / len(minutes) * 1000}
+
+def bench_fleet(directory):
+    """Targets for a 100-tracker fleet per tick and the budgeted move back onto the sun (simulated time)."""
+    from bench_fleet import WHEN, make_fleet, per_tracker_plan
+    from sun_path_table import DailySunPath
+
+    sun_path = DailySunPath(LATITUDE, LONGITUDE, table_dir=directory)
+    sun_path.lookup(WHEN)  # build the day's table outside the timings
+    fleet, _, _ = make_fleet(100, directory, sun_path, {})
+    results = {"plan_batched_ms": per_call_us(lambda: fleet.plan(WHEN), 1) / 1000,
+               "plan_per_tracker_ms": per_call_us(lambda: per_tracker_plan(fleet, WHEN), 1) / 1000}
+    fleet.close()
+    fleet, world, clock = make_fleet(100, directory, sun_path, {})
+    start = clock()
+    fleet.step(WHEN)
+    results.update({"move_makespan_s": clock() - start, "move_i2c_transactions": world.i2c_transactions})
+    fleet.close()
+    return results
+
+def bench_discovery():
+    """Full scan, startup verify and the new-address pass on the simulated bench, with its modelled bus delays."""
+    from bus_backends import get_world
+    from i2c_discovery import full_scan, present_addresses, verify
+    from i2c_mux import get_muxed_bus
+
+    world = get_world()
+    get_muxed_bus().invalidate()
+    before = world.i2c_transactions
+    scan_s, devices = timed(full_scan)
+    results = {"full_scan_ms": scan_s * 1000, "full_scan_transactions": world.i2c_transactions - before}
+    before = world.i2c_transactions
+    results["verify_ms"] = timed(lambda: verify(devices))[0] * 1000
+    results["verify_transactions"] = world.i2c_transactions - before
+    results["new_address_pass_ms"] = timed(present_addresses)[0] * 1000
+    return results
+
+def bench_conversions(quick):
+    """ADC code to Amperes and INA219 register decoding."""
+    from mcp3008_sampler import build_current_table
+    from sensorScript import ACS712_LOAD_SENSITIVITY, ACS712_VCC, decode_bus_voltage, get_current
+
+    table = build_current_table(ACS712_LOAD_SENSITIVITY, ACS712_VCC)
+    calls = 20000 if quick else 200000
+    return {"get_current_us": per_call_us(lambda: get_current(517, ACS712_LOAD_SENSITIVITY), calls),
+            "current_table_lookup_us": per_call_us(lambda: table[517], calls),
+            "decode_bus_voltage_us": per_call_us(lambda: decode_bus_voltage(0x5D42), calls)}
+
+def bench_logging(directory, quick):
+    """Sample write throughput of the binary log and the original text writer."""
+    from sensor_log import BinarySensorLog
+    from sensorScript import format_sample
+
+    samples = 20000 if quick else 100000
+    start_ts = 1735718400.0
+    readings = {"load_voltage": 12.41, "solar_voltage": 18.52, "load_current": 1.27, "solar_current": 2.49}
+    log = BinarySensorLog(os.path.join(directory, "binary"), flush_interval_s=5.0)
+    start = time.perf_counter()
+    for i in range(samples):
+        log.append(start_ts + i, readings)
+    log.close()
+    binary_s = time.perf_counter() - start
+
+    text_samples = samples // 10  # open-append-close per sample is slow enough that fewer suffice
+    path = os.path.join(directory, "sensor_data_2025-01-01.txt")
+    start = time.perf_counter()
+    for i in range(text_samples):
+        with open(path, "a") as f:
+            for line in format_sample(start_ts + i, readings):
+                f.write(line + "\n")
+    text_s = time.perf_counter() - start
+    return {"binary_samples_per_s": samples / binary_s, "text_samples_per_s": text_samples / text_s}
+
+def bench_sampling_loop(directory, rate_hz, ticks, saturated=False):
+    """
+    Runs the sensorScript sampling loop (scheduler, parallel bus reads, live feed, energy,
+    rollups, binary log) on the simulated bus with its modelled latency.
+
+    With saturated=True the rate is far above what the loop can keep up with, so only the
+    throughput and cycle times mean anything.
+    """
+    import hardware
+    from energy import EnergyAccumulator
+    from i2c_mux import get_muxed_bus
+    from instrumentation import get_metrics
+    from live_feed import LiveFeedWriter
+    from rollups import RollupStore
+    from sensor_log import BinarySensorLog
+    from sensorScript import make_current_sampler, make_recorder, make_scheduler
+
+    binary_log = BinarySensorLog(os.path.join(directory, "loop"))
+    energy = EnergyAccumulator(os.path.join(directory, "energy_state.json"))
+    rollups = RollupStore(os.path.join(directory, "rollups"))
+    live_feed = LiveFeedWriter(os.path.join(directory, "live_feed"))
+    get_metrics().path = os.path.join(directory, "metrics.prom")
+    get_muxed_bus().invalidate()
+    sampler = make_current_sampler()
+    scheduler = make_scheduler(rate_hz, sampler, make_recorder(binary_log, energy, rollups, live_feed, echo=False))
+    start = time.perf_counter()
+    try:
+        scheduler.run(max_ticks=ticks)
+    finally:
+        elapsed = time.perf_counter() - start
+        binary_log.close()
+        rollups.close()
+        live_feed.close()
+        hardware.close()
+    s = scheduler.stats()
+    if saturated:
+        return {"samples_per_s": s["ticks"] / elapsed, "p50_cycle_ms": s["p50_cycle_ms"],
+                "p99_cycle_ms": s["p99_cycle_ms"], "max_cycle_ms": s["max_cycle_ms"]}
+    return {"rate_hz": rate_hz, "samples_per_s": s["ticks"] / elapsed, "missed_deadlines": s["missed_deadlines"],
+            "p50_cycle_ms": s["p50_cycle_ms"], "p99_cycle_ms": s["p99_cycle_ms"], "max_cycle_ms": s["max_cycle_ms"],
+            "p50_jitter_ms": s["p50_jitter_ms"], "p99_jitter_ms": s["p99_jitter_ms"],
+            "max_jitter_ms": s["max_jitter_ms"]}
+
+def git_revision():
+    """Returns `git describe --always --dirty` for this tree, or None outside a git checkout."""
+    try:
+        result = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=SCRIPT_DIR,
+                                capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+def lower_is_better(metric):
+    return not (metric.endswith("_per_s") or metric == "rate_hz")
+
+def is_gated(metric):
+    """Worst-case values hinge on one unlucky tick, so they are reported but never flagged."""
+    return not metric.startswith("max_") and metric != "rate_hz"
+
+def compare(baseline, current, threshold_pct):
+    """Prints every metric against the baseline and returns the number of regressions."""
+    regressions = 0
+    print(f"Compared with {baseline['meta'].get('revision')} ({baseline['meta'].get('created')}):")
+    for group, metrics in current["results"].items():
+        for metric, value in metrics.items():
+            old = baseline["results"].get(group, {}).get(metric)
+            if old is None or metric == "rate_hz":
+                continue
+            if old:
+                change = (value - old) / old * 100
+            else:
+                change = 0.0 if not value else float("inf")  # e.g. missed deadlines appearing
+            worse = is_gated(metric) and (change > threshold_pct if lower_is_better(metric) else change < -threshold_pct)
+            regressions += worse
+            flag = "  REGRESSION" if worse else ""
+            print(f"  {group + '.' + metric:<40} {old:>12.4g} -> {value:>12.4g} {change:+7.1f}%{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite: solar angles, the SPA, fleet planning, I2C "
+                                                 "discovery, conversions, logging and the sampling loop on the "
+                                                 "simulated bus. Results are saved as JSON.")
+    parser.add_argument("--output", help=f"result file (default {RESULTS_DIR}/<revision>.json)")
+    parser.add_argument("--compare", metavar="JSON", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD_PCT,
+                        help="percent change flagged as a regression")
+    parser.add_argument("--rate", type=float, default=50.0, help="sampling loop rate (Hz)")
+    parser.add_argument("--ticks", type=int, default=500, help="sampling loop ticks")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, for a fast check")
+    args = parser.parse_args()
+    # The acquisition loop runs against the simulated bench, whatever the environment says
+    os.environ["CAPSTONE_BUS_BACKEND"] = "sim"
+
+    revision = git_revision()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, run in (("angles", lambda: bench_angles(args.quick)),
+                          ("spa", lambda: bench_spa(args.quick)),
+                          ("fleet", lambda: bench_fleet(directory)),
+                          ("discovery", bench_discovery),
+                          ("conversions", lambda: bench_conversions(args.quick)),
+                          ("logging", lambda: bench_logging(directory, args.quick)),
+                          ("sampling_loop", lambda: bench_sampling_loop(directory, args.rate, args.ticks)),
+                          ("sampling_capacity", lambda: bench_sampling_loop(directory, 10000.0, args.ticks, saturated=True))):
+            results[name] = run()
+            print(f"{name}: " + ", ".join(f"{metric}={value:.4g}" for metric, value in results[name].items()))
+
+    report = {"meta": {"revision": revision, "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                       "python": platform.python_version(), "machine": platform.machine(),
+                       "platform": platform.platform(), "quick": args.quick},
+              "results": results}
+    output = args.output or os.path.join(RESULTS_DIR, f"{revision or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output + ".tmp", "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(output + ".tmp", output)
+    print(f"Saved {output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        sys.exit(1 if compare(baseline, report, args.threshold) else 0)
+
+if __name__ == "__main__":
+    main()
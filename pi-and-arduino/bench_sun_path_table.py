@@ -0,0 +1,77 @@
+import argparse
+import datetime
+import tempfile
+import time
+
+import numpy as np
+
+from optimal_angles import calculate_solar_angles_batch
+from sun_path_table import DailySunPath, SunPathTable
+
+LATITUDE = 33.97   # LMU campus
+LONGITUDE = -118.42
+
+def error_bounds(resolution_s, days, samples_per_day, rng):
+    """
+    Returns the max abs interpolation error (degrees) against the direct formulas, per field.
+
+    Only daylight samples count: near the nadir at night the azimuth swings through
+    hundreds of degrees in minutes, but the tracker never follows the sun there.
+    """
+    errors = {"altitude": 0.0, "azimuth": 0.0, "ns_tilt": 0.0, "ew_tilt": 0.0}
+    for day in range(0, 365, max(1, 365 // days)):
+        date = datetime.date(2025, 1, 1) + datetime.timedelta(days=day)
+        table = SunPathTable.build(date, LATITUDE, LONGITUDE, resolution_s)
+        offsets_ms = np.sort(rng.integers(0, 86400 * 1000, samples_per_day))
+        times = np.datetime64(date, "ms") + offsets_ms.astype("timedelta64[ms]")
+        direct = calculate_solar_angles_batch(times, LATITUDE, LONGITUDE)
+        for i, when in enumerate(times.astype(datetime.datetime)):
+            if direct["altitude"][i] <= 0:
+                continue
+            altitude, azimuth, ns_tilt, ew_tilt = table.lookup(when)
+            azimuth_error = abs((azimuth - direct["azimuth"][i] + 180) % 360 - 180)
+            errors["altitude"] = max(errors["altitude"], abs(altitude - direct["altitude"][i]))
+            errors["azimuth"] = max(errors["azimuth"], azimuth_error)
+            errors["ns_tilt"] = max(errors["ns_tilt"], abs(ns_tilt - direct["ns_tilt"][i]))
+            errors["ew_tilt"] = max(errors["ew_tilt"], abs(ew_tilt - direct["ew_tilt"][i]))
+    return errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Sun path lookup table accuracy and speed")
+    parser.add_argument("--resolutions", type=int, nargs="+", default=[10, 30, 60, 300])
+    parser.add_argument("--days", type=int, default=24, help="days of the year to check")
+    parser.add_argument("--samples", type=int, default=2000, help="random times checked per day")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print("Max abs error vs direct formulas, daylight only (degrees)")
+    print(f"{'res (s)':>8} {'build (ms)':>10} {'load (ms)':>10} {'alt err':>9} {'az err':>9} "
+          f"{'ns err':>9} {'ew err':>9}")
+    with tempfile.TemporaryDirectory() as table_dir:
+        for resolution_s in args.resolutions:
+            date = datetime.date(2025, 6, 21)
+            start = time.perf_counter()
+            table = SunPathTable.build(date, LATITUDE, LONGITUDE, resolution_s)
+            build_ms = (time.perf_counter() - start) * 1000
+            path = f"{table_dir}/table_{resolution_s}.npz"
+            table.save(path)
+            start = time.perf_counter()
+            SunPathTable.load(path)
+            load_ms = (time.perf_counter() - start) * 1000
+            errors = error_bounds(resolution_s, args.days, args.samples, rng)
+            print(f"{resolution_s:>8} {build_ms:>10.2f} {load_ms:>10.2f} {errors['altitude']:>9.5f} "
+                  f"{errors['azimuth']:>9.5f} {errors['ns_tilt']:>9.5f} {errors['ew_tilt']:>9.5f}")
+
+        # Lookup cost through DailySunPath, the way the control loop uses it
+        sun_path = DailySunPath(LATITUDE, LONGITUDE, table_dir=table_dir)
+        when = datetime.datetime(2025, 6, 21, 13, 37, 12)
+        sun_path.lookup(when)
+        n = 200_000
+        start = time.perf_counter()
+        for _ in range(n):
+            sun_path.lookup(when)
+        lookup_us = (time.perf_counter() - start) / n * 1e6
+        print(f"DailySunPath.lookup: {lookup_us:.2f} us per call")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import datetime
+import os
+import tempfile
+
+from actuator_state import ActuatorStateStore
+from sun_path_table import DailySunPath
+from tracker import Tracker, TrackerMetrics, TRACK_INTERVAL_S
+
+# Bytes on the I2C bus per move command: address, register and the 12-byte protocol v2 frame
+COMMAND_BYTES = 14
+
+def simulate_day(sun_path, date, deadband_deg, max_lead_s, interval_s, metrics_file):
+    """Runs the tracker over one local day with a recording sender. Returns the day's metrics summary."""
+    sent = []
+    directory = os.path.dirname(metrics_file)
+    for name in ("state.bin", "journal.bin"):
+        if os.path.exists(os.path.join(directory, name)):
+            os.remove(os.path.join(directory, name))
+    state = ActuatorStateStore(os.path.join(directory, "state.bin"), os.path.join(directory, "journal.bin"),
+                               durable=False, legacy_path=None)
+    tracker = Tracker(sun_path, send=sent.append, state=state,
+                      metrics=TrackerMetrics(metrics_file), deadband_deg=deadband_deg, max_lead_s=max_lead_s,
+                      sleep=lambda seconds: None)
+    start = datetime.datetime.combine(date, datetime.time())
+    for tick in range(0, 86400, interval_s):
+        tracker.step(start + datetime.timedelta(seconds=tick))
+    state.close()
+    return tracker.metrics.summary()
+
+def main():
+    parser = argparse.ArgumentParser(description="Tracker moves, actuator time and pointing error over simulated days")
+    parser.add_argument("--lat", type=float, default=33.97)
+    parser.add_argument("--lon", type=float, default=-118.42)
+    parser.add_argument("--interval", type=int, default=TRACK_INTERVAL_S)
+    args = parser.parse_args()
+    dates = [datetime.date(2025, 3, 20), datetime.date(2025, 6, 21), datetime.date(2025, 12, 21)]
+    # (label, deadband, max lead): the first row is a tracker that corrects on every tick
+    configs = [("every tick", 0.0, 0), ("deadband 1°", 1.0, 0), ("deadband 1° + lead", 1.0, 3600),
+               ("deadband 2°", 2.0, 0), ("deadband 2° + lead", 2.0, 3600), ("deadband 4° + lead", 4.0, 3600)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        sun_path = DailySunPath(args.lat, args.lon, table_dir=directory)
+        metrics_file = os.path.join(directory, "metrics.json")
+        for date in dates:
+            print(f"{date} at {args.lat}, {args.lon}, one tick every {args.interval} s:")
+            print(f"  {'':<20} {'moves':>6} {'act-s':>7} {'I2C B':>6} {'mean err':>9} {'max err':>8}")
+            for label, deadband, lead in configs:
+                s = simulate_day(sun_path, date, deadband, lead, args.interval, metrics_file)
+                print(f"  {label:<20} {s['moves']:>6} {s['actuator_seconds']:>7.1f} {s['moves'] * COMMAND_BYTES:>6} "
+                      f"{s['mean_error_deg']:>8.2f}° {s['max_error_deg']:>7.2f}°")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+import bisect
+import math
+import os
+import random
+import threading
+import time
+
+# Backend used by hardware.py: "real" (smbus/spidev), "sim" (the simulated bench below) or
+# "service" (requests to the bus-owning process in bus_service.py)
+BUS_BACKEND_ENV = "CAPSTONE_BUS_BACKEND"
+DEFAULT_BACKEND = "real"
+# Simulator settings
+SIM_LATENCY_SCALE_ENV = "CAPSTONE_SIM_LATENCY_SCALE"  # Multiplies every modelled bus delay; 0 runs with no delays
+SIM_RECORDING_ENV = "CAPSTONE_SIM_RECORDING"  # YYYY-MM-DD: replay that day's sensor log instead of the scripted day
+SIM_DATA_DIR_ENV = "CAPSTONE_SIM_DATA_DIR"  # Where the recorded day is read from (default the real sensor_data)
+
+# Bus timing. A transaction costs a fixed driver/syscall overhead plus its bits on the wire.
+I2C_CLOCK_HZ = 100000  # Standard-mode I2C, the Pi's default
+I2C_BITS_PER_BYTE = 9  # 8 data bits and the ACK
+I2C_OVERHEAD_S = 100e-6
+SPI_OVERHEAD_S = 20e-6
+
+# Wiring of the bench, as read by sensorScript.py
+TCA9548A_ADDRESS = 0x70
+INA219_ADDRESS = 0x40
+ARDUINO_ADDRESS = 0x08
+INA219_CHANNELS = {6: ("load_voltage", "load_current"), 4: ("solar_voltage", "solar_current")}  # mux channel
+MCP3008_CHANNELS = {0: "load_current", 2: "solar_current"}  # ADC channel -> ACS712 on that current
+ACS712_VCC = 3.3
+ACS712_SENSITIVITY = 0.066  # V/A, 30A version
+ACS712_NOISE_V = 0.004  # RMS output noise, a little over one ADC code
+INA219_SHUNT_OHMS = 0.1
+
+# INA219 registers
+INA219_CONFIG = 0x00
+INA219_SHUNT_VOLTAGE = 0x01
+INA219_BUS_VOLTAGE = 0x02
+INA219_POWER = 0x03
+INA219_CURRENT = 0x04
+INA219_CALIBRATION = 0x05
+INA219_DEFAULT_CONFIG = 0x399F
+
+def scripted_day(channel, t):
+    """
+    Default waveforms: a clear-sky solar day on local time and a load with slow ripple.
+
+    Returns volts for *_voltage channels and Amperes for *_current channels at Unix time t.
+    """
+    local = time.localtime(t)
+    hours = local.tm_hour + local.tm_min / 60 + (t % 60) / 3600
+    sun = max(0.0, math.sin(math.pi * (hours - 6) / 12))
+    if channel == "solar_voltage":
+        return 17.0 + 3.0 * sun if sun > 0 else 0.4
+    if channel == "solar_current":
+        return 5.5 * sun ** 1.2
+    if channel == "load_voltage":
+        return 12.4 + 0.6 * sun
+    if channel == "load_current":
+        return 1.5 + 0.5 * math.sin(2 * math.pi * t / 600)
+    raise ValueError(f"Unknown channel {channel}")
+
+class RecordedWaveforms:
+    """
+    Replays one logged day (binary or text log, read through LogQuery) by time of day.
+
+    Values are linearly interpolated between samples; gaps and failed reads hold the last
+    good value. Any date can be replayed on any day.
+    """
+
+    def __init__(self, date, directory=None):
+        import datetime
+        from log_query import LogQuery
+        from sensor_log import CHANNELS, SENSOR_DATA_DIR
+
+        day = datetime.date.fromisoformat(date) if isinstance(date, str) else date
+        start = time.mktime(day.timetuple())
+        directory = directory or SENSOR_DATA_DIR
+        data = LogQuery(directory).arrays(start, start + 86400)
+        if not len(data["timestamp"]):
+            raise ValueError(f"No sensor log for {day} in {directory}")
+        self.offsets = [float(ts) - start for ts in data["timestamp"]]
+        self.values = {}
+        for channel in CHANNELS:
+            values, last = [], 0.0
+            for value in data[channel]:
+                last = last if math.isnan(value) else float(value)
+                values.append(last)
+            self.values[channel] = values
+
+    def __call__(self, channel, t):
+        local = time.localtime(t)
+        offset = local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec + t % 1
+        values = self.values[channel]
+        i = bisect.bisect_right(self.offsets, offset)
+        if i == 0:
+            return values[0]
+        if i == len(self.offsets):
+            return values[-1]
+        t0, t1 = self.offsets[i - 1], self.offsets[i]
+        return values[i - 1] + (values[i] - values[i - 1]) * (offset - t0) / (t1 - t0)
+
+class SimulatedINA219:
+    """INA219 register file whose bus and shunt voltages follow the waveforms of one voltage/current pair."""
+
+    def __init__(self, world, voltage_channel, current_channel):
+        self.world = world
+        self.voltage_channel = voltage_channel
+        self.current_channel = current_channel
+        self.registers = {INA219_CONFIG: INA219_DEFAULT_CONFIG, INA219_CALIBRATION: 0}
+
+    def read_register(self, register):
+        if register == INA219_BUS_VOLTAGE:
+            millivolts = max(0.0, self.world.value(self.voltage_channel)) * 1000
+            return (min(0x1FFF, int(round(millivolts / 4))) << 3) | 0x0002  # CNVR set
+        if register == INA219_SHUNT_VOLTAGE:
+            shunt = int(round(self.world.value(self.current_channel) * INA219_SHUNT_OHMS / 10e-6))
+            return max(-32000, min(32000, shunt)) & 0xFFFF
+        if register in (INA219_POWER, INA219_CURRENT):
+            return 0  # Needs a calibration value; nothing in this repo programs one
+        return self.registers.get(register, 0)
+
+    def write_register(self, register, value):
+        if register in (INA219_CONFIG, INA219_CALIBRATION):
+            self.registers[register] = value & 0xFFFF
+
+class SimulatedMCP3008:
+    """MCP3008 whose channels read ACS712 outputs driven by the current waveforms, with output noise."""
+
+    def __init__(self, world, channels=MCP3008_CHANNELS, vref=ACS712_VCC, seed=0):
+        self.world = world
+        self.channels = dict(channels)
+        self.vref = vref
+        self.rng = random.Random(seed)
+
+    def code(self, channel):
+        current_channel = self.channels.get(channel)
+        if current_channel is None:
+            volts = 0.0  # Unconnected input
+        else:
+            volts = (ACS712_VCC / 2 + ACS712_SENSITIVITY * self.world.value(current_channel)
+                     + self.rng.gauss(0.0, ACS712_NOISE_V))
+        return max(0, min(1023, int(round(volts / self.vref * 1023))))
+
+class SimulatedWorld:
+    """
+    The simulated bench behind the sim backend: a TCA9548A with an INA219 on each voltage
+    channel, an MCP3008 reading the ACS712 current sensors, and the Arduino actuator
+    controller at 0x08 (ArduinoSimulator from actuator_protocol.py).
+
+    I2C and SPI share one world, so both buses see the same waveforms. Bus delays are
+    slept (never busy-waited), so the I2C and SPI reader threads overlap as on the Pi.
+    More devices (e.g. one Arduino per tracker of a fleet) can be attached with add_device().
+    """
+
+    def __init__(self, waveforms=scripted_day, latency_scale=1.0, clock=time.time, sleep=time.sleep):
+        """
+        Args:
+            waveforms: Callable (channel, unix_time) -> value, e.g. scripted_day or RecordedWaveforms.
+            latency_scale: Multiplies every modelled bus delay. 0 disables them.
+        """
+        from actuator_protocol import ArduinoSimulator
+
+        self.waveforms = waveforms
+        self.latency_scale = latency_scale
+        self.clock = clock
+        self.sleep = sleep
+        self.mux_mask = 0
+        self.ina219 = {channel: SimulatedINA219(self, *pair) for channel, pair in INA219_CHANNELS.items()}
+        self.mcp3008 = SimulatedMCP3008(self)
+        self.arduino = ArduinoSimulator(ARDUINO_ADDRESS)
+        self.devices = {ARDUINO_ADDRESS: self.arduino}  # address -> device on the bus before the mux
+        self.channel_devices = {INA219_ADDRESS: dict(self.ina219)}  # address -> {mux channel: device}
+        self.i2c_transactions = 0
+        self.spi_transfers = 0
+        # One transaction at a time on each bus, like the kernel drivers
+        self.i2c_lock = threading.Lock()
+        self.spi_lock = threading.Lock()
+
+    def value(self, channel):
+        return self.waveforms(channel, self.clock())
+
+    def wait(self, seconds):
+        if self.latency_scale > 0:
+            self.sleep(seconds * self.latency_scale)
+
+    def add_device(self, address, device, channel=None):
+        """
+        Attaches a device at an address, behind a mux channel or (channel None) before the mux.
+
+        The device is either register-based like SimulatedINA219 (read_register/write_register)
+        or takes block transfers like ArduinoSimulator (read_i2c_block_data/write_i2c_block_data).
+        """
+        if channel is None:
+            self.devices[address] = device
+        else:
+            self.channel_devices.setdefault(address, {})[channel] = device
+
+    def i2c_device(self, address):
+        """Returns the device answering at an address with the current mux selection, or raises like smbus."""
+        if address == TCA9548A_ADDRESS:
+            return address
+        device = self.devices.get(address)
+        if device is not None:
+            return device
+        for channel, device in self.channel_devices.get(address, {}).items():
+            if self.mux_mask & (1 << channel):
+                return device
+        raise OSError(121, "Remote I/O error")
+
+class SimulatedSMBus:
+    """Drop-in for smbus.SMBus on the simulated bench (the calls the scripts in this directory make)."""
+
+    def __init__(self, bus=None, world=None):
+        self.world = world if world is not None else get_world()
+
+    def _transaction(self, address, data_bytes):
+        """Locks the bus for one transaction of address + register + data bytes and returns the device."""
+        world = self.world
+        world.i2c_transactions += 1
+        world.wait(I2C_OVERHEAD_S + (2 + data_bytes) * I2C_BITS_PER_BYTE / I2C_CLOCK_HZ)
+        return world.i2c_device(address)
+
+    def write_byte(self, address, value):
+        with self.world.i2c_lock:
+            if self._transaction(address, 0) == TCA9548A_ADDRESS:
+                self.world.mux_mask = value & 0xFF
+
+    def read_byte(self, address):
+        with self.world.i2c_lock:
+            device = self._transaction(address, 0)
+            if device == TCA9548A_ADDRESS:
+                return self.world.mux_mask
+            return 0
+
+    def write_byte_data(self, address, register, value):
+        with self.world.i2c_lock:
+            device = self._transaction(address, 1)
+            if device == TCA9548A_ADDRESS:
+                self.world.mux_mask = value & 0xFF  # The mux keeps the last byte written
+            elif not hasattr(device, "write_register"):
+                device.write_i2c_block_data(address, register, [value])
+
+    def read_byte_data(self, address, register):
+        return self.read_i2c_block_data(address, register, 1)[0]
+
+    def write_i2c_block_data(self, address, register, data):
+        with self.world.i2c_lock:
+            device = self._transaction(address, len(data))
+            if device == TCA9548A_ADDRESS:
+                self.world.mux_mask = data[-1] & 0xFF if data else register & 0xFF
+            elif not hasattr(device, "write_register"):
+                device.write_i2c_block_data(address, register, data)
+            elif len(data) >= 2:
+                device.write_register(register, (data[0] << 8) | data[1])
+
+    def read_i2c_block_data(self, address, register, length=32):
+        with self.world.i2c_lock:
+            device = self._transaction(address, length)
+            if device == TCA9548A_ADDRESS:
+                return [self.world.mux_mask] * length
+            if not hasattr(device, "read_register"):
+                return device.read_i2c_block_data(address, register, length)
+            value = device.read_register(register)
+            return ([value >> 8, value & 0xFF] * ((length + 1) // 2))[:length]
+
+    def write_word_data(self, address, register, value):
+        # SMBus words are little-endian on the wire
+        self.write_i2c_block_data(address, register, [value & 0xFF, value >> 8])
+
+    def read_word_data(self, address, register):
+        data = self.read_i2c_block_data(address, register, 2)
+        return data[0] | (data[1] << 8)
+
+    def close(self):
+        pass
+
+class SimulatedSpiDev:
+    """Drop-in for spidev.SpiDev with the MCP3008 on the simulated bench."""
+
+    def __init__(self, world=None):
+        self.world = world if world is not None else get_world()
+        self.max_speed_hz = 500000
+        self.mode = 0
+        self.opened = False
+
+    def open(self, bus, device):
+        self.opened = True
+
+    def xfer2(self, data):
+        if not self.opened:
+            raise OSError(9, "Bad file descriptor")
+        world = self.world
+        with world.spi_lock:
+            world.spi_transfers += 1
+            world.wait(SPI_OVERHEAD_S + 8 * len(data) / self.max_speed_hz)
+            # Same framing as read_mcp3008: start bit, single-ended bit, then the channel in the first byte
+            command = data[0]
+            if not command & 0x01 or not command & 0x02:
+                return [0] * len(data)
+            code = world.mcp3008.code((command >> 2) & 0x07)
+            return [0, (code >> 8) & 0x03, code & 0xFF] + [0] * (len(data) - 3)
+
+    def close(self):
+        self.opened = False
+
+_world = None
+
+def get_world():
+    """Returns the process-wide simulated bench, configured from the CAPSTONE_SIM_* environment variables."""
+    global _world
+    if _world is None:
+        recording = os.environ.get(SIM_RECORDING_ENV)
+        waveforms = RecordedWaveforms(recording, os.environ.get(SIM_DATA_DIR_ENV)) if recording else scripted_day
+        _world = SimulatedWorld(waveforms, latency_scale=float(os.environ.get(SIM_LATENCY_SCALE_ENV, "1")))
+    return _world
+
+def selected_backend():
+    """Returns the backend name from CAPSTONE_BUS_BACKEND ("real" by default)."""
+    name = os.environ.get(BUS_BACKEND_ENV, DEFAULT_BACKEND).strip().lower()
+    if name not in ("real", "sim", "service"):
+        raise ValueError(f"{BUS_BACKEND_ENV} must be 'real', 'sim' or 'service', not {name!r}")
+    return name
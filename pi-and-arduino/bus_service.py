@@ -0,0 +1,345 @@
+import argparse
+import heapq
+import itertools
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+
+import hardware
+from actuator_protocol import ARDUINO_ADDRESS
+from i2c_mux import MUX_SETTLE_S, TCA9548A_ADDRESS
+from instrumentation import get_metrics
+
+# Unix socket the service listens on (override with CAPSTONE_BUS_SOCKET)
+BUS_SERVICE_SOCKET = os.environ.get("CAPSTONE_BUS_SOCKET", os.path.join(tempfile.gettempdir(), "capstone_bus.sock"))
+
+# Lower runs first. Within a priority, requests run in arrival order.
+PRIORITY_ACTUATOR = 0
+PRIORITY_CLIENT = 1  # Requests from other processes (UI, scanners, demos)
+PRIORITY_TELEMETRY = 2  # The service's own sampling loop
+PRIORITY_NAMES = {PRIORITY_ACTUATOR: "actuator", PRIORITY_CLIENT: "client", PRIORITY_TELEMETRY: "telemetry"}
+
+# Calls a client may make, per bus
+I2C_METHODS = frozenset(("read_byte", "write_byte", "read_byte_data", "write_byte_data", "read_word_data",
+                         "write_word_data", "read_i2c_block_data", "write_i2c_block_data"))
+SPI_METHODS = frozenset(("xfer", "xfer2", "readbytes", "writebytes"))
+
+class _Job:
+    __slots__ = ("function", "done", "result", "error", "enqueued")
+
+    def __init__(self, function):
+        self.function = function
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.enqueued = time.perf_counter()
+
+class _PriorityWorker:
+    """One thread that runs jobs for one bus, lowest priority number first."""
+
+    def __init__(self, name, device, metrics):
+        self.name = name
+        self.device = device
+        self.metrics = metrics
+        self._heap = []
+        self._order = itertools.count()
+        self._ready = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=f"{name}-bus", daemon=True)
+        self._thread.start()
+
+    def call(self, priority, function):
+        """Runs function(device) on the bus thread and returns its result (or raises its exception)."""
+        job = _Job(function)
+        with self._ready:
+            heapq.heappush(self._heap, (priority, next(self._order), job))
+            self._ready.notify()
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while not self._heap:
+                    self._ready.wait()
+                priority, _, job = heapq.heappop(self._heap)
+            if job is None:
+                return
+            started = time.perf_counter()
+            self.metrics.observe(f"{self.name}_wait_{PRIORITY_NAMES[priority]}", started - job.enqueued)
+            try:
+                job.result = job.function(self.device)
+            except Exception as e:
+                job.error = e
+            job.done.set()
+
+    def stop(self):
+        with self._ready:
+            heapq.heappush(self._heap, (float("inf"), next(self._order), None))
+            self._ready.notify()
+        self._thread.join()
+
+class BusArbiter:
+    """
+    Owns the I2C bus and the SPI device and runs every transaction on one thread per bus.
+
+    Waiting transactions run in priority order, so an actuator command waits for at most
+    the one transaction in progress. The TCA9548A selection is tracked per owner (one per
+    client connection): when an owner's transaction comes up while another owner has the
+    mux on a different channel, the owner's channel is selected again first. Each client
+    can therefore keep its own select-then-read logic without racing the others.
+    """
+
+    def __init__(self, i2c_bus, spi, mux_address=TCA9548A_ADDRESS, settle_s=MUX_SETTLE_S, metrics=None,
+                 prioritize=True):
+        """
+        Args:
+            prioritize: False runs everything in arrival order (for comparison in benchmarks).
+        """
+        self.metrics = metrics if metrics is not None else get_metrics()
+        self.mux_address = mux_address
+        self.settle_s = settle_s
+        self.prioritize = prioritize
+        self.mux_mask = None  # None: unknown
+        self.owner_masks = {}
+        self.reselects = 0
+        self._i2c = _PriorityWorker("i2c", i2c_bus, self.metrics)
+        self._spi = _PriorityWorker("spi", spi, self.metrics)
+
+    def _priority(self, priority):
+        return priority if self.prioritize else PRIORITY_CLIENT
+
+    def i2c_call(self, owner, method, args, priority=PRIORITY_CLIENT):
+        """Runs one SMBus call for an owner. args starts with the device address."""
+        if method not in I2C_METHODS:
+            raise ValueError(f"Unsupported I2C call {method}")
+        address = args[0]
+        if address == ARDUINO_ADDRESS:  # Transactions with the actuator controller always run at actuator priority
+            priority = PRIORITY_ACTUATOR
+
+        def run(bus):
+            if address == self.mux_address and method.startswith("write"):
+                mask = args[-1][-1] if method == "write_i2c_block_data" else args[-1]
+                self.owner_masks[owner] = mask
+                self.mux_mask = None
+                result = getattr(bus, method)(*args)
+                self.mux_mask = mask
+                return result
+            wanted = self.owner_masks.get(owner)
+            if wanted is not None and wanted != self.mux_mask:
+                # Another owner moved the mux since this owner selected its channel
+                self.mux_mask = None
+                bus.write_byte_data(self.mux_address, 0, wanted)
+                time.sleep(self.settle_s)
+                self.mux_mask = wanted
+                self.reselects += 1
+            return getattr(bus, method)(*args)
+        return self._i2c.call(self._priority(priority), run)
+
+    def spi_call(self, method, args, priority=PRIORITY_CLIENT):
+        """Runs one SpiDev call."""
+        if method not in SPI_METHODS:
+            raise ValueError(f"Unsupported SPI call {method}")
+        return self._spi.call(self._priority(priority), lambda spi: getattr(spi, method)(*args))
+
+    def forget_owner(self, owner):
+        self.owner_masks.pop(owner, None)
+
+    def close(self):
+        """Stops the bus threads and closes the devices."""
+        for worker in (self._i2c, self._spi):
+            worker.stop()
+            worker.device.close()
+
+class ArbitratedSMBus:
+    """SMBus look-alike whose calls go through a BusArbiter as one owner."""
+
+    def __init__(self, arbiter, owner, priority=PRIORITY_CLIENT):
+        self.arbiter = arbiter
+        self.owner = owner
+        self.priority = priority
+
+    def __getattr__(self, name):
+        if name not in I2C_METHODS:
+            raise AttributeError(name)
+        return lambda *args: self.arbiter.i2c_call(self.owner, name, args, self.priority)
+
+    def close(self):
+        self.arbiter.forget_owner(self.owner)
+
+class ArbitratedSpiDev:
+    """SpiDev look-alike whose calls go through a BusArbiter. The service configured the device already."""
+
+    def __init__(self, arbiter, priority=PRIORITY_CLIENT):
+        self.arbiter = arbiter
+        self.priority = priority
+        self.max_speed_hz = hardware.SPI_MAX_SPEED_HZ
+        self.mode = hardware.SPI_MODE
+
+    def open(self, bus, device):
+        pass
+
+    def __getattr__(self, name):
+        if name not in SPI_METHODS:
+            raise AttributeError(name)
+        return lambda *args: self.arbiter.spi_call(name, args, self.priority)
+
+    def close(self):
+        pass
+
+class _ClientHandler(socketserver.StreamRequestHandler):
+    """One client connection: newline-delimited JSON requests, answered in order."""
+
+    def handle(self):
+        arbiter = self.server.arbiter
+        owner = f"client-{id(self)}"
+        try:
+            for line in self.rfile:
+                try:
+                    request = json.loads(line)
+                    args = request.get("args", [])
+                    if request["bus"] == "i2c":
+                        result = arbiter.i2c_call(owner, request["method"], args)
+                    elif request["bus"] == "spi":
+                        result = arbiter.spi_call(request["method"], args)
+                    else:
+                        raise ValueError(f"Unknown bus {request['bus']}")
+                    response = {"result": result}
+                except OSError as e:
+                    response = {"error": str(e.strerror or e), "errno": e.errno}
+                except Exception as e:
+                    response = {"error": str(e), "errno": None}
+                self.wfile.write(json.dumps(response).encode() + b"\n")
+        finally:
+            arbiter.forget_owner(owner)
+
+class BusServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server that forwards client bus calls to a BusArbiter."""
+
+    daemon_threads = True
+
+    def __init__(self, arbiter, path=BUS_SERVICE_SOCKET):
+        if os.path.exists(path):
+            os.remove(path)  # Left over from a service that did not shut down cleanly
+        super().__init__(path, _ClientHandler)
+        self.arbiter = arbiter
+        self.path = path
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class _Connection:
+    """A client's connection to the service; one request at a time."""
+
+    def __init__(self, path):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(path)
+        self._file = self._socket.makefile("rwb")
+        self._lock = threading.Lock()
+
+    def request(self, bus, method, args):
+        with self._lock:
+            self._file.write(json.dumps({"bus": bus, "method": method, "args": list(args)}).encode() + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise OSError(107, "Bus service closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise OSError(response["errno"], response["error"])
+        return response["result"]
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+class RemoteSMBus:
+    """Drop-in for smbus.SMBus that sends every call to the bus service (CAPSTONE_BUS_BACKEND=service)."""
+
+    def __init__(self, bus=None, path=BUS_SERVICE_SOCKET):
+        self._connection = _Connection(path)
+
+    def __getattr__(self, name):
+        if name not in I2C_METHODS:
+            raise AttributeError(name)
+        return lambda *args: self._connection.request("i2c", name, args)
+
+    def close(self):
+        self._connection.close()
+
+class RemoteSpiDev:
+    """Drop-in for spidev.SpiDev that sends every transfer to the bus service, which owns the device settings."""
+
+    def __init__(self, path=BUS_SERVICE_SOCKET):
+        self.path = path
+        self._connection = None
+        self.max_speed_hz = hardware.SPI_MAX_SPEED_HZ
+        self.mode = hardware.SPI_MODE
+
+    def open(self, bus, device):
+        self._connection = _Connection(self.path)
+
+    def __getattr__(self, name):
+        if name not in SPI_METHODS:
+            raise AttributeError(name)
+        return lambda *args: self._connection.request("spi", name, args)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+def start_service(path=BUS_SERVICE_SOCKET, **arbiter_options):
+    """
+    Opens the buses, puts them behind a BusArbiter and starts the socket server on a thread.
+
+    Afterwards get_i2c_bus()/get_spi() in this process return arbitrated handles running at
+    telemetry priority, so code such as sensorScript.main() can run here unchanged.
+
+    Returns:
+        (arbiter, server)
+    """
+    if hardware.BUS_BACKEND == "service":
+        raise ValueError("The bus service opens the buses itself; set CAPSTONE_BUS_BACKEND to real or sim for it")
+    arbiter = BusArbiter(hardware.get_i2c_bus(), hardware.get_spi(), **arbiter_options)
+    hardware.install(ArbitratedSMBus(arbiter, "service", PRIORITY_TELEMETRY),
+                     ArbitratedSpiDev(arbiter, PRIORITY_TELEMETRY))
+    server = BusServer(arbiter, path)
+    threading.Thread(target=server.serve_forever, name="bus-service", daemon=True).start()
+    return arbiter, server
+
+def main():
+    parser = argparse.ArgumentParser(description="Owns the I2C and SPI buses, serves other processes over a Unix "
+                                                 "socket and runs the sensor logger. Unrecognised options go "
+                                                 "to sensorScript.py.")
+    parser.add_argument("--socket", default=BUS_SERVICE_SOCKET, help="Unix socket path")
+    parser.add_argument("--no-logging", action="store_true", help="only serve clients, do not run the logger")
+    args, logger_args = parser.parse_known_args()
+
+    arbiter, server = start_service(args.socket)
+    print(f"Bus service listening on {args.socket}")
+    try:
+        if args.no_logging:
+            while True:
+                time.sleep(3600)
+        else:
+            # Samples reach the UI and other readers through the live feed in shared memory
+            import sensorScript
+            sensorScript.main(logger_args)
+    except KeyboardInterrupt:
+        print("Script stopped by user")
+    finally:
+        server.shutdown()
+        server.server_close()
+        arbiter.close()
+        print(f"Mux channel re-selected {arbiter.reselects} times for clients")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import datetime
+import json
+import math
+import os
+import time
+
+from hardware import RUNTIME_SUFFIX
+
+# Checkpoint lives next to this script so the touch UI finds it regardless of working directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ENERGY_STATE_FILE = os.path.join(BASE_DIR, f"energy_state{RUNTIME_SUFFIX}.json")
+
+# (voltage channel, current channel) for each power flow being integrated
+POWER_CHANNELS = {"solar": ("solar_voltage", "solar_current"), "load": ("load_voltage", "load_current")}
+MAX_GAP_S = 60.0  # Samples further apart than this are not integrated across (logger was down)
+CHECKPOINT_INTERVAL_S = 10.0
+
+def _zero_totals():
+    return {name: 0.0 for name in POWER_CHANNELS}
+
+def _power(readings, voltage_channel, current_channel):
+    voltage, current = readings.get(voltage_channel), readings.get(current_channel)
+    if voltage is None or current is None or math.isnan(voltage) or math.isnan(current):
+        return None
+    return voltage * current
+
+class EnergyAccumulator:
+    """
+    Integrates solar and load power into daily, monthly and lifetime energy totals (Wh).
+
+    Each sample adds one trapezoid (previous power + new power) / 2 * dt, so the cost per
+    sample is constant and irregular sample spacing is handled. Totals are checkpointed to
+    a JSON file so a restart resumes from the checkpoint instead of re-reading the logs.
+    """
+
+    def __init__(self, state_file=ENERGY_STATE_FILE, checkpoint_interval_s=CHECKPOINT_INTERVAL_S, clock=time.monotonic):
+        self.state_file = state_file
+        self.checkpoint_interval_s = checkpoint_interval_s
+        self.clock = clock
+        self.day = None
+        self.month = None
+        self.today = _zero_totals()
+        self.this_month = _zero_totals()
+        self.lifetime = _zero_totals()
+        self.last_timestamp = None
+        self.last_power = {name: None for name in POWER_CHANNELS}
+        self._last_checkpoint = clock()
+
+    @classmethod
+    def restore(cls, state_file=ENERGY_STATE_FILE, **kwargs):
+        """Creates an accumulator from its checkpoint, or an empty one if there is no valid checkpoint."""
+        accumulator = cls(state_file, **kwargs)
+        if os.path.exists(state_file):
+            try:
+                with open(state_file, "r") as f:
+                    state = json.load(f)
+                accumulator.day = state["day"]
+                accumulator.month = state["month"]
+                accumulator.today.update(state["today"])
+                accumulator.this_month.update(state["month_totals"])
+                accumulator.lifetime.update(state["lifetime"])
+                accumulator.last_timestamp = state["last_timestamp"]
+                accumulator.last_power.update(state["last_power"])
+            except Exception as e:
+                print(f"Error reading energy checkpoint {state_file}: {e}. Starting from zero.")
+                accumulator = cls(state_file, **kwargs)
+        return accumulator
+
+    def add_sample(self, timestamp, readings):
+        """Adds one sample ({channel: value or None}, as logged by sensorScript.py) taken at Unix time timestamp."""
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return  # Already counted (e.g. replayed from the log after a restart)
+        date = datetime.date.fromtimestamp(timestamp)
+        day = date.isoformat()
+        if day != self.day:
+            self.day = day
+            self.today = _zero_totals()
+            month = day[:7]
+            if month != self.month:
+                self.month = month
+                self.this_month = _zero_totals()
+
+        dt = timestamp - self.last_timestamp if self.last_timestamp is not None else None
+        for name, (voltage_channel, current_channel) in POWER_CHANNELS.items():
+            power = _power(readings, voltage_channel, current_channel)
+            previous = self.last_power[name]
+            if power is not None and previous is not None and dt <= MAX_GAP_S:
+                energy_wh = (previous + power) / 2 * dt / 3600
+                self.today[name] += energy_wh
+                self.this_month[name] += energy_wh
+                self.lifetime[name] += energy_wh
+            self.last_power[name] = power
+        self.last_timestamp = timestamp
+
+        if self.clock() - self._last_checkpoint >= self.checkpoint_interval_s:
+            self.checkpoint()
+
+    def replay_log(self, log_path):
+        """Adds the samples in a binary log written after the last checkpoint (the tail lost in a crash)."""
+        from sensor_log import read_log, CHANNELS
+        import numpy as np
+
+        if not os.path.exists(log_path):
+            return 0
+        records = read_log(log_path)
+        start = 0 if self.last_timestamp is None else int(np.searchsorted(records["timestamp"], self.last_timestamp, side="right"))
+        for record in records[start:]:
+            self.add_sample(float(record["timestamp"]), {channel: float(record[channel]) for channel in CHANNELS})
+        return len(records) - start
+
+    def checkpoint(self):
+        """Writes the totals to the state file (write-then-rename, so a crash leaves the previous checkpoint)."""
+        self._last_checkpoint = self.clock()
+        state = {"day": self.day, "month": self.month, "today": self.today, "month_totals": self.this_month,
+                 "lifetime": self.lifetime, "last_timestamp": self.last_timestamp, "last_power": self.last_power,
+                 "updated": time.time()}
+        tmp_path = self.state_file + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            print(f"Error writing energy checkpoint {self.state_file}: {e}")
+
+    def totals(self):
+        """Returns {"today": {...}, "month": {...}, "lifetime": {...}} in Wh."""
+        return {"today": dict(self.today), "month": dict(self.this_month), "lifetime": dict(self.lifetime)}
+
+def load_energy_totals(state_file=ENERGY_STATE_FILE):
+    """
+    Reads the latest checkpointed totals, e.g. for the touch UI.
+
+    Returns:
+        {"today": {...}, "month": {...}, "lifetime": {...}} in Wh, with today/month zeroed if
+        the checkpoint is from an earlier day/month, or None if there is no checkpoint.
+    """
+    accumulator = EnergyAccumulator.restore(state_file)
+    if accumulator.day is None:
+        return None
+    totals = accumulator.totals()
+    today = datetime.date.today().isoformat()
+    if accumulator.day != today:
+        totals["today"] = _zero_totals()
+    if accumulator.month != today[:7]:
+        totals["month"] = _zero_totals()
+    return totals
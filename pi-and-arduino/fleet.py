@@ -0,0 +1,483 @@
+import argparse
+import datetime
+import json
+import os
+import time
+
+import hardware
+from actuator_protocol import (ACK_TIMEOUT_S, ACTUATOR_SPEED_MM_S, ARDUINO_ADDRESS, COMPLETION_MARGIN_S, ERR_OK,
+                               ERROR_NAMES, MOVE_FRAME_SIZE, POLL_INTERVAL_S, STATUS_SIZE, ActuatorClient)
+from actuator_state import ActuatorStateStore
+from hardware import RUNTIME_SUFFIX
+from i2c_mux import get_muxed_bus
+from kinematics import ACTUATOR_AXES, AXIS_GEOMETRY, AxisKinematics
+from sensorScript import INA219_ADDRESS, INA219_BUS_VOLTAGE_REGISTER, decode_bus_voltage
+from site_location import SiteLocationStore, REFRESH_TIMEOUT_S
+from sun_path_table import DailySunPath
+from test import check_recovered_move, get_state
+from tracker import (DEADBAND_DEG, MAX_LEAD_S, MIN_ALTITUDE_DEG, MIN_MOVE_DEG, TRACK_INTERVAL_S, TrackerMetrics,
+                     aim_tilts, target_tilts)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Fleet description, e.g.
+# {"bus_budget_bytes_s": 4000, "max_supply_a": 30,
+#  "trackers": [{"name": "row-1", "arduino_address": 8, "mux_channel": 0,
+#                "sensors": {"solar_voltage": 0, "load_voltage": {"channel": 1, "address": 65}},
+#                "geometry": {"ns": {"base_mm": 42.0}}}, ...]}
+# mux_channel null puts the Arduino before the mux. Sensors are INA219s on a mux channel (address
+# default 0x40). geometry overrides entries of AXIS_GEOMETRY in kinematics.py for that tracker.
+FLEET_CONFIG_FILE = os.path.join(BASE_DIR, "fleet_config.json")
+FLEET_STATE_DIR = os.path.join(BASE_DIR, f"fleet_state{RUNTIME_SUFFIX}")  # One actuator state store per tracker
+FLEET_METRICS_FILE = os.path.join(BASE_DIR, f"fleet_metrics{RUNTIME_SUFFIX}.json")
+FLEET_STATUS_FILE = os.path.join(BASE_DIR, f"fleet_status{RUNTIME_SUFFIX}.json")  # Latest extensions, errors and readings
+
+# Bus budget for actuator traffic. Standard-mode I2C moves about 11 kB/s; the rest is left to telemetry.
+BUS_BUDGET_BYTES_S = 4000
+BUS_BURST_BYTES = 200  # Bytes that may go out back to back after the bus was quiet
+# Bytes on the wire per transaction: address, register and payload (a read repeats the address)
+MOVE_BYTES = 2 + MOVE_FRAME_SIZE
+STATUS_BYTES = 3 + STATUS_SIZE
+MUX_SELECT_BYTES = 3
+
+# Actuator supply. A motor draws its inrush current for INRUSH_S after it starts, then its running current.
+MOTOR_RUNNING_A = 1.5
+MOTOR_INRUSH_A = 5.0
+INRUSH_S = 0.15
+MAX_SUPPLY_A = 30.0  # What the actuator supply may deliver at any moment
+
+DEFAULT_FLEET = {"trackers": [{"name": "tracker-1", "arduino_address": ARDUINO_ADDRESS, "mux_channel": None,
+                               "sensors": {"load_voltage": 6, "solar_voltage": 4}}]}
+
+def load_fleet_config(path=FLEET_CONFIG_FILE):
+    """Returns the fleet configuration, or DEFAULT_FLEET (the single tracker of this bench) if there is no file."""
+    if not os.path.exists(path):
+        return DEFAULT_FLEET
+    with open(path, "r") as f:
+        config = json.load(f)
+    names = [entry["name"] for entry in config["trackers"]]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Tracker names in {path} must be unique")
+    return config
+
+# Trackers with the same geometry share one set of kinematics tables
+_kinematics = {}
+
+def get_kinematics(overrides=None):
+    """Returns {actuator_num: AxisKinematics} for AXIS_GEOMETRY with per-axis overrides applied."""
+    overrides = overrides or {}
+    geometry = {axis: {**AXIS_GEOMETRY[axis], **overrides.get(axis, {})} for axis in ACTUATOR_AXES.values()}
+    key = tuple((axis, tuple(sorted(params.items()))) for axis, params in sorted(geometry.items()))
+    if key not in _kinematics:
+        _kinematics[key] = {num: AxisKinematics(**geometry[axis]) for num, axis in ACTUATOR_AXES.items()}
+    return _kinematics[key]
+
+class ChannelBus:
+    """SMBus look-alike for one device behind the mux: selects its channel (if not already active) before each call."""
+
+    def __init__(self, mux, channel):
+        self.mux = mux
+        self.channel = channel
+
+    def _select(self):
+        if not self.mux.select(self.channel):
+            raise OSError(5, f"Could not select mux channel {self.channel}")
+
+    def read_i2c_block_data(self, address, register, length):
+        self._select()
+        return self.mux.bus.read_i2c_block_data(address, register, length)
+
+    def write_i2c_block_data(self, address, register, data):
+        self._select()
+        return self.mux.bus.write_i2c_block_data(address, register, data)
+
+class FleetTracker:
+    """One tracker of the fleet: its Arduino, sensors, kinematics and actuator state."""
+
+    def __init__(self, config, mux, state, clock=time.monotonic, sleep=time.sleep):
+        self.name = config["name"]
+        self.address = config.get("arduino_address", ARDUINO_ADDRESS)
+        self.channel = config.get("mux_channel")
+        self.sensors = {}  # sensor name -> (mux channel, INA219 address)
+        for sensor, where in config.get("sensors", {}).items():
+            if isinstance(where, dict):
+                self.sensors[sensor] = (where["channel"], where.get("address", INA219_ADDRESS))
+            else:
+                self.sensors[sensor] = (where, INA219_ADDRESS)
+        self.kinematics = get_kinematics(config.get("geometry"))
+        self.state = state
+        bus = mux.bus if self.channel is None else ChannelBus(mux, self.channel)
+        self.client = ActuatorClient(bus=bus, address=self.address, clock=clock, sleep=sleep)
+
+class FleetMove:
+    """A move of one tracker in progress under the FleetScheduler."""
+
+    def __init__(self, tracker, moves, error_deg):
+        self.tracker = tracker
+        self.moves = moves  # {actuator_num: relative mm}
+        self.error_deg = error_deg
+        self.durations = [abs(mm) / ACTUATOR_SPEED_MM_S for mm in moves.values()]
+        self.extensions = None  # after the move, once journaled
+        self.seq = None
+        self.started = None
+        self.acked = False
+        self.next_poll = None
+        self.outcome = None  # "done", "rejected" or "error"
+
+    def current_at(self, now):
+        """Supply current (A) drawn by this move's motors at a time, as modelled from the travel times."""
+        elapsed = now - self.started
+        motor_a = MOTOR_INRUSH_A if elapsed < INRUSH_S else MOTOR_RUNNING_A
+        return motor_a * sum(1 for duration in self.durations if elapsed < duration)
+
+class FleetScheduler:
+    """
+    Runs the moves of many trackers concurrently on one I2C bus without blocking on any of them.
+
+    Each move is started with one frame and then polled: once shortly after sending to
+    check it was accepted, then when it is due to finish. Moves start in order of pointing
+    error, largest first, as soon as two limits allow it: the bus budget (a token bucket
+    over the bytes of every frame, status read and mux switch) and the supply current,
+    where a start is held back while the motors already running plus its inrush would
+    exceed max_supply_a. So starts are staggered by the inrush window rather than all
+    hitting the supply at once, while travel overlaps freely.
+    """
+
+    def __init__(self, mux=None, bus_budget_bytes_s=BUS_BUDGET_BYTES_S, burst_bytes=BUS_BURST_BYTES,
+                 max_supply_a=MAX_SUPPLY_A, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            bus_budget_bytes_s: Average actuator traffic allowed on the bus. None for no limit.
+            max_supply_a: Supply current limit. Must cover the inrush of both actuators of one tracker.
+        """
+        if max_supply_a < MOTOR_INRUSH_A * len(ACTUATOR_AXES):
+            raise ValueError(f"max_supply_a must be at least {MOTOR_INRUSH_A * len(ACTUATOR_AXES):g} A "
+                             f"to start both actuators of a tracker")
+        self._mux = mux
+        self.bus_budget_bytes_s = bus_budget_bytes_s
+        self.burst_bytes = burst_bytes
+        self.max_supply_a = max_supply_a
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = burst_bytes
+        self.refilled = clock()
+        self.bus_bytes = 0
+        self.bus_log = []  # (time, bytes) of every transaction, for peak bus rates
+        self.peak_supply_a = 0.0
+
+    @property
+    def mux(self):
+        if self._mux is None:
+            self._mux = get_muxed_bus()
+        return self._mux
+
+    def _cost(self, tracker, nbytes):
+        if tracker.channel is not None and tracker.channel != self.mux.active_channel:
+            nbytes += MUX_SELECT_BYTES
+        return nbytes
+
+    def _spend(self, nbytes, now):
+        """Takes nbytes from the bus budget. Returns False (taking nothing) if there are not enough."""
+        if self.bus_budget_bytes_s is not None:
+            self.tokens = min(self.burst_bytes, self.tokens + (now - self.refilled) * self.bus_budget_bytes_s)
+            self.refilled = now
+            if self.tokens < nbytes - 1e-6:  # not a rounding error short after waiting for the refill
+                return False
+            self.tokens -= nbytes
+        self.bus_bytes += nbytes
+        self.bus_log.append((now, nbytes))
+        return True
+
+    def _bus_ready_at(self, nbytes, now):
+        if self.bus_budget_bytes_s is None:
+            return now
+        return now + max(0.0, nbytes - self.tokens) / self.bus_budget_bytes_s
+
+    def _start(self, move, now):
+        tracker = move.tracker
+        move.extensions = tracker.state.begin_moves(move.moves, tracker.client.idle_positions())
+        move.started = now
+        try:
+            move.seq = tracker.client.send(move.moves)
+        except Exception as e:
+            print(f"Error sending move to {tracker.name}: {e}")
+            move.outcome = "rejected"
+            return
+        move.started = self.clock()  # the motors start once the frame is through
+        move.next_poll = move.started + POLL_INTERVAL_S
+
+    def _poll(self, move, now):
+        """Reads one status for a move and sets its outcome or next poll time."""
+        tracker = move.tracker
+        due = move.started + max(move.durations)
+        try:
+            status = tracker.client.status()
+        except Exception as e:
+            print(f"Error reading status of {tracker.name}: {e}")
+            status = None
+        if not move.acked:
+            if status is not None and status.seq == move.seq:
+                if status.error != ERR_OK:
+                    print(f"{tracker.name} rejected move {move.seq}: {ERROR_NAMES.get(status.error, status.error)}")
+                    move.outcome = "rejected"
+                    return
+                move.acked = True
+            elif now - move.started >= ACK_TIMEOUT_S:
+                print(f"{tracker.name} did not acknowledge move {move.seq}")
+                move.outcome = "rejected"
+                return
+            else:
+                move.next_poll = now + POLL_INTERVAL_S
+                return
+        if status is not None and status.idle:
+            move.outcome = "done"
+        elif now >= due + COMPLETION_MARGIN_S:
+            print(f"Move of {tracker.name} did not finish within {due + COMPLETION_MARGIN_S - move.started:.1f} s")
+            move.outcome = "error"
+        else:
+            move.next_poll = max(due, now + POLL_INTERVAL_S)
+
+    def run(self, moves):
+        """
+        Runs FleetMoves until all have finished. Each tracker's state is saved as its move ends.
+
+        Returns:
+            The moves, with outcome set ("done", "rejected" or "error").
+        """
+        pending = sorted(moves, key=lambda move: -move.error_deg)
+        running = []
+        while pending or running:
+            now = self.clock()
+            # Polls first: they finish moves and free supply current. Grouped by channel to save mux switches.
+            due = sorted((move for move in running if move.next_poll <= now),
+                         key=lambda move: (move.tracker.channel != self.mux.active_channel,
+                                           move.tracker.channel if move.tracker.channel is not None else -1,
+                                           move.next_poll))
+            bus_wait = None
+            for move in due:
+                cost = self._cost(move.tracker, STATUS_BYTES)
+                if not self._spend(cost, now):
+                    bus_wait = cost
+                    break
+                self._poll(move, now)
+                if move.outcome is not None:
+                    running.remove(move)
+                    self._finish(move)
+            supply_a = sum(move.current_at(now) for move in running)
+            while pending and bus_wait is None:
+                move = pending[0]
+                inrush_a = MOTOR_INRUSH_A * len(move.durations)
+                if supply_a + inrush_a > self.max_supply_a:
+                    break
+                cost = self._cost(move.tracker, MOVE_BYTES)
+                if not self._spend(cost, now):
+                    bus_wait = cost
+                    break
+                pending.pop(0)
+                self._start(move, now)
+                if move.outcome is not None:
+                    self._finish(move)
+                    continue
+                running.append(move)
+                supply_a += inrush_a
+            self.peak_supply_a = max(self.peak_supply_a, supply_a)
+
+            # Sleep until something can happen: a poll falls due, the supply frees up or the budget refills
+            wake = [move.next_poll for move in running]
+            if pending:
+                for move in running:
+                    elapsed = now - move.started
+                    wake += [move.started + t for t in [INRUSH_S] + move.durations if t > elapsed]
+            if bus_wait is not None:
+                wake.append(self._bus_ready_at(bus_wait, now))
+            if wake:
+                # At least a microsecond, so a wake time rounded to just before a modelled event cannot spin
+                self.sleep(max(1e-6, min(wake) - self.clock()))
+        return moves
+
+    def _finish(self, move):
+        state = move.tracker.state
+        if move.outcome == "rejected":
+            # Nothing moved, so supersede the journaled move with the unchanged extensions
+            state.save(state.extensions)
+        else:
+            state.save(move.extensions)
+
+class Fleet:
+    """
+    Tracks the sun with many trackers on one bus.
+
+    Every tick the target is looked up once for the site (the sun is in the same place for
+    every tracker), then the current tilts, pointing errors and target extensions of all
+    trackers are computed as NumPy arrays, one pass per distinct geometry. Trackers outside
+    the deadband get a move, and the moves are run concurrently by a FleetScheduler. The
+    sensors of all trackers are read in one pass grouped by mux channel.
+    """
+
+    def __init__(self, config, sun_path, state_factory=None, scheduler=None, metrics=None, mux=None,
+                 deadband_deg=DEADBAND_DEG, max_lead_s=MAX_LEAD_S, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            config: Fleet configuration as returned by load_fleet_config().
+            state_factory: Called with a tracker name, returns its ActuatorStateStore
+                           (default: one store per tracker in FLEET_STATE_DIR).
+        """
+        self.sun_path = sun_path
+        self.mux = mux if mux is not None else get_muxed_bus()
+        if state_factory is None:
+            state_factory = open_fleet_state
+        self.trackers = [FleetTracker(entry, self.mux, state_factory(entry["name"]), clock, sleep)
+                         for entry in config["trackers"]]
+        for tracker in self.trackers:
+            check_recovered_move(tracker.state, tracker.client)
+        if scheduler is None:
+            scheduler = FleetScheduler(self.mux, config.get("bus_budget_bytes_s", BUS_BUDGET_BYTES_S),
+                                       max_supply_a=config.get("max_supply_a", MAX_SUPPLY_A), clock=clock, sleep=sleep)
+        self.scheduler = scheduler
+        self.metrics = metrics if metrics is not None else TrackerMetrics(FLEET_METRICS_FILE)
+        self.deadband_deg = deadband_deg
+        self.max_lead_s = max_lead_s
+        self.sleep = sleep
+        # Trackers grouped by geometry, so each group converts with one set of tables
+        self.groups = {}
+        for i, tracker in enumerate(self.trackers):
+            self.groups.setdefault(id(tracker.kinematics), (tracker.kinematics, []))[1].append(i)
+        self.errors = None
+
+    def extensions(self):
+        """Returns the stored extensions of every tracker as an (n_trackers, n_actuators) array."""
+        import numpy as np
+
+        return np.array([[tracker.state.extensions[num] for num in ACTUATOR_AXES] for tracker in self.trackers])
+
+    def plan(self, when):
+        """
+        Computes the moves for every tracker at a local datetime.
+
+        Returns:
+            List of FleetMoves for the trackers whose pointing error exceeds the deadband.
+        """
+        import numpy as np
+
+        target = np.array(target_tilts(self.sun_path, when))
+        extensions = self.extensions()
+        tilts = np.empty_like(extensions)
+        for kinematics, indices in self.groups.values():
+            for column, num in enumerate(ACTUATOR_AXES):
+                tilts[indices, column] = kinematics[num].tilts(extensions[indices, column])
+        self.errors = np.hypot(*(tilts - target).T)
+        if self.sun_path.lookup(when)[0] >= MIN_ALTITUDE_DEG:
+            for error in self.errors:
+                self.metrics.record_error(when, error)
+        outside = self.errors > self.deadband_deg
+        if not outside.any():
+            return []
+
+        aim = aim_tilts(self.sun_path, when, self.deadband_deg, self.max_lead_s)
+        targets = np.empty_like(extensions)
+        for kinematics, indices in self.groups.values():
+            for column, num in enumerate(ACTUATOR_AXES):
+                targets[indices, column] = kinematics[num].extension(aim[column])
+        correct = outside[:, None] & (np.abs(np.array(aim) - tilts) >= MIN_MOVE_DEG)
+        deltas = targets - extensions
+        moves = []
+        for i in np.flatnonzero(correct.any(axis=1)):
+            tracker_moves = {num: float(deltas[i, column]) for column, num in enumerate(ACTUATOR_AXES)
+                             if correct[i, column]}
+            moves.append(FleetMove(self.trackers[i], tracker_moves, float(self.errors[i])))
+        return moves
+
+    def read_sensors(self):
+        """Reads every tracker's sensors, grouped by mux channel. Returns {tracker name: {sensor: volts or None}}."""
+        reads = [(tracker.name, sensor, (channel, address, INA219_BUS_VOLTAGE_REGISTER))
+                 for tracker in self.trackers for sensor, (channel, address) in tracker.sensors.items()]
+        values = self.mux.read_words([read for _, _, read in reads])
+        readings = {tracker.name: {} for tracker in self.trackers}
+        for (name, sensor, _), value in zip(reads, values):
+            readings[name][sensor] = decode_bus_voltage(value) if value is not None else None
+        return readings
+
+    def step(self, when=None):
+        """
+        Runs one tick: reads the sensors, plans and runs the moves.
+
+        Returns:
+            (finished FleetMoves, sensor readings)
+        """
+        if when is None:
+            when = datetime.datetime.now()
+        readings = self.read_sensors()
+        moves = self.scheduler.run(self.plan(when))
+        for move in moves:
+            if move.outcome != "rejected":
+                self.metrics.record_move(when, sum(move.durations))
+        return moves, readings
+
+    def save_status(self, readings, path=FLEET_STATUS_FILE):
+        """Writes each tracker's extensions, last pointing error and readings (write-then-rename)."""
+        status = {}
+        for i, tracker in enumerate(self.trackers):
+            status[tracker.name] = {"extensions": {str(num): round(mm, 3) for num, mm in tracker.state.extensions.items()},
+                                    "error_deg": round(float(self.errors[i]), 3) if self.errors is not None else None,
+                                    "readings": readings.get(tracker.name, {})}
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"updated": time.time(), "trackers": status}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error writing fleet status {path}: {e}")
+
+    def run(self, interval_s=TRACK_INTERVAL_S):
+        """Tracks until interrupted, one step every interval_s seconds."""
+        next_tick = time.monotonic()
+        while True:
+            moves, readings = self.step()
+            if moves:
+                outcomes = [move.outcome for move in moves]
+                print(f"Moved {outcomes.count('done')} of {len(self.trackers)} trackers "
+                      f"({outcomes.count('rejected')} rejected, {outcomes.count('error')} unconfirmed). "
+                      f"{self.metrics.format_summary()}")
+                self.metrics.save()
+            self.save_status(readings)
+            next_tick += interval_s
+            self.sleep(max(0.0, next_tick - time.monotonic()))
+
+    def close(self):
+        for tracker in self.trackers:
+            tracker.state.close()
+
+def open_fleet_state(name, state_dir=FLEET_STATE_DIR):
+    """Opens the ActuatorStateStore of one fleet tracker."""
+    os.makedirs(state_dir, exist_ok=True)
+    return ActuatorStateStore(os.path.join(state_dir, f"{name}.bin"), os.path.join(state_dir, f"{name}_journal.bin"),
+                              legacy_path=None)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sun tracking for a fleet of trackers on one bus")
+    parser.add_argument("--config", default=FLEET_CONFIG_FILE, help="fleet configuration (JSON)")
+    parser.add_argument("--interval", type=float, default=TRACK_INTERVAL_S, help="seconds between target updates")
+    parser.add_argument("--deadband", type=float, default=DEADBAND_DEG, help="pointing error (degrees) tolerated before moving")
+    parser.add_argument("--max-lead", type=int, default=MAX_LEAD_S, help="furthest ahead (seconds) a move may aim")
+    args = parser.parse_args()
+
+    lat, lon = SiteLocationStore().get(wait=REFRESH_TIMEOUT_S)
+    if lat is None or lon is None:
+        print("Error: Site location unknown. Set CAPSTONE_LATITUDE/CAPSTONE_LONGITUDE or site_config.json.")
+        exit(1)
+    state_factory = None
+    if not os.path.exists(args.config):
+        # Without a fleet file this drives the bench's own tracker, so share its state with tracker.py
+        print(f"No {args.config}; driving the single tracker")
+        state_factory = lambda name: get_state()
+    fleet = Fleet(load_fleet_config(args.config), DailySunPath(lat, lon), state_factory=state_factory,
+                  deadband_deg=args.deadband, max_lead_s=args.max_lead)
+    print(f"Tracking {len(fleet.trackers)} trackers at {lat:.4f}, {lon:.4f} with a {args.deadband}° deadband")
+    try:
+        fleet.run(args.interval)
+    except KeyboardInterrupt:
+        print("Script stopped by user")
+        print(fleet.metrics.format_summary())
+    finally:
+        fleet.metrics.save()
+        fleet.close()
+        hardware.close()
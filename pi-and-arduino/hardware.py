@@ -0,0 +1,73 @@
+# Shared, lazily opened I2C and SPI handles.
+# Nothing is imported or opened until a script actually talks to a device, so the
+# scripts start quickly and can be imported on machines without the hardware.
+# Set CAPSTONE_BUS_BACKEND=sim to run every script against the simulated bench in bus_backends.py,
+# or =service to send every transaction through the bus-owning process in bus_service.py.
+
+from bus_backends import selected_backend
+
+# "real" (smbus/spidev), "sim" or "service", read once at import
+BUS_BACKEND = selected_backend()
+# Added to the name of every runtime file (state, logs, live feed, metrics), so a run against
+# the simulated bench never reads or changes the real bench's files
+RUNTIME_SUFFIX = "_sim" if BUS_BACKEND == "sim" else ""
+
+# I2C bus (1 for /dev/i2c-1)
+I2C_BUS = 1
+
+# SPI for MCP3008
+SPI_BUS = 0
+SPI_DEVICE = 0  # Default CS pin
+SPI_MAX_SPEED_HZ = 1000000  # 1 MHz
+SPI_MODE = 0b01  # Mode 1: CPOL=0, CPHA=1
+
+_i2c_bus = None
+_spi = None
+
+def get_i2c_bus():
+    """Returns the shared SMBus, opening it on first use."""
+    global _i2c_bus
+    if _i2c_bus is None:
+        if BUS_BACKEND == "sim":
+            from bus_backends import SimulatedSMBus as SMBus
+        elif BUS_BACKEND == "service":
+            from bus_service import RemoteSMBus as SMBus
+        else:
+            from smbus import SMBus
+        _i2c_bus = SMBus(I2C_BUS)
+    return _i2c_bus
+
+def get_spi():
+    """Returns the shared SpiDev for the MCP3008, opening and configuring it on first use."""
+    global _spi
+    if _spi is None:
+        if BUS_BACKEND == "sim":
+            from bus_backends import SimulatedSpiDev as SpiDev
+        elif BUS_BACKEND == "service":
+            from bus_service import RemoteSpiDev as SpiDev
+        else:
+            from spidev import SpiDev
+        spi = SpiDev()
+        spi.open(SPI_BUS, SPI_DEVICE)
+        spi.max_speed_hz = SPI_MAX_SPEED_HZ
+        spi.mode = SPI_MODE
+        _spi = spi
+    return _spi
+
+def install(i2c_bus=None, spi=None):
+    """Makes get_i2c_bus()/get_spi() return these handles from now on (bus_service.py installs its arbitrated ones)."""
+    global _i2c_bus, _spi
+    if i2c_bus is not None:
+        _i2c_bus = i2c_bus
+    if spi is not None:
+        _spi = spi
+
+def close():
+    """Closes whichever of the I2C bus and SPI device were opened."""
+    global _i2c_bus, _spi
+    if _spi is not None:
+        _spi.close()
+        _spi = None
+    if _i2c_bus is not None:
+        _i2c_bus.close()
+        _i2c_bus = None
@@ -0,0 +1,210 @@
+import argparse
+import datetime
+import json
+import os
+import time
+
+import hardware
+from hardware import RUNTIME_SUFFIX
+from i2c_mux import MUX_SETTLE_S, get_muxed_bus
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Devices found by the last full scan: which address answers on which mux channel
+INVENTORY_FILE = os.path.join(BASE_DIR, f"i2c_inventory{RUNTIME_SUFFIX}.json")
+
+MUX_CHANNELS = range(8)
+# 7-bit addresses a device may use; 0x00-0x02 and 0x78-0x7F are reserved
+SCAN_ADDRESSES = range(0x03, 0x78)
+# Names for the devices this project uses, for the reports
+KNOWN_DEVICES = {0x08: "Arduino", 0x40: "INA219", 0x70: "TCA9548A"}
+
+def describe(channel, address):
+    name = KNOWN_DEVICES.get(address, "device")
+    where = "before the mux" if channel is None else f"on channel {channel}"
+    return f"{name} at 0x{address:02x} {where}"
+
+def probe(bus, address):
+    """Returns True if a device acknowledges a read at an address."""
+    try:
+        bus.read_byte(address)
+        return True
+    except Exception:
+        return False
+
+def _set_mux_mask(bus, mask, mux_address, settle_s):
+    bus.write_byte_data(mux_address, 0, mask)
+    time.sleep(settle_s)
+
+def full_scan(mux=None, addresses=SCAN_ADDRESSES, settle_s=MUX_SETTLE_S):
+    """
+    Finds every device on the bus and on each TCA9548A channel.
+
+    Instead of walking all addresses on every channel, three passes are made. With every
+    channel off, whatever answers is before the mux. With all channels on, whatever else
+    answers is behind it somewhere. Only those addresses are then probed one channel at a
+    time, which also finds an address used on several channels (e.g. one INA219 each).
+
+    Returns:
+        Sorted list of (channel, address), channel None for devices before the mux, or None
+        if the mux could not be switched part way (a partial list must not become the inventory).
+    """
+    mux = mux if mux is not None else get_muxed_bus()
+    bus = mux.bus
+    mux.invalidate()  # the mask is changed behind its back
+    try:
+        _set_mux_mask(bus, 0x00, mux.mux_address, settle_s)
+        root = [address for address in addresses if probe(bus, address)]
+        devices = [(None, address) for address in root]
+        if mux.mux_address not in root:
+            print(f"No TCA9548A at 0x{mux.mux_address:02x}; only the devices before the mux were scanned")
+            return devices
+        _set_mux_mask(bus, 0xFF, mux.mux_address, settle_s)
+        behind = [address for address in addresses if address not in root and probe(bus, address)]
+        if behind:
+            for channel in MUX_CHANNELS:
+                _set_mux_mask(bus, 1 << channel, mux.mux_address, settle_s)
+                devices += [(channel, address) for address in behind if probe(bus, address)]
+        _set_mux_mask(bus, 0x00, mux.mux_address, settle_s)
+    except Exception as e:
+        print(f"Error switching the TCA9548A during the scan: {e}")
+        return None
+    finally:
+        mux.invalidate()
+    return sorted(devices, key=lambda device: (-1 if device[0] is None else device[0], device[1]))
+
+def present_addresses(mux=None, addresses=SCAN_ADDRESSES, settle_s=MUX_SETTLE_S):
+    """
+    Returns the set of addresses answering with every mux channel on (before or behind the mux),
+    or None if the mux could not be switched.
+
+    This is the second pass of full_scan() on its own: one probe per address, enough to notice
+    an address that is not in the inventory, though not which channel it is on.
+    """
+    mux = mux if mux is not None else get_muxed_bus()
+    mux.invalidate()
+    try:
+        _set_mux_mask(mux.bus, 0xFF, mux.mux_address, settle_s)
+        return {address for address in addresses if probe(mux.bus, address)}
+    except Exception as e:
+        print(f"Error switching the TCA9548A: {e}")
+        return None
+    finally:
+        try:
+            _set_mux_mask(mux.bus, 0x00, mux.mux_address, settle_s)
+        except Exception:
+            pass
+        mux.invalidate()
+
+def verify(devices, mux=None):
+    """
+    Probes only the expected devices, selecting each channel once. Returns the ones that did not answer.
+
+    Devices before the mux answer whatever channel is selected, so they are probed first.
+    """
+    mux = mux if mux is not None else get_muxed_bus()
+    missing = [(None, address) for channel, address in devices if channel is None and not probe(mux.bus, address)]
+    by_channel = {}
+    for channel, address in devices:
+        if channel is not None:
+            by_channel.setdefault(channel, []).append(address)
+    # The active channel first, so a channel that is already selected costs no mux write
+    for channel in sorted(by_channel, key=lambda channel: (channel != mux.active_channel, channel)):
+        if not mux.select(channel):
+            missing += [(channel, address) for address in by_channel[channel]]
+            continue
+        missing += [(channel, address) for address in by_channel[channel] if not probe(mux.bus, address)]
+    return missing
+
+def load_inventory(path=INVENTORY_FILE):
+    """Returns the saved inventory as {"scanned": ISO time, "devices": [(channel, address), ...]}, or None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        return {"scanned": data.get("scanned"),
+                "devices": [(device["channel"], device["address"]) for device in data["devices"]]}
+    except Exception as e:
+        print(f"Error reading I2C inventory {path}: {e}")
+        return None
+
+def save_inventory(devices, path=INVENTORY_FILE):
+    """Writes the inventory (write-then-rename)."""
+    data = {"scanned": datetime.datetime.now().isoformat(timespec="seconds"),
+            "devices": [{"channel": channel, "address": address, "name": KNOWN_DEVICES.get(address)}
+                        for channel, address in devices]}
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Error writing I2C inventory {path}: {e}")
+
+def report_changes(old, new):
+    """Prints the devices that appeared or disappeared between two device lists. Returns True if any did."""
+    added = sorted(set(new) - set(old), key=str)
+    removed = sorted(set(old) - set(new), key=str)
+    for channel, address in added:
+        print(f"New: {describe(channel, address)}")
+    for channel, address in removed:
+        print(f"Gone: {describe(channel, address)}")
+    return bool(added or removed)
+
+def check_topology(path=INVENTORY_FILE, mux=None):
+    """
+    Startup check: verifies the devices in the saved inventory, or makes a full scan if there is none.
+
+    The verify probes only the expected devices, so it reports devices that are gone. Then one
+    pass with every mux channel on reports addresses that are not in the inventory; a full scan
+    (python i2c_discovery.py --scan) locates them and updates the inventory. A new device at an
+    address already used on another channel only shows up with the full scan.
+
+    Returns:
+        List of (channel, address) expected but not answering.
+    """
+    inventory = load_inventory(path)
+    if inventory is None:
+        print("No I2C inventory yet, scanning every mux channel")
+        devices = full_scan(mux)
+        if devices is None:
+            print("I2C scan failed, no inventory saved")
+            return []
+        save_inventory(devices, path)
+        for device in devices:
+            print(f"Found {describe(*device)}")
+        return []
+    missing = verify(inventory["devices"], mux)
+    for device in missing:
+        print(f"Missing: {describe(*device)} (inventory from {inventory['scanned']})")
+    known = {address for _, address in inventory["devices"]}
+    for address in sorted((present_addresses(mux) or set()) - known):
+        print(f"New: {KNOWN_DEVICES.get(address, 'device')} at 0x{address:02x} "
+              f"(not in the inventory, run python i2c_discovery.py --scan)")
+    return missing
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="I2C topology discovery across the TCA9548A channels")
+    parser.add_argument("--scan", action="store_true", help="full scan, report changes and save the inventory")
+    parser.add_argument("--inventory", default=INVENTORY_FILE, help="inventory file")
+    args = parser.parse_args()
+    try:
+        start = time.perf_counter()
+        if args.scan:
+            old = load_inventory(args.inventory)
+            devices = full_scan()
+            if devices is None:
+                print("Scan failed, inventory not changed")
+                exit(1)
+            for device in devices:
+                print(f"Found {describe(*device)}")
+            if old is not None and not report_changes(old["devices"], devices):
+                print("No change since the last scan")
+            save_inventory(devices, args.inventory)
+            print(f"Scanned in {time.perf_counter() - start:.2f} s, saved {args.inventory}")
+        else:
+            missing = check_topology(args.inventory)
+            print(f"{'All expected devices answered' if not missing else f'{len(missing)} device(s) missing'} "
+                  f"({time.perf_counter() - start:.3f} s)")
+    finally:
+        hardware.close()
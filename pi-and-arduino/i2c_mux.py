@@ -0,0 +1,138 @@
+import time
+from hardware import get_i2c_bus
+from instrumentation import get_metrics
+
+# TCA9548A address
+TCA9548A_ADDRESS = 0x70
+# Time for the mux to switch channels before the next transaction
+MUX_SETTLE_S = 0.001
+
+class MuxedI2CBus:
+    """
+    I2C bus behind a TCA9548A that remembers which mux channel is selected.
+
+    Selecting the channel that is already active is a no-op, so the mux write and the 1 ms
+    settle sleep only happen when the channel actually changes. Drivers for devices behind
+    the mux (e.g. configured INA219 objects) are kept per channel instead of being rebuilt
+    on every read.
+    """
+
+    def __init__(self, bus=None, mux_address=TCA9548A_ADDRESS, settle_s=MUX_SETTLE_S, metrics=None):
+        self._bus = bus
+        self.metrics = metrics if metrics is not None else get_metrics()
+        self.mux_address = mux_address
+        self.settle_s = settle_s
+        self.active_channel = None
+        self.drivers = {}
+        self.selects = 0
+        self.skipped_selects = 0
+
+    @property
+    def bus(self):
+        if self._bus is None:
+            self._bus = get_i2c_bus()
+        return self._bus
+
+    def invalidate(self):
+        """Forgets the active channel, e.g. after a bus error or if another process may have switched it."""
+        self.active_channel = None
+
+    def select(self, channel):
+        """Selects a TCA9548A channel unless it is already active. Returns True on success."""
+        if channel == self.active_channel:
+            self.skipped_selects += 1
+            return True
+        try:
+            start = time.perf_counter()
+            self.bus.write_byte_data(self.mux_address, 0, 1 << channel)
+            written = time.perf_counter()
+            time.sleep(self.settle_s)
+            self.metrics.observe("mux_select", written - start)
+            self.metrics.observe("mux_settle", time.perf_counter() - written)
+            self.active_channel = channel
+            self.selects += 1
+            return True
+        except Exception as e:
+            self.invalidate()
+            self.metrics.count_error(f"0x{self.mux_address:02x}", channel)
+            print(f"Error selecting channel {channel}: {e}")
+            return False
+
+    def read_word(self, channel, address, register):
+        """Reads a big-endian 16-bit register from a device on a mux channel. Returns None on error."""
+        if not self.select(channel):
+            return None
+        try:
+            start = time.perf_counter()
+            data = self.bus.read_i2c_block_data(address, register, 2)
+            self.metrics.observe("i2c_read", time.perf_counter() - start)
+            return (data[0] << 8) | data[1]
+        except Exception as e:
+            self.invalidate()
+            self.metrics.count_error(f"0x{address:02x}", channel)
+            print(f"Error reading register 0x{register:02X} of 0x{address:02X} on channel {channel}: {e}")
+            return None
+
+    def write_word(self, channel, address, register, value):
+        """Writes a big-endian 16-bit register on a device on a mux channel. Returns True on success."""
+        if not self.select(channel):
+            return False
+        try:
+            self.bus.write_i2c_block_data(address, register, [(value >> 8) & 0xFF, value & 0xFF])
+            return True
+        except Exception as e:
+            self.invalidate()
+            self.metrics.count_error(f"0x{address:02x}", channel)
+            print(f"Error writing register 0x{register:02X} of 0x{address:02X} on channel {channel}: {e}")
+            return False
+
+    def read_words(self, reads):
+        """
+        Reads several registers, grouped by channel so each channel is selected at most once.
+
+        The active channel goes first, so a sampling cycle that alternates between two
+        channels only switches once per cycle.
+
+        Args:
+            reads: List of (channel, address, register).
+
+        Returns:
+            List of values (or None on error) in the same order as reads.
+        """
+        order = sorted(range(len(reads)), key=lambda i: (reads[i][0] != self.active_channel, reads[i][0]))
+        results = [None] * len(reads)
+        for i in order:
+            results[i] = self.read_word(*reads[i])
+        return results
+
+    def driver(self, channel, key, factory):
+        """
+        Returns the cached driver for a device on a channel, creating it with factory() on first use.
+
+        The channel is selected before factory() runs so the driver can configure the device.
+        Returns None if the channel cannot be selected or factory() fails.
+        """
+        cache_key = (channel, key)
+        if cache_key not in self.drivers:
+            if not self.select(channel):
+                return None
+            try:
+                self.drivers[cache_key] = factory()
+            except Exception as e:
+                print(f"Error creating driver {key} on channel {channel}: {e}")
+                return None
+        return self.drivers[cache_key]
+
+    def drop_driver(self, channel, key):
+        """Forgets a cached driver so it is recreated (and reconfigured) on next use."""
+        self.drivers.pop((channel, key), None)
+
+# One mux state per process, shared by every script that imports this module
+_muxed_bus = None
+
+def get_muxed_bus():
+    """Returns the shared MuxedI2CBus on the bus from hardware.py."""
+    global _muxed_bus
+    if _muxed_bus is None:
+        _muxed_bus = MuxedI2CBus()
+    return _muxed_bus
@@ -0,0 +1,157 @@
+import bisect
+import os
+import threading
+import time
+
+from hardware import RUNTIME_SUFFIX
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Prometheus text-format file, e.g. for node_exporter's textfile collector (override with CAPSTONE_METRICS_FILE)
+METRICS_FILE = os.environ.get("CAPSTONE_METRICS_FILE", os.path.join(BASE_DIR, f"capstone_metrics{RUNTIME_SUFFIX}.prom"))
+EXPORT_INTERVAL_S = 15.0
+# Set CAPSTONE_METRICS=0 to turn every observation into a no-op
+METRICS_ENABLED = os.environ.get("CAPSTONE_METRICS", "1") != "0"
+
+# Histogram bucket upper bounds (seconds): 1-2-5 steps from 10 µs to 5 s, then +Inf
+BUCKET_BOUNDS = tuple(m * 10.0 ** e for e in range(-5, 1) for m in (1, 2, 5))
+
+class Histogram:
+    """Fixed-bucket latency histogram; observing is one bisect and three additions."""
+
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)  # last bucket is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Returns the upper bound of the bucket holding quantile q (seconds), or None if empty."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS + (float("inf"),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+class Metrics:
+    """
+    Per-stage latency histograms and bus error counters for the sampling hot path.
+
+    Stages are timed by the caller with perf_counter() and recorded with observe(); bus errors
+    are counted per device and mux channel with count_error(). Everything is written as one
+    Prometheus text-format file by export(), which maybe_export() does at most every
+    EXPORT_INTERVAL_S so it can be called on every sample.
+    """
+
+    def __init__(self, path=METRICS_FILE, export_interval_s=EXPORT_INTERVAL_S, enabled=METRICS_ENABLED,
+                 clock=time.monotonic):
+        self.path = path
+        self.export_interval_s = export_interval_s
+        self.enabled = enabled
+        self.clock = clock
+        self.stages = {}
+        self.errors = {}  # (device, channel) -> count
+        self._lock = threading.Lock()  # the I2C and SPI readers observe from different threads
+        self._last_export = clock()
+
+    def observe(self, stage, seconds):
+        """Records one duration (seconds) for a stage."""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_many(self, stage, durations):
+        """Records several durations for a stage under one lock (e.g. every conversion of a burst)."""
+        if not self.enabled or not durations:
+            return
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            for seconds in durations:
+                histogram.observe(seconds)
+
+    def count_error(self, device, channel=None):
+        """Counts one bus error for a device (e.g. "0x40") on a mux channel (None if not behind the mux)."""
+        if not self.enabled:
+            return
+        key = (device, "" if channel is None else str(channel))
+        with self._lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            stages = {name: (list(h.counts), h.total, h.count) for name, h in self.stages.items()}
+            errors = dict(self.errors)
+        lines = ["# HELP capstone_stage_seconds Time spent in each stage of the sampling loop.",
+                 "# TYPE capstone_stage_seconds histogram"]
+        for name in sorted(stages):
+            counts, total, count = stages[name]
+            cumulative = 0
+            for bound, bucket in zip(BUCKET_BOUNDS, counts):
+                cumulative += bucket
+                lines.append(f'capstone_stage_seconds_bucket{{stage="{name}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'capstone_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'capstone_stage_seconds_sum{{stage="{name}"}} {total:.9f}')
+            lines.append(f'capstone_stage_seconds_count{{stage="{name}"}} {count}')
+        lines += ["# HELP capstone_bus_errors_total Failed bus transactions by device and mux channel.",
+                  "# TYPE capstone_bus_errors_total counter"]
+        for (device, channel), count in sorted(errors.items()):
+            lines.append(f'capstone_bus_errors_total{{device="{device}",channel="{channel}"}} {count}')
+        lines += ["# HELP capstone_metrics_export_timestamp_seconds When this file was written.",
+                  "# TYPE capstone_metrics_export_timestamp_seconds gauge",
+                  f"capstone_metrics_export_timestamp_seconds {time.time():.3f}"]
+        return "\n".join(lines) + "\n"
+
+    def export(self):
+        """Writes the metrics file (write-then-rename, so a scraper never sees a partial file)."""
+        self._last_export = self.clock()
+        if not self.enabled:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(self.render())
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error writing metrics file {self.path}: {e}")
+
+    def maybe_export(self):
+        """Calls export() if EXPORT_INTERVAL_S has passed since the last one."""
+        if self.clock() - self._last_export >= self.export_interval_s:
+            self.export()
+
+    def format_summary(self):
+        """Returns one line per stage with the count and approximate p50/p99 (bucket upper bounds)."""
+        with self._lock:
+            stages = sorted(self.stages.items())
+            errors = sum(self.errors.values())
+        lines = [f"{name:<20} {h.count:>8} calls, mean {h.total / h.count * 1000:8.3f} ms, "
+                 f"p50 <= {h.quantile(0.5) * 1000:g} ms, p99 <= {h.quantile(0.99) * 1000:g} ms"
+                 for name, h in stages if h.count]
+        lines.append(f"{errors} bus errors")
+        return "\n".join(lines)
+
+# One registry per process, shared by every module on the sampling path
+_metrics = None
+
+def get_metrics():
+    """Returns the shared Metrics registry."""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
@@ -0,0 +1,127 @@
+import bisect
+import math
+
+# Linkage geometry per axis: the actuator's base pivot sits base_mm from the axis hinge, its
+# rod end is fixed to the panel panel_mm from the hinge, and the two arms are flat_angle_deg
+# apart when the panel is flat. Tilting the panel by t opens that angle to flat_angle_deg + t.
+# Measure these on the frame and update them here.
+AXIS_GEOMETRY = {
+    "ns": {"base_mm": 40.0, "panel_mm": 40.0, "flat_angle_deg": 90.0, "tilt_limit_deg": 30.0},
+    "ew": {"base_mm": 30.0, "panel_mm": 30.0, "flat_angle_deg": 90.0, "tilt_limit_deg": 40.0},
+}
+# Actuator 1 drives the N-S axis and actuator 2 the E-W axis
+ACTUATOR_AXES = {1: "ns", 2: "ew"}
+TABLE_STEP_DEG = 0.01  # Tilt spacing of the forward table
+TABLE_POINTS = 8192  # Extension samples in the inverse table
+
+class AxisKinematics:
+    """
+    Converts between panel tilt (degrees) and actuator extension (mm from the flat position) for one axis.
+
+    The actuator length comes from the law of cosines on the hinge triangle,
+    L(t) = sqrt(base² + panel² - 2·base·panel·cos(flat_angle + t)), which is not linear in t.
+    Both directions are precomputed once into evenly spaced tables, so a conversion is an
+    index calculation and one linear interpolation, with no trig at run time. Tilts are
+    clamped to ±tilt_limit_deg and extensions to the range those tilts reach.
+    """
+
+    def __init__(self, base_mm, panel_mm, flat_angle_deg, tilt_limit_deg, step_deg=TABLE_STEP_DEG,
+                 table_points=TABLE_POINTS):
+        self.base_mm = base_mm
+        self.panel_mm = panel_mm
+        self.flat_angle_deg = flat_angle_deg
+        self.tilt_limit_deg = tilt_limit_deg
+        if not (0 < flat_angle_deg - tilt_limit_deg and flat_angle_deg + tilt_limit_deg < 180):
+            raise ValueError("linkage angle must stay between 0 and 180 degrees over the tilt range")
+        self.flat_length = self.length(0.0)
+
+        # Forward table: extension at evenly spaced tilts from -limit to +limit
+        count = int(round(2 * tilt_limit_deg / step_deg))
+        self.step_deg = 2 * tilt_limit_deg / count
+        self._tilt_grid = [-tilt_limit_deg + i * self.step_deg for i in range(count + 1)]
+        self._extensions = [self.length(t) - self.flat_length for t in self._tilt_grid]
+        self.min_extension = self._extensions[0]
+        self.max_extension = self._extensions[-1]
+
+        # Inverse table: tilt at evenly spaced extensions, found from the forward table
+        # (the extension rises monotonically with tilt while the linkage angle is below 180°)
+        self.step_mm = (self.max_extension - self.min_extension) / (table_points - 1)
+        self._tilts = []
+        for i in range(table_points):
+            mm = self.min_extension + i * self.step_mm
+            j = min(max(bisect.bisect_right(self._extensions, mm) - 1, 0), count - 1)
+            e0, e1 = self._extensions[j], self._extensions[j + 1]
+            self._tilts.append(self._tilt_grid[j] + (mm - e0) / (e1 - e0) * self.step_deg)
+
+    def length(self, tilt):
+        """Exact actuator length (mm) at a tilt, used to build the tables."""
+        angle = math.radians(self.flat_angle_deg + tilt)
+        return math.sqrt(self.base_mm ** 2 + self.panel_mm ** 2 - 2 * self.base_mm * self.panel_mm * math.cos(angle))
+
+    def extension(self, tilt):
+        """Returns the extension (mm from flat) for a tilt in degrees, clamped to the tilt limits."""
+        if tilt <= -self.tilt_limit_deg:
+            return self.min_extension
+        if tilt >= self.tilt_limit_deg:
+            return self.max_extension
+        position = (tilt + self.tilt_limit_deg) / self.step_deg
+        i = int(position)
+        table = self._extensions
+        return table[i] + (position - i) * (table[i + 1] - table[i])
+
+    def tilt(self, extension):
+        """Returns the tilt in degrees for an extension (mm from flat), clamped to the reachable range."""
+        if extension <= self.min_extension:
+            return -self.tilt_limit_deg
+        if extension >= self.max_extension:
+            return self.tilt_limit_deg
+        position = (extension - self.min_extension) / self.step_mm
+        i = int(position)
+        table = self._tilts
+        return table[i] + (position - i) * (table[i + 1] - table[i])
+
+    def extensions(self, tilts):
+        """Vectorized extension(): returns a NumPy array for an array of tilts."""
+        import numpy as np
+
+        tilts = np.clip(np.asarray(tilts, dtype=float), -self.tilt_limit_deg, self.tilt_limit_deg)
+        grid = np.asarray(self._extensions)
+        return np.interp((tilts + self.tilt_limit_deg) / self.step_deg, np.arange(len(grid)), grid)
+
+    def tilts(self, extensions):
+        """Vectorized tilt(): returns a NumPy array for an array of extensions."""
+        import numpy as np
+
+        extensions = np.clip(np.asarray(extensions, dtype=float), self.min_extension, self.max_extension)
+        grid = np.asarray(self._tilts)
+        return np.interp((extensions - self.min_extension) / self.step_mm, np.arange(len(grid)), grid)
+
+_axes = {}
+
+def get_axis(axis):
+    """Returns the shared AxisKinematics for "ns" or "ew", building its tables on first use."""
+    if axis not in _axes:
+        _axes[axis] = AxisKinematics(**AXIS_GEOMETRY[axis])
+    return _axes[axis]
+
+def tilt_to_extension(axis, tilt):
+    """Returns the actuator extension (mm from flat) for an axis tilt in degrees."""
+    return get_axis(axis).extension(tilt)
+
+def extension_to_tilt(axis, mm):
+    """Returns the axis tilt in degrees for an actuator extension (mm from flat)."""
+    return get_axis(axis).tilt(mm)
+
+def extension_schedule(timestamps, lat, lon):
+    """
+    Actuator extensions for whole arrays of local timestamps, e.g. a day at one-minute steps.
+
+    Returns:
+        {actuator_num: array of mm from flat}, alongside the ns_tilt/ew_tilt arrays they came from.
+    """
+    from optimal_angles import calculate_solar_angles_batch
+
+    angles = calculate_solar_angles_batch(timestamps, lat, lon)
+    schedule = {num: get_axis(axis).extensions(angles[f"{axis}_tilt"]) for num, axis in ACTUATOR_AXES.items()}
+    schedule.update(ns_tilt=angles["ns_tilt"], ew_tilt=angles["ew_tilt"])
+    return schedule
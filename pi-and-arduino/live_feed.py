@@ -0,0 +1,166 @@
+import math
+import mmap
+import os
+import struct
+import tempfile
+
+from energy import POWER_CHANNELS
+from hardware import RUNTIME_SUFFIX
+from sensor_log import CHANNELS, RECORD_FORMAT
+
+# Shared-memory file (tmpfs on the Pi, so nothing touches the SD card)
+LIVE_FEED_PATH = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), f"capstone_live_feed{RUNTIME_SUFFIX}")
+LIVE_FEED_CAPACITY = 4096  # Samples kept in the ring
+
+# Header: magic, version, capacity, record size, sequence counter, samples written
+FEED_MAGIC = b"CAPSFEED"
+FEED_VERSION = 2
+HEADER_FORMAT = "<8sIII4xQQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+SEQ_OFFSET = struct.calcsize("<8sIII4x")
+HEAD_OFFSET = SEQ_OFFSET + 8
+# Each record is a logged sample followed by the day's energy so far (Wh) for each power flow
+ENERGY_NAMES = tuple(POWER_CHANNELS)
+FEED_RECORD_FORMAT = RECORD_FORMAT + "d" * len(ENERGY_NAMES)
+FEED_RECORD_SIZE = struct.calcsize(FEED_RECORD_FORMAT)
+# Polls between checks for a logger restart that recreated the file
+REOPEN_CHECK_POLLS = 50
+
+class LiveFeedWriter:
+    """
+    Publishes samples into a ring buffer in a shared-memory file.
+
+    There is one writer (the acquisition process). Every publish bumps a sequence counter
+    to an odd value, writes the record, then bumps it to an even value, so readers can
+    detect a torn read and retry without any lock (a seqlock). The writer never waits
+    for readers.
+    """
+
+    def __init__(self, path=LIVE_FEED_PATH, capacity=LIVE_FEED_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        size = HEADER_SIZE + capacity * FEED_RECORD_SIZE
+        reuse = False
+        if os.path.exists(path) and os.path.getsize(path) == size:
+            with open(path, "rb") as f:
+                magic, version, existing_capacity, record_size, _, _ = struct.unpack(HEADER_FORMAT, f.read(HEADER_SIZE))
+            reuse = (magic, version, existing_capacity, record_size) == (FEED_MAGIC, FEED_VERSION, capacity, FEED_RECORD_SIZE)
+        if not reuse:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(struct.pack(HEADER_FORMAT, FEED_MAGIC, FEED_VERSION, capacity, FEED_RECORD_SIZE, 0, 0))
+                f.truncate(size)
+            os.replace(tmp_path, path)
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self.seq, self.head = struct.unpack_from("<QQ", self._map, SEQ_OFFSET)
+        self.seq += self.seq % 2  # a crash mid-publish leaves it odd
+        self._pack_into = struct.Struct(FEED_RECORD_FORMAT).pack_into
+
+    def publish(self, timestamp, readings, energy_today=None):
+        """
+        Writes one sample ({channel: value or None}) into the ring, with the day's energy totals
+        ({name: Wh}, as EnergyAccumulator.today) once they include it.
+        """
+        energy_today = energy_today or {}
+        values = [readings.get(channel) for channel in CHANNELS] + [energy_today.get(name) for name in ENERGY_NAMES]
+        self.seq += 1
+        struct.pack_into("<Q", self._map, SEQ_OFFSET, self.seq)
+        self._pack_into(self._map, HEADER_SIZE + (self.head % self.capacity) * FEED_RECORD_SIZE,
+                        timestamp, *[math.nan if v is None else v for v in values])
+        self.head += 1
+        struct.pack_into("<Q", self._map, HEAD_OFFSET, self.head)
+        self.seq += 1
+        struct.pack_into("<Q", self._map, SEQ_OFFSET, self.seq)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+class LiveFeedReader:
+    """
+    Non-blocking reader for a LiveFeedWriter's ring buffer.
+
+    latest() and recent() only copy bytes out of shared memory; if the writer was mid-publish
+    they retry a couple of times and then fall back to the previous result, so a caller on
+    the UI thread never waits on the acquisition process.
+    """
+
+    def __init__(self, path=LIVE_FEED_PATH, retries=3):
+        self.path = path
+        self.retries = retries
+        self._file = None
+        self._map = None
+        self._inode = None
+        self._capacity = 0
+        self._polls = 0
+        self._last = None
+        self._unpack_from = struct.Struct(FEED_RECORD_FORMAT).unpack_from
+
+    def _open(self):
+        self.close()
+        try:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, capacity, record_size, _, _ = struct.unpack_from(HEADER_FORMAT, self._map)
+            if (magic, version, record_size) != (FEED_MAGIC, FEED_VERSION, FEED_RECORD_SIZE):
+                raise ValueError("not a live feed file")
+            self._capacity = capacity
+            self._inode = os.fstat(self._file.fileno()).st_ino
+            return True
+        except Exception:
+            self.close()
+            return False
+
+    def _ensure_open(self):
+        self._polls += 1
+        if self._map is not None and self._polls % REOPEN_CHECK_POLLS:
+            return True
+        if self._map is not None:
+            try:
+                if os.stat(self.path).st_ino == self._inode:
+                    return True
+            except OSError:
+                pass
+        return self._open()
+
+    def _read(self, count):
+        for _ in range(self.retries):
+            seq, head = struct.unpack_from("<QQ", self._map, SEQ_OFFSET)
+            if seq % 2:
+                continue
+            count = min(count, head, self._capacity)
+            records = []
+            for i in range(head - count, head):
+                record = self._unpack_from(self._map, HEADER_SIZE + (i % self._capacity) * FEED_RECORD_SIZE)
+                records.append((record[0], dict(zip(CHANNELS, record[1:len(CHANNELS) + 1])),
+                                dict(zip(ENERGY_NAMES, record[len(CHANNELS) + 1:]))))
+            if struct.unpack_from("<Q", self._map, SEQ_OFFSET)[0] == seq:
+                return records
+        return None
+
+    def latest(self):
+        """
+        Returns the newest (timestamp, readings, energy_today), or None if nothing has been published yet.
+        energy_today is {name: Wh} (NaN if the logger published none).
+        """
+        if not self._ensure_open():
+            return None
+        records = self._read(1)
+        if records:
+            self._last = records[0]
+        return self._last
+
+    def recent(self, count):
+        """Returns up to count of the newest (timestamp, readings), oldest first. Empty if unavailable."""
+        if not self._ensure_open():
+            return []
+        return [(timestamp, readings) for timestamp, readings, _ in self._read(count) or []]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,197 @@
+import bisect
+import datetime
+import os
+import struct
+
+from sensor_log import CHANNELS, DATA_DIR, get_log_path, parse_text_lines, read_log
+
+# One index entry every this many lines of a text log
+INDEX_STRIDE = 1024
+# Index file: magic, bytes of the log covered so far, then (timestamp, byte offset) entries
+INDEX_MAGIC = b"CAPSIDX\0"
+INDEX_HEADER_FORMAT = "<8sQ"
+INDEX_HEADER_SIZE = struct.calcsize(INDEX_HEADER_FORMAT)
+INDEX_ENTRY_FORMAT = "<dQ"
+INDEX_ENTRY_SIZE = struct.calcsize(INDEX_ENTRY_FORMAT)
+
+def get_text_log_path(directory, date):
+    """Returns the text log file for a local date (as written by sensorScript.py)."""
+    return os.path.join(directory, f"sensor_data_{date.isoformat()}.txt")
+
+class TextLogIndex:
+    """
+    Sparse timestamp -> byte offset index for one text log, kept in a .idx file next to it.
+
+    Every INDEX_STRIDE lines, the first line of a new timestamp is recorded, so a range read
+    can seek straight to the entry before the window instead of parsing the file from the
+    top. The index remembers how much of the log it covers; when the log has grown, only
+    the appended part is scanned.
+    """
+
+    def __init__(self, log_path):
+        self.log_path = log_path
+        self.index_path = log_path + ".idx"
+        self.timestamps = []
+        self.offsets = []
+        self.covered = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "rb") as f:
+                magic, covered = struct.unpack(INDEX_HEADER_FORMAT, f.read(INDEX_HEADER_SIZE))
+                data = f.read()
+            if magic != INDEX_MAGIC:
+                raise ValueError("bad magic")
+            for timestamp, offset in struct.iter_unpack(INDEX_ENTRY_FORMAT, data[:len(data) - len(data) % INDEX_ENTRY_SIZE]):
+                self.timestamps.append(timestamp)
+                self.offsets.append(offset)
+            self.covered = covered
+        except Exception as e:
+            print(f"Error reading index {self.index_path}: {e}. Rebuilding it.")
+            self.timestamps, self.offsets, self.covered = [], [], 0
+
+    def update(self):
+        """Indexes whatever was appended to the log since the last update. Returns True if the index changed."""
+        size = os.path.getsize(self.log_path)
+        if size < self.covered:
+            # Log was replaced or truncated
+            self.timestamps, self.offsets, self.covered = [], [], 0
+        if size == self.covered:
+            return False
+        # Re-scan from the last entry so the stride carries on where it stopped
+        start = self.offsets.pop() if self.offsets else 0
+        if self.timestamps:
+            self.timestamps.pop()
+        lines_since_entry = INDEX_STRIDE
+        last_time = None
+        offset = start
+        with open(self.log_path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partially written line, picked up on the next update
+                time_str = line[:19]
+                if time_str != last_time:
+                    if lines_since_entry >= INDEX_STRIDE:
+                        try:
+                            timestamp = datetime.datetime.strptime(time_str.decode(), "%Y-%m-%d %H:%M:%S").timestamp()
+                            self.timestamps.append(timestamp)
+                            self.offsets.append(offset)
+                            lines_since_entry = 0
+                        except ValueError:
+                            pass
+                    last_time = time_str
+                lines_since_entry += 1
+                offset += len(line)
+        self.covered = offset
+        self._save()
+        return True
+
+    def _save(self):
+        tmp_path = self.index_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(struct.pack(INDEX_HEADER_FORMAT, INDEX_MAGIC, self.covered))
+                for entry in zip(self.timestamps, self.offsets):
+                    f.write(struct.pack(INDEX_ENTRY_FORMAT, *entry))
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            print(f"Error writing index {self.index_path}: {e}")
+
+    def seek_offset(self, timestamp):
+        """Returns the byte offset of the last indexed sample at or before timestamp."""
+        i = bisect.bisect_right(self.timestamps, timestamp) - 1
+        return self.offsets[i] if i >= 0 else 0
+
+def read_text_range(path, start, end, channels=None):
+    """
+    Yields (timestamp, {channel: value}) for samples in a text log with start <= timestamp < end.
+
+    Seeks to the window through the sparse index (updating it first if the log has grown)
+    and stops reading at the first sample past end.
+    """
+    index = TextLogIndex(path)
+    index.update()
+    with open(path, "rb") as f:
+        f.seek(index.seek_offset(start))
+        lines = (line.decode("utf-8", "replace") for line in f)
+        for timestamp, readings in parse_text_lines(lines, channels):
+            if timestamp >= end:
+                break
+            if timestamp >= start:
+                yield timestamp, readings
+
+def read_binary_range(path, start, end, channels=None):
+    """Returns the records of a binary log with start <= timestamp < end, as a memory-mapped slice."""
+    import numpy as np
+
+    records = read_log(path)
+    first, last = np.searchsorted(records["timestamp"], [start, end], side="left")
+    window = records[first:last]
+    if channels is not None:
+        window = window[["timestamp"] + list(channels)]
+    return window
+
+class LogQuery:
+    """
+    Time-range queries over the sensor data directory.
+
+    Each local day is read from its binary log if there is one, otherwise from its text log.
+    Only the part of each file inside the window is read.
+    """
+
+    def __init__(self, directory=DATA_DIR):
+        self.directory = directory
+
+    def _days(self, start, end):
+        day = datetime.date.fromtimestamp(start)
+        last = datetime.date.fromtimestamp(max(start, end - 1e-6))
+        while day <= last:
+            yield day
+            day += datetime.timedelta(days=1)
+
+    def samples(self, start, end, channels=None):
+        """
+        Yields (timestamp, {channel: value}) for start <= timestamp < end (Unix times).
+
+        Args:
+            channels: Channels to return, e.g. ["solar_current"] (default: all).
+        """
+        for day in self._days(start, end):
+            binary_path = get_log_path(self.directory, day)
+            text_path = get_text_log_path(self.directory, day)
+            if os.path.exists(binary_path):
+                wanted = list(channels) if channels is not None else list(CHANNELS)
+                for record in read_binary_range(binary_path, start, end, wanted):
+                    yield float(record["timestamp"]), {channel: float(record[channel]) for channel in wanted}
+            elif os.path.exists(text_path):
+                yield from read_text_range(text_path, start, end, channels)
+
+    def arrays(self, start, end, channels=None):
+        """Returns {"timestamp": array, channel: array, ...} for start <= timestamp < end. Missing values are NaN."""
+        import numpy as np
+
+        wanted = list(channels) if channels is not None else list(CHANNELS)
+        chunks = []
+        for day in self._days(start, end):
+            binary_path = get_log_path(self.directory, day)
+            text_path = get_text_log_path(self.directory, day)
+            if os.path.exists(binary_path):
+                window = read_binary_range(binary_path, start, end, wanted)
+                chunks.append({name: np.asarray(window[name], dtype=float) for name in ["timestamp"] + wanted})
+            elif os.path.exists(text_path):
+                rows = [(timestamp, *[np.nan if readings.get(c) is None else readings[c] for c in wanted])
+                        for timestamp, readings in read_text_range(text_path, start, end, wanted)]
+                table = np.array(rows, dtype=float).reshape(-1, len(wanted) + 1)
+                chunks.append({name: table[:, i] for i, name in enumerate(["timestamp"] + wanted)})
+        if not chunks:
+            return {name: np.zeros(0) for name in ["timestamp"] + wanted}
+        return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in ["timestamp"] + wanted}
+
+    def power(self, start, end, source="solar"):
+        """Returns (timestamps, watts) for "solar" or "load" power over a window."""
+        data = self.arrays(start, end, [f"{source}_voltage", f"{source}_current"])
+        return data["timestamp"], data[f"{source}_voltage"] * data[f"{source}_current"]
@@ -0,0 +1,121 @@
+import time
+from hardware import get_spi
+from instrumentation import get_metrics
+
+# 10-bit ADC: codes 0-1023
+MCP3008_MAX_CODE = 1023
+
+def mcp3008_command(channel):
+    """Returns the 3-byte SPI command that reads one MCP3008 channel (same framing as read_mcp3008)."""
+    if channel < 0 or channel > 7:
+        raise ValueError("MCP3008 channel must be between 0 and 7")
+    command = 0b00000001  # Start bit
+    command |= (1 << 1)  # Single-ended mode
+    command |= (channel << 2)  # Channel select
+    return [command, 0b00000000, 0b00000000]
+
+def build_current_table(sensitivity, vcc, zero_current_voltage=None):
+    """
+    Precomputes the ACS712 current (Amperes) for every ADC code.
+
+    Args:
+        sensitivity: Volts per Amp of the ACS712 (0.066 for the 30A version).
+        vcc: Supply voltage to the ACS712 and MCP3008.
+        zero_current_voltage: Measured output at 0 A. Defaults to the nominal vcc / 2.
+
+    Returns:
+        A list of 1024 currents indexed by ADC code.
+    """
+    if zero_current_voltage is None:
+        zero_current_voltage = vcc / 2.0
+    return [((code * vcc) / MCP3008_MAX_CODE - zero_current_voltage) / sensitivity
+            for code in range(MCP3008_MAX_CODE + 1)]
+
+class MCP3008Sampler:
+    """
+    Reads several MCP3008 channels with oversampling and decimates each to one value.
+
+    The MCP3008 needs chip select released between conversions, so every conversion is
+    still its own xfer2. The per-reading cost goes into a tight loop over prebuilt command
+    frames, and each code is converted through a per-channel lookup table instead of
+    float math.
+    """
+
+    def __init__(self, tables, oversample=16, decimation="mean", spi=None, metrics=None):
+        """
+        Args:
+            tables: {channel: 1024-entry table from build_current_table, or None for raw codes}.
+            oversample: Conversions per channel averaged into one sample.
+            decimation: "mean" or "median".
+            spi: SpiDev to use. Defaults to the shared device from hardware.py.
+            metrics: Registry that gets the time of every conversion. Defaults to the shared one.
+        """
+        if decimation not in ("mean", "median"):
+            raise ValueError("decimation must be 'mean' or 'median'")
+        if oversample < 1:
+            raise ValueError("oversample must be at least 1")
+        self.tables = {channel: (table if table is not None else list(range(MCP3008_MAX_CODE + 1)))
+                       for channel, table in tables.items()}
+        self.commands = {channel: mcp3008_command(channel) for channel in tables}
+        self.oversample = oversample
+        self.decimation = decimation
+        self.spi = spi
+        self.metrics = metrics if metrics is not None else get_metrics()
+        self.conversions = 0
+        self.busy_time = 0.0
+        self.last_sample_rate = 0.0
+
+    def read_codes(self):
+        """Reads oversample raw codes from every channel, interleaving channels. Returns {channel: [codes]}."""
+        spi = self.spi if self.spi is not None else get_spi()
+        xfer2 = spi.xfer2
+        channels = list(self.commands)
+        commands = [self.commands[channel] for channel in channels]
+        codes = [[] for _ in channels]
+        perf_counter = time.perf_counter
+        durations = []
+        start = perf_counter()
+        try:
+            for _ in range(self.oversample):
+                for command, channel_codes in zip(commands, codes):
+                    # xfer2 overwrites the list it is given, so send a copy
+                    before = perf_counter()
+                    response = xfer2(command[:])
+                    durations.append(perf_counter() - before)
+                    channel_codes.append(((response[1] & 0x03) << 8) | response[2])
+        except Exception:
+            self.metrics.count_error("mcp3008")
+            raise
+        elapsed = perf_counter() - start
+        self.metrics.observe_many("spi_xfer", durations)
+        count = self.oversample * len(channels)
+        self.conversions += count
+        self.busy_time += elapsed
+        self.last_sample_rate = count / elapsed if elapsed > 0 else 0.0
+        return dict(zip(channels, codes))
+
+    def sample(self):
+        """Returns {channel: decimated value}, in the units of each channel's table."""
+        result = {}
+        for channel, channel_codes in self.read_codes().items():
+            table = self.tables[channel]
+            if self.decimation == "mean":
+                result[channel] = sum(table[code] for code in channel_codes) / len(channel_codes)
+            else:
+                channel_codes.sort()
+                result[channel] = table[channel_codes[len(channel_codes) // 2]]
+        return result
+
+    def calibrate_zero_voltage(self, channel, vcc, rounds=64):
+        """Returns the mean output voltage of a channel, for use as zero_current_voltage with no load connected."""
+        oversample = self.oversample
+        self.oversample = rounds
+        try:
+            channel_codes = self.read_codes()[channel]
+        finally:
+            self.oversample = oversample
+        return sum(channel_codes) / len(channel_codes) * vcc / MCP3008_MAX_CODE
+
+    def average_sample_rate(self):
+        """Returns the conversions per second achieved while reading, over the sampler's lifetime."""
+        return self.conversions / self.busy_time if self.busy_time > 0 else 0.0
@@ -1,28 +1,35 @@
 import math
 import datetime
-import requests
-from geopy.geocoders import Nominatim
-from timezonefinder import TimezoneFinder
-import pytz
+import os
+from timezone_cache import get_site_timezone
+from site_location import SiteLocationStore, REFRESH_TIMEOUT_S
+from kinematics import tilt_to_extension
+
+# Sun position model: "formula" (the functions below, off by up to about a degree) or "spa"
+# (solar_spa.py, within 0.01° of the full NREL SPA). Set with CAPSTONE_SOLAR_MODE.
+SOLAR_MODE_ENV = "CAPSTONE_SOLAR_MODE"
+SOLAR_MODE = os.environ.get(SOLAR_MODE_ENV, "formula").strip().lower()
+if SOLAR_MODE not in ("formula", "spa"):
+    raise ValueError(f"{SOLAR_MODE_ENV} must be 'formula' or 'spa', not {SOLAR_MODE!r}")
 
 # Calculate solar declination angle (in radians)
 def calculate_declination(day_of_year):
     return -23.45 * math.cos(math.radians(360/365 * (day_of_year+10)))
 
-def get_utc_offset(lat, lon):
-    tf = TimezoneFinder()
-    timezone_name = tf.timezone_at(lat=lat, lng=lon)
-    if timezone_name is None:
+# Get the UTC offset (in hours) at the given local time, defaulting to now.
+# The timezone and each day's DST transitions are cached per site, see timezone_cache.py
+def get_utc_offset(lat, lon, when=None):
+    try:
+        site_timezone = get_site_timezone(lat, lon)
+    except ValueError:
         return "Time zone not found"
-    
-    timezone = pytz.timezone(timezone_name)
-    now = datetime.datetime.now(timezone)
-    utc_offset = now.utcoffset().total_seconds() / 3600
-    return utc_offset
+    return site_timezone.utc_offset(when)
 
 # Calculate solar hour angle (in radians)
-def calculate_hour_angle(hour, minute, day_of_year, lat, lon):
-    LSTM = 15 * get_utc_offset(lat, lon)
+def calculate_hour_angle(hour, minute, day_of_year, lat, lon, utc_offset=None):
+    if utc_offset is None:
+        utc_offset = get_utc_offset(lat, lon)
+    LSTM = 15 * utc_offset
     B = 360/365 * (day_of_year - 81)
     EoT = 9.87*math.sin(math.radians(2*B)) - 7.53*math.cos(math.radians(B)) - 1.5*math.sin(math.radians(B))
     TC = 4*(lon - LSTM) + EoT
@@ -57,6 +64,78 @@ def calculate_azimuth_angle(lat, dec, alt, ha):
     
     return azimuth
 
+# Clamp the sun's altitude/azimuth to the N-S and E-W tilt range of the panel
+def calculate_optimal_tilts(altitude_angle, azimuth_angle):
+    corrected_azimuth_angle = 180 - azimuth_angle
+    ns_tilt = altitude_angle if -30 <= altitude_angle <= 30 else max(-30, min(30, altitude_angle)) # Clamp N-S tilt to a minimum of 0
+    ew_tilt = corrected_azimuth_angle if -40 <= corrected_azimuth_angle <= 40 else max(-40, min(40, corrected_azimuth_angle))
+    return ns_tilt, ew_tilt
+
+# Calculate altitude, azimuth and clamped tilts for whole arrays of timestamps at once.
+# NumPy is imported here rather than at the top of the file so the scalar functions
+# keep working on a Pi where NumPy is not installed.
+def calculate_solar_angles_batch(timestamps, lat, lon, utc_offset=None, mode=None):
+    """
+    Vectorized version of the declination/hour angle/altitude/azimuth chain.
+
+    Args:
+        timestamps: Local (naive) timestamps, as a list of datetimes or a datetime64 array.
+        lat: Latitude in degrees, a scalar or an array matching timestamps.
+        lon: Longitude in degrees, a scalar or an array matching timestamps.
+        utc_offset: UTC offset in hours (scalar or array). Looked up per timestamp from
+            lat/lon if omitted, so DST is applied correctly across the whole range.
+        mode: "formula" or "spa" (default SOLAR_MODE). "spa" needs a scalar lat/lon.
+
+    Returns:
+        A dict of float arrays: altitude, azimuth, ns_tilt and ew_tilt (degrees).
+    """
+    import numpy as np
+
+    times = np.asarray(timestamps, dtype="datetime64[ms]")
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if utc_offset is None:
+        if lat.ndim or lon.ndim:
+            raise ValueError("utc_offset is required when lat/lon are arrays")
+        utc_offset = get_site_timezone(float(lat), float(lon)).utc_offsets(times)
+    utc_offset = np.asarray(utc_offset, dtype=float)
+
+    if (mode or SOLAR_MODE) == "spa":
+        if lat.ndim or lon.ndim:
+            raise ValueError("lat/lon arrays are only supported in formula mode")
+        from solar_spa import solar_angles_batch
+
+        altitude, azimuth = solar_angles_batch(times, float(lat), float(lon), utc_offset)
+        return {"altitude": altitude, "azimuth": azimuth, "ns_tilt": np.clip(altitude, -30, 30),
+                "ew_tilt": np.clip(180 - azimuth, -40, 40)}
+
+    days = times.astype("datetime64[D]")
+    day_of_year = (days - days.astype("datetime64[Y]")).astype(float) + 1
+    hours = (times - days) / np.timedelta64(1, "h")
+
+    # Same formulas as calculate_declination / calculate_hour_angle
+    declination = -23.45 * np.cos(np.radians(360/365 * (day_of_year+10)))
+    B = np.radians(360/365 * (day_of_year - 81))
+    EoT = 9.87*np.sin(2*B) - 7.53*np.cos(B) - 1.5*np.sin(B)
+    TC = 4*(lon - 15*utc_offset) + EoT
+    HRA = 15*(hours + TC/60 - 12)
+
+    latitude = np.radians(lat)
+    dec = np.radians(declination)
+    sin_alt = np.sin(latitude)*np.sin(dec) + np.cos(latitude)*np.cos(dec)*np.cos(np.radians(HRA))
+    altitude = np.degrees(np.arcsin(np.clip(sin_alt, -1.0, 1.0)))
+
+    numerator = np.sin(dec)*np.cos(latitude) - np.cos(dec)*np.sin(latitude)*np.cos(np.radians(HRA))
+    cos_az = numerator / np.cos(np.radians(altitude))
+    azimuth = np.degrees(np.arccos(np.clip(cos_az, -1.0, 1.0)))
+    # Adjust azimuth angle for hemisphere (see calculate_azimuth_angle)
+    afternoon = np.where(lat > 0, HRA > 0, HRA < 0)
+    azimuth = np.where(afternoon, 360 - azimuth, azimuth)
+
+    ns_tilt = np.clip(altitude, -30, 30)
+    ew_tilt = np.clip(180 - azimuth, -40, 40)
+    return {"altitude": altitude, "azimuth": azimuth, "ns_tilt": ns_tilt, "ew_tilt": ew_tilt}
+
 # Get the day of the year from the current date
 def get_day_of_year():
     now = datetime.datetime.now()
@@ -66,11 +145,14 @@ def get_day_of_year():
 def get_current_datetime():
     return datetime.datetime.now()
 
-# Get the Raspberry Pi's latitude and longitude using the geopy library
-def get_latitude_longitude():
+# Get the Raspberry Pi's latitude and longitude from its IP address.
+# Prefer SiteLocationStore, which only calls this in the background and caches the result
+def get_latitude_longitude(timeout=REFRESH_TIMEOUT_S):
     try:
+        import requests  # Only needed for this lookup, and slow to import on a Pi
+
         # Use an IP geolocation API to determine location
-        response = requests.get("http://ip-api.com/json")
+        response = requests.get("http://ip-api.com/json", timeout=timeout)
         data = response.json()
         if data["status"] == "success":
             return data["lat"], data["lon"]
@@ -87,29 +169,39 @@ def main():
     hour = now.hour
     minute = now.minute
 
-    # Get the Raspberry Pi's latitude and longitude
-    latitude, longitude = get_latitude_longitude()
+    # Get the Raspberry Pi's latitude and longitude (configured, cached, or looked up on first run)
+    location = SiteLocationStore()
+    latitude, longitude = location.get(wait=REFRESH_TIMEOUT_S)
     if latitude is None or longitude is None:
-        print("Unable to determine location. Please provide latitude and longitude manually.")
+        print("Unable to determine location. Please set CAPSTONE_LATITUDE/CAPSTONE_LONGITUDE or create site_config.json.")
         return
 
     # Calculate day of the year
-    day_of_year = get_day_of_year()
+    day_of_year = now.timetuple().tm_yday
 
     # Calculate solar angles
-    declination = calculate_declination(day_of_year)
-    hour_angle = calculate_hour_angle(hour, minute, day_of_year, latitude, longitude)
-    altitude_angle = calculate_altitude_angle(latitude, declination, hour_angle)
-    azimuth_angle = calculate_azimuth_angle(latitude, declination, altitude_angle, hour_angle)
+    utc_offset = get_utc_offset(latitude, longitude, now)
+    if SOLAR_MODE == "spa":
+        from solar_spa import solar_position
+
+        altitude_angle, azimuth_angle = solar_position(now, latitude, longitude, utc_offset)
+    else:
+        declination = calculate_declination(day_of_year)
+        hour_angle = calculate_hour_angle(hour, minute, day_of_year, latitude, longitude, utc_offset)
+        altitude_angle = calculate_altitude_angle(latitude, declination, hour_angle)
+        azimuth_angle = calculate_azimuth_angle(latitude, declination, altitude_angle, hour_angle)
 
     # Calculate optimal E-W and N-S tilts
-    corrected_azimuth_angle = 180 - azimuth_angle
-    ns_tilt = altitude_angle if -30 <= altitude_angle <= 30 else max(-30, min(30, altitude_angle)) # Clamp N-S tilt to a minimum of 0
-    ew_tilt = corrected_azimuth_angle if -40 <= corrected_azimuth_angle <= 40 else max(-40, min(40, corrected_azimuth_angle))
+    ns_tilt, ew_tilt = calculate_optimal_tilts(altitude_angle, azimuth_angle)
 
     # Output results
     print(f"Optimal North-South tilt (from horizontal): {ns_tilt:.2f} degrees")
     print(f"Optimal East-West tilt (from center): {ew_tilt:.2f} degrees")
+    print(f"Actuator 1 (N-S) extension from flat: {tilt_to_extension('ns', ns_tilt):.2f} mm")
+    print(f"Actuator 2 (E-W) extension from flat: {tilt_to_extension('ew', ew_tilt):.2f} mm")
+
+    # Let a background location refresh finish writing the cache before exiting
+    location.wait_for_refresh(REFRESH_TIMEOUT_S)
 
 if __name__ == "__main__":
     main()
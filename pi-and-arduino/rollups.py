@@ -0,0 +1,263 @@
+import argparse
+import datetime
+import glob
+import math
+import os
+import shutil
+import struct
+import time
+
+from sensor_log import CHANNELS, DATA_DIR, parse_text_log, read_log
+
+ROLLUP_DIR = os.path.join(DATA_DIR, "rollups")
+
+# name: (bucket seconds, partition ("day", "month" or "all"), retention in days or None to keep forever)
+TIERS = {
+    "1s": (1, "day", 2),
+    "1min": (60, "day", 31),
+    "15min": (900, "month", 400),
+    "daily": (86400, "all", None),
+}
+
+# Record: bucket start (Unix time), then min, max, mean and count for each channel
+RECORD_FORMAT = "<d" + "fffI" * len(CHANNELS)
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+FLUSH_INTERVAL_S = 60.0
+
+def record_dtype():
+    """Returns the NumPy dtype matching one rollup record."""
+    import numpy as np
+    fields = [("start", "<f8")]
+    for channel in CHANNELS:
+        fields += [(f"{channel}_min", "<f4"), (f"{channel}_max", "<f4"),
+                   (f"{channel}_mean", "<f4"), (f"{channel}_count", "<u4")]
+    return np.dtype(fields)
+
+def bucket_bounds(tier, timestamp):
+    """
+    Returns (start, end) Unix times of the tier bucket containing timestamp.
+
+    Daily buckets run from local midnight to the next, so they are 23 or 25 hours long on DST days.
+    """
+    seconds = TIERS[tier][0]
+    if seconds == 86400:
+        midnight = datetime.datetime.combine(datetime.date.fromtimestamp(timestamp), datetime.time())
+        return midnight.timestamp(), (midnight + datetime.timedelta(days=1)).timestamp()
+    start = timestamp - timestamp % seconds
+    return start, start + seconds
+
+def partition_name(tier, start):
+    """Returns the file name holding the tier's bucket that starts at start."""
+    partition = TIERS[tier][1]
+    if partition == "all":
+        return f"rollup_{tier}.bin"
+    date = datetime.date.fromtimestamp(start)
+    key = date.isoformat() if partition == "day" else date.isoformat()[:7]
+    return f"rollup_{tier}_{key}.bin"
+
+class _Bucket:
+    __slots__ = ("start", "end", "mins", "maxs", "sums", "counts")
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.mins = [math.inf] * len(CHANNELS)
+        self.maxs = [-math.inf] * len(CHANNELS)
+        self.sums = [0.0] * len(CHANNELS)
+        self.counts = [0] * len(CHANNELS)
+
+    def pack(self):
+        values = [self.start]
+        for i in range(len(CHANNELS)):
+            count = self.counts[i]
+            if count:
+                values += [self.mins[i], self.maxs[i], self.sums[i] / count, count]
+            else:
+                values += [math.nan, math.nan, math.nan, 0]
+        return struct.pack(RECORD_FORMAT, *values)
+
+class RollupStore:
+    """
+    Keeps min/max/mean/count per channel at several resolutions, updated as samples arrive.
+
+    Each tier holds one open bucket in memory. When a sample falls into a new bucket the old
+    one is closed into a fixed-width record; closed records are appended to the tier's
+    partition file every flush_interval_s. Partitions older than the tier's retention are
+    deleted. A bucket that was still open at shutdown is written as is, and query() merges
+    records that share a start time, so restarts do not lose or double count samples.
+    """
+
+    def __init__(self, directory=ROLLUP_DIR, flush_interval_s=FLUSH_INTERVAL_S, clock=time.monotonic):
+        self.directory = directory
+        self.flush_interval_s = flush_interval_s
+        self.clock = clock
+        self.buckets = {tier: None for tier in TIERS}
+        self.pending = {}  # file name -> bytearray of closed records
+        self._last_flush = clock()
+        self._retention_day = None
+
+    def add_sample(self, timestamp, readings):
+        """Adds one sample ({channel: value or None}) to every tier."""
+        values = [readings.get(channel) for channel in CHANNELS]
+        for tier in TIERS:
+            bucket = self.buckets[tier]
+            if bucket is None or not bucket.start <= timestamp < bucket.end:
+                if bucket is not None:
+                    self._close(tier, bucket)
+                bucket = self.buckets[tier] = _Bucket(*bucket_bounds(tier, timestamp))
+            for i, value in enumerate(values):
+                if value is None or value != value:  # skip failed reads (None or NaN)
+                    continue
+                if value < bucket.mins[i]:
+                    bucket.mins[i] = value
+                if value > bucket.maxs[i]:
+                    bucket.maxs[i] = value
+                bucket.sums[i] += value
+                bucket.counts[i] += 1
+        if self.clock() - self._last_flush >= self.flush_interval_s:
+            self.flush()
+
+    def _close(self, tier, bucket):
+        name = partition_name(tier, bucket.start)
+        self.pending.setdefault(name, bytearray()).extend(bucket.pack())
+
+    def flush(self):
+        """Appends closed buckets to their partition files and applies retention once a day."""
+        self._last_flush = self.clock()
+        if self.pending:
+            os.makedirs(self.directory, exist_ok=True)
+        for name, records in list(self.pending.items()):
+            try:
+                with open(os.path.join(self.directory, name), "ab") as f:
+                    f.write(records)
+                del self.pending[name]
+            except Exception as e:
+                print(f"Error writing rollup file {name}: {e}")
+        today = datetime.date.today()
+        if self._retention_day != today:
+            self._retention_day = today
+            self.apply_retention(today)
+
+    def apply_retention(self, today):
+        """Deletes partition files that are entirely older than their tier's retention."""
+        for tier, (_, partition, retention_days) in TIERS.items():
+            if retention_days is None:
+                continue
+            cutoff = (today - datetime.timedelta(days=retention_days)).isoformat()
+            for path in glob.glob(os.path.join(self.directory, f"rollup_{tier}_*.bin")):
+                key = os.path.basename(path)[len(f"rollup_{tier}_"):-len(".bin")]
+                # A month partition ends before the cutoff if its key sorts before the cutoff's month
+                if (key < cutoff) if partition == "day" else (key < cutoff[:7]):
+                    os.remove(path)
+
+    def close(self):
+        """Writes the open buckets (partial) and all pending records."""
+        for tier, bucket in self.buckets.items():
+            if bucket is not None:
+                self._close(tier, bucket)
+                self.buckets[tier] = None
+        self.flush()
+
+    def query(self, tier, start, end):
+        """
+        Returns the tier's records with start <= bucket start < end, sorted and merged by bucket.
+
+        Only the partition files overlapping the range are read. Buckets still open in memory
+        are not included.
+        """
+        import numpy as np
+
+        partition = TIERS[tier][1]
+        if partition == "all":
+            names = [partition_name(tier, start)]
+        else:
+            names = []
+            day = datetime.date.fromtimestamp(start)
+            last = datetime.date.fromtimestamp(end)
+            while day <= last:
+                name = partition_name(tier, datetime.datetime.combine(day, datetime.time()).timestamp())
+                if name not in names:
+                    names.append(name)
+                day += datetime.timedelta(days=1)
+        chunks = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                count = os.path.getsize(path) // RECORD_SIZE
+                records = np.fromfile(path, dtype=record_dtype(), count=count)
+                chunks.append(records[(records["start"] >= start) & (records["start"] < end)])
+        if not chunks:
+            return np.zeros(0, dtype=record_dtype())
+        return merge_records(np.concatenate(chunks))
+
+def merge_records(records):
+    """Sorts rollup records by start and combines records that cover the same bucket."""
+    import numpy as np
+
+    records = np.sort(records, order="start")
+    starts, first = np.unique(records["start"], return_index=True)
+    if len(starts) == len(records):
+        return records
+    merged = np.zeros(len(starts), dtype=records.dtype)
+    merged["start"] = starts
+    group = np.searchsorted(starts, records["start"])
+    for channel in CHANNELS:
+        counts = records[f"{channel}_count"].astype(np.float64)
+        means = np.nan_to_num(records[f"{channel}_mean"].astype(np.float64))
+        total = np.bincount(group, weights=counts, minlength=len(starts))
+        weighted = np.bincount(group, weights=means * counts, minlength=len(starts))
+        mins = np.full(len(starts), np.inf)
+        maxs = np.full(len(starts), -np.inf)
+        np.fmin.at(mins, group, records[f"{channel}_min"])
+        np.fmax.at(maxs, group, records[f"{channel}_max"])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            merged[f"{channel}_mean"] = np.where(total > 0, weighted / total, np.nan)
+        merged[f"{channel}_min"] = np.where(np.isfinite(mins), mins, np.nan)
+        merged[f"{channel}_max"] = np.where(np.isfinite(maxs), maxs, np.nan)
+        merged[f"{channel}_count"] = total
+    return merged
+
+def iter_log_samples(paths):
+    """Yields (timestamp, readings) from text (.txt) and binary (.bin) sensor logs, in file order."""
+    for path in paths:
+        if path.endswith(".bin"):
+            records = read_log(path)
+            for record in records:
+                yield float(record["timestamp"]), {channel: float(record[channel]) for channel in CHANNELS}
+        else:
+            yield from parse_text_log(path)
+
+def backfill(paths, directory=ROLLUP_DIR):
+    """Builds rollups from existing logs (sorted by date in the file name). Returns the number of samples."""
+    store = RollupStore(directory, flush_interval_s=float("inf"))
+    count = 0
+    last_timestamp = None
+    for timestamp, readings in iter_log_samples(sorted(paths, key=os.path.basename)):
+        if last_timestamp is not None and timestamp < last_timestamp:
+            continue  # e.g. the same day logged in both text and binary form
+        store.add_sample(timestamp, readings)
+        last_timestamp = timestamp
+        count += 1
+    store.close()
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-resolution sensor rollups")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = subparsers.add_parser("backfill", help="build rollups from existing sensor logs")
+    backfill_parser.add_argument("logs", nargs="*", help="log files (default: every log in the data directory)")
+    backfill_parser.add_argument("--data-dir", default=DATA_DIR)
+    backfill_parser.add_argument("--rebuild", action="store_true", help="delete existing rollups first")
+    args = parser.parse_args()
+
+    directory = os.path.join(args.data_dir, "rollups")
+    if os.path.isdir(directory) and os.listdir(directory):
+        if not args.rebuild:
+            print(f"{directory} already has rollups. Use --rebuild to replace them.")
+            exit(1)
+        shutil.rmtree(directory)
+    logs = args.logs or (glob.glob(os.path.join(args.data_dir, "sensor_data_*.txt"))
+                         + glob.glob(os.path.join(args.data_dir, "sensor_data_*.bin")))
+    start = time.perf_counter()
+    count = backfill(logs, directory)
+    print(f"Backfilled {count} samples from {len(logs)} logs in {time.perf_counter() - start:.1f} s")
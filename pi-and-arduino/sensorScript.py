@@ -1,14 +1,18 @@
+import argparse
 import time
-import spidev
-import smbus
 from datetime import datetime
 import os  # Import the os module for file operations
-
-# I2C bus for INA219
-bus = smbus.SMBus(1)
-
-# TCA9548A address
-TCA9548A_ADDRESS = 0x70
+from acquisition import AcquisitionScheduler
+from sensor_log import DATA_DIR, BinarySensorLog, FLUSH_INTERVAL_S, get_log_path
+from energy import EnergyAccumulator
+from rollups import RollupStore
+from live_feed import LiveFeedWriter
+from hardware import get_spi
+import hardware
+from i2c_mux import get_muxed_bus
+from mcp3008_sampler import MCP3008Sampler, build_current_table
+from instrumentation import get_metrics
+from i2c_discovery import check_topology
 
 # INA219 address
 INA219_ADDRESS = 0x40
@@ -17,12 +21,6 @@ INA219_ADDRESS = 0x40
 INA219_CONFIG_REGISTER = 0x00
 INA219_BUS_VOLTAGE_REGISTER = 0x02
 
-# SPI for MCP3008
-spi = spidev.SpiDev()
-spi.open(0, 0)
-spi.max_speed_hz = 1000000
-spi.mode = 0b01
-
 # MCP3008 Channels
 LOAD_CURRENT_CHANNEL = 0
 SOLAR_CURRENT_CHANNEL = 2
@@ -35,56 +33,50 @@ SOLAR_VOLTAGE_CHANNEL = 4
 ACS712_LOAD_SENSITIVITY = 0.066  # For 30A ACS712 connected to load
 ACS712_SOLAR_SENSITIVITY = 0.066 # For 30A ACS712 connected to solar
 ACS712_VCC = 3.3 # Supply voltage
-DATA_DIR = "sensor_data" # Directory to store data
+# Measured ACS712 output at 0 A (nominally VCC / 2, calibrate with MCP3008Sampler.calibrate_zero_voltage)
+ACS712_LOAD_ZERO_VOLTAGE = ACS712_VCC / 2.0
+ACS712_SOLAR_ZERO_VOLTAGE = ACS712_VCC / 2.0
+# ADC conversions averaged into each current reading
+CURRENT_OVERSAMPLE = 16
+CURRENT_DECIMATION = "mean"  # or "median" to reject spikes
+SAMPLE_RATE_HZ = 1.0 # Samples per second (override with --rate)
 
 def select_i2c_channel(channel):
-    """Selects the I2C channel on the TCA9548A."""
-    try:
-        bus.write_byte_data(TCA9548A_ADDRESS, 0, 1 << channel)
-        time.sleep(0.001)
-        return True
-    except Exception as e:
-        print(f"Error selecting channel {channel}: {e}")
-        return False
+    """Selects the I2C channel on the TCA9548A (skipped if it is already selected)."""
+    return get_muxed_bus().select(channel)
 
 def read_ina219_register(channel, register):
     """Reads a 16-bit register from the INA219 on the specified TCA9548A channel."""
-    if not select_i2c_channel(channel):
-        print(f"Failed to select TCA9548A channel {channel}. Aborting INA219 read.")
-        return None
-    try:
-        data = bus.read_i2c_block_data(INA219_ADDRESS, register, 2)
-        value = (data[0] << 8) | data[1]
-        return value
-    except Exception as e:
-        print(f"Error reading INA219 register 0x{register:02X} on channel {channel}: {e}")
-        return None
+    return get_muxed_bus().read_word(channel, INA219_ADDRESS, register)
 
 def configure_ina219(channel):
     """Configures the INA219 for voltage reading on the specified TCA9548A channel."""
-    if not select_i2c_channel(channel):
-        print(f"Failed to select TCA9548A channel {channel}. Aborting INA219 config.")
-        return False
-    try:
-        config_value = 0x1800  # Simplified for voltage-only
-        bus.write_i2c_block_data(INA219_ADDRESS, INA219_CONFIG_REGISTER,
-                                     [(config_value >> 8) & 0xFF, config_value & 0xFF])
-        time.sleep(0.001)
-        return True
-    except Exception as e:
-        print(f"Error configuring INA219 on channel {channel}: {e}")
+    config_value = 0x1800  # Simplified for voltage-only
+    if not get_muxed_bus().write_word(channel, INA219_ADDRESS, INA219_CONFIG_REGISTER, config_value):
+        print(f"Error configuring INA219 on channel {channel}")
         return False
+    time.sleep(0.001)
+    return True
+
+def decode_bus_voltage(voltage_value):
+    """Converts a raw INA219 bus voltage register value to volts."""
+    voltage_mV = (voltage_value >> 3) * 4
+    return float(voltage_mV) / 1000.0
 
 def get_bus_voltage(channel):
     """Reads the bus voltage from the INA219 on the specified TCA9548A channel in volts."""
     voltage_value = read_ina219_register(channel, INA219_BUS_VOLTAGE_REGISTER)
     if voltage_value is not None:
-        voltage_mV = (voltage_value >> 3) * 4
-        voltage_V = float(voltage_mV) / 1000.0
-        return voltage_V
+        return decode_bus_voltage(voltage_value)
     else:
         return None
 
+def get_bus_voltages(channels):
+    """Reads the bus voltage on several TCA9548A channels in one pass, grouped by mux channel. Returns {channel: volts or None}."""
+    values = get_muxed_bus().read_words([(channel, INA219_ADDRESS, INA219_BUS_VOLTAGE_REGISTER) for channel in channels])
+    return {channel: decode_bus_voltage(value) if value is not None else None
+            for channel, value in zip(channels, values)}
+
 def read_mcp3008(channel):
     """Reads the analog value from the MCP3008 ADC on the specified channel."""
     if channel < 0 or channel > 7:
@@ -93,7 +85,7 @@ def read_mcp3008(channel):
     command |= (1 << 1)
     command |= (channel << 2)
     command_bytes = [command, 0b00000000, 0b00000000]
-    response = spi.xfer2(command_bytes)
+    response = get_spi().xfer2(command_bytes)
     adc_value = ((response[1] & 0x03) << 8) | response[2]
     return adc_value
 
@@ -104,60 +96,161 @@ def get_current(adc_value, sensitivity):
     current = (voltage - zero_current_voltage) / sensitivity
     return current
 
+def make_current_sampler():
+    """Creates the sampler that reads both ACS712 channels, converting codes to Amperes by table lookup."""
+    return MCP3008Sampler({
+        LOAD_CURRENT_CHANNEL: build_current_table(ACS712_LOAD_SENSITIVITY, ACS712_VCC, ACS712_LOAD_ZERO_VOLTAGE),
+        SOLAR_CURRENT_CHANNEL: build_current_table(ACS712_SOLAR_SENSITIVITY, ACS712_VCC, ACS712_SOLAR_ZERO_VOLTAGE),
+    }, oversample=CURRENT_OVERSAMPLE, decimation=CURRENT_DECIMATION)
+
 def get_filename():
     """Generates the filename based on the current date."""
     today = datetime.now().strftime("%Y-%m-%d")
     return os.path.join(DATA_DIR, f"sensor_data_{today}.txt")
 
-if __name__ == "__main__":
+def read_voltages():
+    """Reads load and solar voltage over I2C (one mux switch per cycle)."""
+    voltages = get_bus_voltages([LOAD_VOLTAGE_CHANNEL, SOLAR_VOLTAGE_CHANNEL])
+    return {"load_voltage": voltages[LOAD_VOLTAGE_CHANNEL], "solar_voltage": voltages[SOLAR_VOLTAGE_CHANNEL]}
+
+def read_currents(sampler):
+    """Reads load and solar current over SPI (oversampled burst on both channels)."""
+    currents = sampler.sample()
+    return {"load_current": currents[LOAD_CURRENT_CHANNEL], "solar_current": currents[SOLAR_CURRENT_CHANNEL]}
+
+def format_sample(timestamp, readings):
+    """Returns the four log lines for one sample."""
+    timestamp = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+    load_voltage_V = readings["load_voltage"]
+    solar_voltage_V = readings["solar_voltage"]
+    load_voltage_str = f"{timestamp}, Load Voltage: {load_voltage_V:.3f} V" if load_voltage_V is not None else f"{timestamp}, Failed to read Load Voltage"
+    solar_voltage_str = f"{timestamp}, Solar Voltage: {solar_voltage_V:.3f} V" if solar_voltage_V is not None else f"{timestamp}, Failed to read Solar Voltage"
+    load_current_str = f"{timestamp}, Load Current: {readings['load_current']:.3f} A"
+    solar_current_str = f"{timestamp}, Solar Current: {readings['solar_current']:.3f} A"
+    return [load_voltage_str, solar_voltage_str, load_current_str, solar_current_str]
+
+def write_sample(timestamp, readings, echo=True):
+    """Prints one sample (unless echo is False) and appends it to today's text data file."""
+    metrics = get_metrics()
+    start = time.perf_counter()
+    lines = format_sample(timestamp, readings)
+    formatted = time.perf_counter()
+    metrics.observe("format", formatted - start)
+    if echo:
+        for line in lines:
+            print(line)
+    filename = get_filename()
+    try:
+        start = time.perf_counter()
+        with open(filename, "a") as f:
+            for line in lines:
+                f.write(line + "\n")
+        metrics.observe("log_write", time.perf_counter() - start)
+    except Exception as e:
+        print(f"Error writing to file {filename}: {e}")
+
+def make_recorder(binary_log, energy, rollups, live_feed, log_format="binary", echo=True):
+    """
+    Returns the on_sample callback that feeds one sample to the energy totals, live feed, rollups and the log.
+
+    Every stage is timed into the shared metrics registry, which is exported periodically.
+    """
+    metrics = get_metrics()
+    observe = metrics.observe
+    perf_counter = time.perf_counter
+
+    def record_sample(timestamp, readings):
+        start = perf_counter()
+        energy.add_sample(timestamp, readings)
+        integrated = perf_counter()
+        live_feed.publish(timestamp, readings, energy.today)  # the UI shows the day's energy from the feed
+        published = perf_counter()
+        rollups.add_sample(timestamp, readings)
+        rolled_up = perf_counter()
+        observe("energy", integrated - start)
+        observe("live_feed", published - integrated)
+        observe("rollups", rolled_up - published)
+        if log_format == "text":
+            write_sample(timestamp, readings, echo=echo)
+        else:
+            binary_log.append(timestamp, readings)
+            observe("log_write", perf_counter() - rolled_up)
+            if echo:
+                formatting = perf_counter()
+                lines = format_sample(timestamp, readings)
+                observe("format", perf_counter() - formatting)
+                for line in lines:
+                    print(line)
+        observe("record", perf_counter() - start)
+        metrics.maybe_export()
+    return record_sample
+
+def timed_reader(stage, reader):
+    """Wraps a reader so each call is timed as a stage."""
+    observe = get_metrics().observe
+    def read():
+        start = time.perf_counter()
+        try:
+            return reader()
+        finally:
+            observe(stage, time.perf_counter() - start)
+    return read
+
+def make_scheduler(rate_hz, current_sampler, record_sample):
+    """Returns the acquisition scheduler for the voltage and current readers."""
+    # I2C (INA219 voltages) and SPI (ACS712 currents) are separate buses, so read them in parallel
+    return AcquisitionScheduler(rate_hz, {
+        "i2c": timed_reader("read_i2c", read_voltages),
+        "spi": timed_reader("read_spi", lambda: read_currents(current_sampler)),
+    }, record_sample)
+
+def main(argv=None):
+    """Runs the logger until interrupted (argv defaults to the command line)."""
+    parser = argparse.ArgumentParser(description="Log solar/load voltage and current")
+    parser.add_argument("--rate", type=float, default=SAMPLE_RATE_HZ, help="samples per second")
+    parser.add_argument("--log-format", choices=("binary", "text"), default="binary",
+                        help="buffered binary records (default) or the original text lines")
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL_S,
+                        help="seconds between binary log writes")
+    parser.add_argument("--fsync", action="store_true", help="fsync the binary log on every flush")
+    parser.add_argument("--quiet", action="store_true", help="do not print every sample")
+    args = parser.parse_args(argv)
+
+    binary_log = BinarySensorLog(DATA_DIR, args.flush_interval, args.fsync)
+    # Energy totals resume from the last checkpoint plus whatever today's log has after it
+    energy = EnergyAccumulator.restore()
+    energy.replay_log(get_log_path(DATA_DIR, datetime.now().date()))
+    rollups = RollupStore()
+    # Latest samples in shared memory for the touch UI
+    live_feed = LiveFeedWriter()
+
+    record_sample = make_recorder(binary_log, energy, rollups, live_feed, args.log_format, echo=not args.quiet)
+    current_sampler = make_current_sampler()
+    scheduler = make_scheduler(args.rate, current_sampler, record_sample)
     try:
         if not os.path.exists(DATA_DIR): #create directory if it does not exist
             os.makedirs(DATA_DIR)
+        # Probes the devices in the saved inventory instead of scanning every channel at each start
+        check_topology()
         if not configure_ina219(LOAD_VOLTAGE_CHANNEL) or not configure_ina219(SOLAR_VOLTAGE_CHANNEL):
             print("INA219 configuration failed on one or more channels.")
             exit(1)
 
-        while True:
-            # Get timestamp
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            # Read load voltage
-            load_voltage_V = get_bus_voltage(LOAD_VOLTAGE_CHANNEL)
-            load_voltage_str = f"{timestamp}, Load Voltage: {load_voltage_V:.3f} V" if load_voltage_V is not None else f"{timestamp}, Failed to read Load Voltage"
-            print(load_voltage_str)
-
-            # Read solar voltage
-            solar_voltage_V = get_bus_voltage(SOLAR_VOLTAGE_CHANNEL)
-            solar_voltage_str = f"{timestamp}, Solar Voltage: {solar_voltage_V:.3f} V" if solar_voltage_V is not None else f"{timestamp}, Failed to read Solar Voltage"
-            print(solar_voltage_str)
-
-            # Read load current
-            load_current_adc = read_mcp3008(LOAD_CURRENT_CHANNEL)
-            load_current_A = get_current(load_current_adc, ACS712_LOAD_SENSITIVITY)
-            load_current_str = f"{timestamp}, Load Current: {load_current_A:.3f} A"
-            print(load_current_str)
-
-            # Read solar current
-            solar_current_adc = read_mcp3008(SOLAR_CURRENT_CHANNEL)
-            solar_current_A = get_current(solar_current_adc, ACS712_SOLAR_SENSITIVITY)
-            solar_current_str = f"{timestamp}, Solar Current: {solar_current_A:.3f} A"
-            print(solar_current_str)
-
-            # Write to file
-            filename = get_filename()
-            try:
-                with open(filename, "a") as f:
-                    f.write(load_voltage_str + "\n")
-                    f.write(solar_voltage_str + "\n")
-                    f.write(load_current_str + "\n")
-                    f.write(solar_current_str + "\n")
-            except Exception as e:
-                print(f"Error writing to file {filename}: {e}")
-
-            time.sleep(1)
+        scheduler.run()
 
     except KeyboardInterrupt:
         print("Script stopped by user")
+        print(f"Sampling: {scheduler.format_stats()}")
+        if current_sampler.conversions:
+            print(f"MCP3008 sample rate: {current_sampler.average_sample_rate():.0f} conversions/s")
+        print(get_metrics().format_summary())
     finally:
-        spi.close()
-        bus.close()
\ No newline at end of file
+        get_metrics().export()
+        binary_log.close()
+        rollups.close()
+        energy.checkpoint()
+        live_feed.close()
+        hardware.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import argparse
+import datetime
+import math
+import os
+import re
+import struct
+import time
+
+from hardware import RUNTIME_SUFFIX
+
+# Logs live next to this script, like the other runtime files, whatever directory sensorScript.py is started from
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Logs of the real sensors (what CAPSTONE_SIM_RECORDING replays)
+SENSOR_DATA_DIR = os.path.join(BASE_DIR, "sensor_data")
+# Directory sensorScript.py logs to; the simulated bench logs to its own
+DATA_DIR = SENSOR_DATA_DIR + RUNTIME_SUFFIX
+
+# Channels stored in every record, in order
+CHANNELS = ("load_voltage", "solar_voltage", "load_current", "solar_current")
+# Labels used for the same channels in the text logs written by sensorScript.py
+TEXT_LABELS = {"Load Voltage": "load_voltage", "Solar Voltage": "solar_voltage",
+               "Load Current": "load_current", "Solar Current": "solar_current"}
+
+# File header: magic, format version, record size, channel count, reserved
+LOG_MAGIC = b"CAPSLOG\0"
+LOG_VERSION = 1
+HEADER_FORMAT = "<8sHHHH"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# Record: Unix timestamp (float64) then one float32 per channel, NaN for a failed read
+RECORD_FORMAT = "<d" + "f" * len(CHANNELS)
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+FLUSH_INTERVAL_S = 5.0  # Longest time a sample stays in memory before it is written
+
+def get_log_path(directory, date):
+    """Returns the binary log file for a local date."""
+    return os.path.join(directory, f"sensor_data_{date.isoformat()}.bin")
+
+def record_dtype():
+    """Returns the NumPy dtype matching one record."""
+    import numpy as np
+    return np.dtype([("timestamp", "<f8")] + [(channel, "<f4") for channel in CHANNELS])
+
+class BinarySensorLog:
+    """
+    Appends fixed-width sensor records to one file per local day.
+
+    Records are packed into an in-memory buffer and written at most every flush_interval_s
+    seconds (or on close()), so there is one write per interval instead of an open and four
+    text writes per sample. With fsync=True every flush is also forced to the SD card.
+    A power cut loses at most the unflushed buffer; a torn last record is ignored by readers.
+    """
+
+    def __init__(self, directory=DATA_DIR, flush_interval_s=FLUSH_INTERVAL_S, fsync=False, clock=time.monotonic):
+        self.directory = directory
+        self.flush_interval_s = flush_interval_s
+        self.fsync = fsync
+        self.clock = clock
+        self.path = None
+        self._file = None
+        self._buffer = bytearray()
+        self._pack = struct.Struct(RECORD_FORMAT).pack
+        self._day_start = None
+        self._day_end = None
+        self._last_flush = clock()
+        self.records_written = 0
+
+    def _rotate(self, timestamp):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+        date = datetime.date.fromtimestamp(timestamp)
+        midnight = datetime.datetime.combine(date, datetime.time())
+        self._day_start = midnight.timestamp()
+        self._day_end = (midnight + datetime.timedelta(days=1)).timestamp()
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = get_log_path(self.directory, date)
+        self._file = open(self.path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(struct.pack(HEADER_FORMAT, LOG_MAGIC, LOG_VERSION, RECORD_SIZE, len(CHANNELS), 0))
+        elif (self._file.tell() - HEADER_SIZE) % RECORD_SIZE:
+            # Drop a record torn by a crash so later records stay aligned
+            self._file.truncate(self._file.tell() - (self._file.tell() - HEADER_SIZE) % RECORD_SIZE)
+            self._file.seek(0, os.SEEK_END)
+
+    def append(self, timestamp, readings):
+        """
+        Buffers one sample.
+
+        Args:
+            timestamp: Unix time of the sample.
+            readings: {channel: value or None} for the channels in CHANNELS.
+        """
+        if self._file is None or not self._day_start <= timestamp < self._day_end:
+            self._rotate(timestamp)
+        values = [readings.get(channel) for channel in CHANNELS]
+        self._buffer += self._pack(timestamp, *[math.nan if v is None else v for v in values])
+        if self.clock() - self._last_flush >= self.flush_interval_s:
+            self.flush()
+
+    def flush(self):
+        """Writes buffered records to the current file."""
+        self._last_flush = self.clock()
+        if not self._buffer or self._file is None:
+            return
+        try:
+            self._file.write(self._buffer)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.records_written += len(self._buffer) // RECORD_SIZE
+            self._buffer.clear()
+        except Exception as e:
+            print(f"Error writing to file {self.path}: {e}")
+
+    def close(self):
+        """Flushes and closes the current file."""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def read_log(path):
+    """
+    Memory-maps a binary log file.
+
+    Returns:
+        A read-only NumPy structured array with a "timestamp" field and one field per
+        channel. Nothing is read from disk until fields are accessed.
+    """
+    import numpy as np
+
+    with open(path, "rb") as f:
+        magic, version, record_size, channel_count, _ = struct.unpack(HEADER_FORMAT, f.read(HEADER_SIZE))
+    if magic != LOG_MAGIC or version != LOG_VERSION or record_size != RECORD_SIZE:
+        raise ValueError(f"{path} is not a version {LOG_VERSION} sensor log")
+    count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+    if count == 0:
+        return np.zeros(0, dtype=record_dtype())
+    return np.memmap(path, dtype=record_dtype(), mode="r", offset=HEADER_SIZE, shape=(count,))
+
+# "2025-04-01 12:00:00, Load Voltage: 12.345 V" or "2025-04-01 12:00:00, Failed to read Load Voltage"
+TEXT_LINE = re.compile(r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d), (?:Failed to read (.+)|(.+?): (-?[\d.]+) [VA])$")
+
+def parse_text_lines(lines, channels=None):
+    """
+    Parses lines of a text log written by sensorScript.py.
+
+    Args:
+        lines: Iterable of lines, e.g. an open file (possibly after a seek to a line start).
+        channels: Channels to keep (default: all). Other channels are skipped but still
+                  used to tell samples apart.
+
+    Yields:
+        (timestamp, {channel: value or None}) per sample. A sample ends when its timestamp
+        changes or a channel repeats.
+    """
+    current_time, current_timestamp, readings, seen = None, None, {}, set()
+    for line in lines:
+        match = TEXT_LINE.match(line.strip())
+        if not match:
+            continue
+        time_str, failed_label, label, value = match.groups()
+        channel = TEXT_LABELS.get(failed_label or label)
+        if channel is None:
+            continue
+        if seen and (time_str != current_time or channel in seen):
+            yield current_timestamp, readings
+            readings, seen = {}, set()
+        if time_str != current_time:
+            current_time = time_str
+            current_timestamp = datetime.datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S").timestamp()
+        seen.add(channel)
+        if channels is None or channel in channels:
+            readings[channel] = None if failed_label else float(value)
+    if seen:
+        yield current_timestamp, readings
+
+def parse_text_log(path):
+    """Parses a text log written by sensorScript.py. Yields (timestamp, readings) per sample, see parse_text_lines()."""
+    with open(path, "r") as f:
+        yield from parse_text_lines(f)
+
+def convert_text_log(text_path, directory=None):
+    """
+    Converts a text log into binary log files (one per day).
+
+    Returns:
+        The number of samples converted, or None if the day was already converted.
+    """
+    directory = directory or os.path.dirname(text_path) or "."
+    match = re.search(r"(\d{4}-\d\d-\d\d)\.txt$", text_path)
+    if match and os.path.exists(get_log_path(directory, datetime.date.fromisoformat(match.group(1)))):
+        return None
+    log = BinarySensorLog(directory, flush_interval_s=float("inf"))
+    count = 0
+    try:
+        for timestamp, readings in parse_text_log(text_path):
+            log.append(timestamp, readings)
+            count += 1
+    finally:
+        log.close()
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert sensor_data_*.txt logs to the binary format")
+    parser.add_argument("text_logs", nargs="+")
+    parser.add_argument("--out", help="output directory (default: next to each text log)")
+    args = parser.parse_args()
+    for text_path in args.text_logs:
+        count = convert_text_log(text_path, args.out)
+        if count is None:
+            print(f"{text_path}: skipped, binary log already exists")
+        else:
+            print(f"{text_path}: {count} samples converted")
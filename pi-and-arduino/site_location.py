@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import time
+
+# Files live next to this script so the touch UI and the Pi scripts share them
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Optional fixed coordinates for the site, e.g. {"latitude": 33.97, "longitude": -118.42}
+CONFIG_FILE = os.path.join(BASE_DIR, "site_config.json")
+# Last location that was determined successfully
+CACHE_FILE = os.path.join(BASE_DIR, "site_location.json")
+# Environment variables take priority over the config file
+LATITUDE_ENV = "CAPSTONE_LATITUDE"
+LONGITUDE_ENV = "CAPSTONE_LONGITUDE"
+
+REFRESH_TIMEOUT_S = 5.0  # Timeout for the IP geolocation request
+REFRESH_INTERVAL_S = 24 * 3600  # Minimum age of the cached fix before it is refreshed
+RETRY_INTERVAL_S = 300  # Minimum time between lookup attempts while offline
+
+def _read_json(path):
+    """Returns the parsed JSON in a file, or None if it is missing or invalid."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+        return None
+
+class SiteLocationStore:
+    """
+    Resolves the site's latitude and longitude without blocking on the network.
+
+    Order: configured coordinates (environment or CONFIG_FILE), then the cached last-known
+    fix in CACHE_FILE. The IP lookup only runs in a background thread with a timeout, and
+    only when nothing is configured and the cached fix is missing or stale.
+    """
+
+    def __init__(self, config_file=CONFIG_FILE, cache_file=CACHE_FILE):
+        self.config_file = config_file
+        self.cache_file = cache_file
+        self.source = None
+        self._location = None
+        self._cache_time = None
+        self._refresh_thread = None
+        self._last_attempt = None
+        self._lock = threading.Lock()
+
+    def configured(self):
+        """Returns the configured (lat, lon), or None if the site has no fixed coordinates."""
+        lat, lon = os.environ.get(LATITUDE_ENV), os.environ.get(LONGITUDE_ENV)
+        if lat is not None and lon is not None:
+            try:
+                return float(lat), float(lon)
+            except ValueError:
+                print(f"Error: {LATITUDE_ENV}/{LONGITUDE_ENV} are not numbers. Ignoring them.")
+        config = _read_json(self.config_file)
+        if config and "latitude" in config and "longitude" in config:
+            return float(config["latitude"]), float(config["longitude"])
+        return None
+
+    def cached(self):
+        """Returns the last-known (lat, lon) from the cache file, or None."""
+        cache = _read_json(self.cache_file)
+        if cache and "latitude" in cache and "longitude" in cache:
+            self._cache_time = cache.get("updated", 0)
+            return float(cache["latitude"]), float(cache["longitude"])
+        return None
+
+    def save(self, lat, lon, source):
+        """Writes a new fix to the cache file (write-then-rename so it is never half written)."""
+        tmp_path = self.cache_file + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"latitude": lat, "longitude": lon, "source": source, "updated": time.time()}, f)
+        os.replace(tmp_path, self.cache_file)
+        with self._lock:
+            self._location = (lat, lon)
+            self._cache_time = time.time()
+            self.source = "cache"
+
+    def refresh(self, timeout=REFRESH_TIMEOUT_S):
+        """Looks the location up from the IP address and caches it. Returns (lat, lon) or (None, None)."""
+        from optimal_angles import get_latitude_longitude
+
+        lat, lon = get_latitude_longitude(timeout=timeout)
+        if lat is not None and lon is not None:
+            try:
+                self.save(lat, lon, "ip-api")
+            except Exception as e:
+                print(f"Error writing location cache {self.cache_file}: {e}")
+        return lat, lon
+
+    def refresh_in_background(self, timeout=REFRESH_TIMEOUT_S):
+        """Starts refresh() in a daemon thread unless one is already running."""
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            if self._last_attempt is not None and time.time() - self._last_attempt < RETRY_INTERVAL_S:
+                return
+            self._last_attempt = time.time()
+            self._refresh_thread = threading.Thread(target=self.refresh, args=(timeout,), daemon=True)
+            self._refresh_thread.start()
+
+    def wait_for_refresh(self, timeout):
+        """Waits up to timeout seconds for a background refresh to finish."""
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def get(self, wait=0.0):
+        """
+        Returns the site's (lat, lon) without touching the network on the calling thread.
+
+        Args:
+            wait: Seconds to wait for the background lookup if there is no configured or
+                  cached location yet (cold start with an empty cache).
+
+        Returns:
+            (lat, lon), or (None, None) if the location is still unknown.
+        """
+        with self._lock:
+            location = self._location
+        if location is None:
+            location = self.configured()
+            if location is not None:
+                self.source = "config"
+            else:
+                location = self.cached()
+                if location is not None:
+                    self.source = "cache"
+            with self._lock:
+                self._location = location
+
+        if self.source != "config":
+            stale = self._cache_time is None or time.time() - self._cache_time > REFRESH_INTERVAL_S
+            if location is None or stale:
+                self.refresh_in_background()
+            if location is None and wait > 0:
+                self.wait_for_refresh(wait)
+                with self._lock:
+                    location = self._location
+        return location if location is not None else (None, None)
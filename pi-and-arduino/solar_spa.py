@@ -0,0 +1,351 @@
+import datetime
+import math
+
+# Solar position after the NREL Solar Position Algorithm (Reda & Andreas, NREL/TP-560-34302, 2004),
+# accurate to about 0.0003° between the years -2000 and 6000.
+
+# TT - UT in seconds (about 69 s in the mid-2020s, see IERS Bulletin A). One second is about 0.004° of hour angle.
+DELTA_T_S = 69.0
+# Site defaults for the topocentric and refraction corrections
+ELEVATION_M = 0.0
+PRESSURE_MBAR = 1010.0
+TEMPERATURE_C = 10.0
+ATMOSPHERIC_REFRACTION_DEG = 0.5667  # at the horizon
+SUN_RADIUS_DEG = 0.26667
+# Spacing of the cached geocentric positions. Linear interpolation over an hour is good to about 1e-5°.
+NODE_INTERVAL_S = 3600
+CACHED_DAYS = 3  # UTC days of nodes kept per site
+
+UNIX_EPOCH = datetime.datetime(1970, 1, 1)
+J2000_UNIX = 946728000.0  # 2000-01-01 12:00 as Unix time, the epoch of the series below
+EARTH_RADIUS_M = 6378140.0
+
+# Periodic terms (A, B, C) of the Earth's heliocentric longitude, latitude and radius vector:
+# each series is the sum of A·cos(B + C·JME), JME in Julian millennia from J2000.0
+L_TERMS = (
+    ((175347046, 0, 0), (3341656, 4.6692568, 6283.07585), (34894, 4.6261, 12566.1517), (3497, 2.7441, 5753.3849),
+     (3418, 2.8289, 3.5231), (3136, 3.6277, 77713.7715), (2676, 4.4181, 7860.4194), (2343, 6.1352, 3930.2097),
+     (1324, 0.7425, 11506.7698), (1273, 2.0371, 529.691), (1199, 1.1096, 1577.3435), (990, 5.233, 5884.927),
+     (902, 2.045, 26.298), (857, 3.508, 398.149), (780, 1.179, 5223.694), (753, 2.533, 5507.553),
+     (505, 4.583, 18849.228), (492, 4.205, 775.523), (357, 2.92, 0.067), (317, 5.849, 11790.629),
+     (284, 1.899, 796.298), (271, 0.315, 10977.079), (243, 0.345, 5486.778), (206, 4.806, 2544.314),
+     (205, 1.869, 5573.143), (202, 2.458, 6069.777), (156, 0.833, 213.299), (132, 3.411, 2942.463),
+     (126, 1.083, 20.775), (115, 0.645, 0.98), (103, 0.636, 4694.003), (102, 0.976, 15720.839),
+     (102, 4.267, 7.114), (99, 6.21, 2146.17), (98, 0.68, 155.42), (86, 5.98, 161000.69),
+     (85, 1.3, 6275.96), (85, 3.67, 71430.7), (80, 1.81, 17260.15), (79, 3.04, 12036.46),
+     (75, 1.76, 5088.63), (74, 3.5, 3154.69), (74, 4.68, 801.82), (70, 0.83, 9437.76),
+     (62, 3.98, 8827.39), (61, 1.82, 7084.9), (57, 2.78, 6286.6), (56, 4.39, 14143.5),
+     (56, 3.47, 6279.55), (52, 0.19, 12139.55), (52, 1.33, 1748.02), (51, 0.28, 5856.48),
+     (49, 0.49, 1194.45), (41, 5.37, 8429.24), (41, 2.4, 19651.05), (39, 6.17, 10447.39),
+     (37, 6.04, 10213.29), (37, 2.57, 1059.38), (36, 1.71, 2352.87), (36, 1.78, 6812.77),
+     (33, 0.59, 17789.85), (30, 0.44, 83996.85), (30, 2.74, 1349.87), (25, 3.16, 4690.48)),
+    ((628331966747, 0, 0), (206059, 2.678235, 6283.07585), (4303, 2.6351, 12566.1517), (425, 1.59, 3.523),
+     (119, 5.796, 26.298), (109, 2.966, 1577.344), (93, 2.59, 18849.23), (72, 1.14, 529.69),
+     (68, 1.87, 398.15), (67, 4.41, 5507.55), (59, 2.89, 5223.69), (56, 2.17, 155.42),
+     (45, 0.4, 796.3), (36, 0.47, 775.52), (29, 2.65, 7.11), (21, 5.34, 0.98),
+     (19, 1.85, 5486.78), (19, 4.97, 213.3), (17, 2.99, 6275.96), (16, 0.03, 2544.31),
+     (16, 1.43, 2146.17), (15, 1.21, 10977.08), (12, 2.83, 1748.02), (12, 3.26, 5088.63),
+     (12, 5.27, 1194.45), (12, 2.08, 4694), (11, 0.77, 553.57), (10, 1.3, 6286.6),
+     (10, 4.24, 1349.87), (9, 2.7, 242.73), (9, 5.64, 951.72), (8, 5.3, 2352.87),
+     (6, 2.65, 9437.76), (6, 4.67, 4690.48)),
+    ((52919, 0, 0), (8720, 1.0721, 6283.0758), (309, 0.867, 12566.152), (27, 0.05, 3.52),
+     (16, 5.19, 26.3), (16, 3.68, 155.42), (10, 0.76, 18849.23), (9, 2.06, 77713.77),
+     (7, 0.83, 775.52), (5, 4.66, 1577.34), (4, 1.03, 7.11), (4, 3.44, 5573.14),
+     (3, 5.14, 796.3), (3, 6.05, 5507.55), (3, 1.19, 242.73), (3, 6.12, 529.69),
+     (3, 0.31, 398.15), (3, 2.28, 553.57), (2, 4.38, 5223.69), (2, 3.75, 0.98)),
+    ((289, 5.844, 6283.076), (35, 0, 0), (17, 5.49, 12566.15), (3, 5.2, 155.42),
+     (1, 4.72, 3.52), (1, 5.3, 18849.23), (1, 5.97, 242.73)),
+    ((114, 3.142, 0), (8, 4.13, 6283.08), (1, 3.84, 12566.15)),
+    ((1, 3.14, 0),),
+)
+B_TERMS = (
+    ((280, 3.199, 84334.662), (102, 5.422, 5507.553), (80, 3.88, 5223.69), (44, 3.7, 2352.87),
+     (32, 4, 1577.34)),
+    ((9, 3.9, 5507.55), (6, 1.73, 5223.69)),
+)
+R_TERMS = (
+    ((100013989, 0, 0), (1670700, 3.0984635, 6283.07585), (13956, 3.05525, 12566.1517),
+     (3084, 5.1985, 77713.7715), (1628, 1.1739, 5753.3849), (1576, 2.8469, 7860.4194), (925, 5.453, 11506.77),
+     (542, 4.564, 3930.21), (472, 3.661, 5884.927), (346, 0.964, 5507.553), (329, 5.9, 5223.694),
+     (307, 0.299, 5573.143), (243, 4.273, 11790.629), (212, 5.847, 1577.344), (186, 5.022, 10977.079),
+     (175, 3.012, 18849.228), (110, 5.055, 5486.778), (98, 0.89, 6069.78), (86, 5.69, 15720.84),
+     (86, 1.27, 161000.69), (65, 0.27, 17260.15), (63, 0.92, 529.69), (57, 2.01, 83996.85),
+     (56, 5.24, 71430.7), (49, 3.25, 2544.31), (47, 2.58, 775.52), (45, 5.54, 9437.76),
+     (43, 6.01, 6275.96), (39, 5.36, 4694), (38, 2.39, 8827.39), (37, 0.83, 19651.05),
+     (37, 4.9, 12139.55), (36, 1.67, 12036.46), (35, 1.84, 2942.46), (33, 0.24, 7084.9),
+     (32, 0.18, 5088.63), (32, 1.78, 398.15), (28, 1.21, 6286.6), (28, 1.9, 6279.55),
+     (26, 4.59, 10447.39)),
+    ((103019, 1.10749, 6283.07585), (1721, 1.0644, 12566.1517), (702, 3.142, 0), (32, 1.02, 18849.23),
+     (31, 2.84, 5507.55), (25, 1.32, 5223.69), (18, 1.42, 1577.34), (10, 5.91, 10977.08),
+     (9, 1.42, 6275.96), (9, 0.27, 5486.78)),
+    ((4359, 5.7846, 6283.0758), (124, 5.579, 12566.152), (12, 3.14, 0), (9, 3.63, 77713.77),
+     (6, 1.87, 5573.14), (3, 5.47, 18849.23)),
+    ((145, 4.273, 6283.076), (7, 3.92, 12566.15)),
+    ((4, 2.56, 6283.08),),
+)
+
+# Nutation in longitude and obliquity: multiples of the five lunar/solar arguments X0-X4 for each
+# term, and its coefficients (a, b, c, d) in units of 0.0001″: Δψ += (a + b·JCE)·sin(arg), Δε += (c + d·JCE)·cos(arg)
+NUTATION_TERMS = (
+    ((0, 0, 0, 0, 1), (-171996, -174.2, 92025, 8.9)), ((-2, 0, 0, 2, 2), (-13187, -1.6, 5736, -3.1)),
+    ((0, 0, 0, 2, 2), (-2274, -0.2, 977, -0.5)), ((0, 0, 0, 0, 2), (2062, 0.2, -895, 0.5)),
+    ((0, 1, 0, 0, 0), (1426, -3.4, 54, -0.1)), ((0, 0, 1, 0, 0), (712, 0.1, -7, 0)),
+    ((-2, 1, 0, 2, 2), (-517, 1.2, 224, -0.6)), ((0, 0, 0, 2, 1), (-386, -0.4, 200, 0)),
+    ((0, 0, 1, 2, 2), (-301, 0, 129, -0.1)), ((-2, -1, 0, 2, 2), (217, -0.5, -95, 0.3)),
+    ((-2, 0, 1, 0, 0), (-158, 0, 0, 0)), ((-2, 0, 0, 2, 1), (129, 0.1, -70, 0)),
+    ((0, 0, -1, 2, 2), (123, 0, -53, 0)), ((2, 0, 0, 0, 0), (63, 0, 0, 0)),
+    ((0, 0, 1, 0, 1), (63, 0.1, -33, 0)), ((2, 0, -1, 2, 2), (-59, 0, 26, 0)),
+    ((0, 0, -1, 0, 1), (-58, -0.1, 32, 0)), ((0, 0, 1, 2, 1), (-51, 0, 27, 0)),
+    ((-2, 0, 2, 0, 0), (48, 0, 0, 0)), ((0, 0, -2, 2, 1), (46, 0, -24, 0)),
+    ((2, 0, 0, 2, 2), (-38, 0, 16, 0)), ((0, 0, 2, 2, 2), (-31, 0, 13, 0)),
+    ((0, 0, 2, 0, 0), (29, 0, 0, 0)), ((-2, 0, 1, 2, 2), (29, 0, -12, 0)),
+    ((0, 0, 0, 2, 0), (26, 0, 0, 0)), ((-2, 0, 0, 2, 0), (-22, 0, 0, 0)),
+    ((0, 0, -1, 2, 1), (21, 0, -10, 0)), ((0, 2, 0, 0, 0), (17, -0.1, 0, 0)),
+    ((2, 0, -1, 0, 1), (16, 0, -8, 0)), ((-2, 2, 0, 2, 2), (-16, 0.1, 7, 0)),
+    ((0, 1, 0, 0, 1), (-15, 0, 9, 0)), ((-2, 0, 1, 0, 1), (-13, 0, 7, 0)),
+    ((0, -1, 0, 0, 1), (-12, 0, 6, 0)), ((0, 0, 2, -2, 0), (11, 0, 0, 0)),
+    ((2, 0, -1, 2, 1), (-10, 0, 5, 0)), ((2, 0, 1, 2, 2), (-8, 0, 3, 0)),
+    ((0, 1, 0, 2, 2), (7, 0, -3, 0)), ((-2, 1, 1, 0, 0), (-7, 0, 0, 0)),
+    ((0, -1, 0, 2, 2), (-7, 0, 3, 0)), ((2, 0, 0, 2, 1), (-7, 0, 3, 0)),
+    ((2, 0, 1, 0, 0), (6, 0, 0, 0)), ((-2, 0, 2, 2, 2), (6, 0, -3, 0)),
+    ((-2, 0, 1, 2, 1), (6, 0, -3, 0)), ((2, 0, -2, 0, 1), (-6, 0, 3, 0)),
+    ((2, 0, 0, 0, 1), (-6, 0, 3, 0)), ((0, -1, 1, 0, 0), (5, 0, 0, 0)),
+    ((-2, -1, 0, 2, 1), (-5, 0, 3, 0)), ((-2, 0, 0, 0, 1), (-5, 0, 3, 0)),
+    ((0, 0, 2, 2, 1), (-5, 0, 3, 0)), ((-2, 0, 2, 0, 1), (4, 0, 0, 0)),
+    ((-2, 1, 0, 2, 1), (4, 0, 0, 0)), ((0, 0, 1, -2, 0), (4, 0, 0, 0)),
+    ((-1, 0, 1, 0, 0), (-4, 0, 0, 0)), ((-2, 1, 0, 0, 0), (-4, 0, 0, 0)),
+    ((1, 0, 0, 0, 0), (-4, 0, 0, 0)), ((0, 0, 1, 2, 0), (3, 0, 0, 0)),
+    ((0, 0, -2, 2, 2), (-3, 0, 0, 0)), ((-1, -1, 1, 0, 0), (-3, 0, 0, 0)),
+    ((0, 1, 1, 0, 0), (-3, 0, 0, 0)), ((0, -1, 1, 2, 2), (-3, 0, 0, 0)),
+    ((2, -1, -1, 2, 2), (-3, 0, 0, 0)), ((0, 0, 3, 2, 2), (-3, 0, 0, 0)),
+    ((2, -1, 0, 2, 2), (-3, 0, 0, 0)),
+)
+
+def _series(terms, jme):
+    """Evaluates one of L_TERMS/B_TERMS/R_TERMS: Σ_i (Σ A·cos(B + C·JME))·JME^i / 10^8."""
+    total = 0.0
+    for power, series in enumerate(terms):
+        total += sum(a * math.cos(b + c * jme) for a, b, c in series) * jme ** power
+    return total / 1e8
+
+def heliocentric_position(jme):
+    """Returns the Earth's heliocentric longitude and latitude (degrees) and radius vector (AU)."""
+    return (math.degrees(_series(L_TERMS, jme)) % 360, math.degrees(_series(B_TERMS, jme)), _series(R_TERMS, jme))
+
+def nutation(jce):
+    """Returns the nutation in longitude and in obliquity (degrees) at Julian ephemeris century jce."""
+    x = (297.85036 + 445267.111480 * jce - 0.0019142 * jce ** 2 + jce ** 3 / 189474,
+         357.52772 + 35999.050340 * jce - 0.0001603 * jce ** 2 - jce ** 3 / 300000,
+         134.96298 + 477198.867398 * jce + 0.0086972 * jce ** 2 + jce ** 3 / 56250,
+         93.27191 + 483202.017538 * jce - 0.0036825 * jce ** 2 + jce ** 3 / 327270,
+         125.04452 - 1934.136261 * jce + 0.0020708 * jce ** 2 + jce ** 3 / 450000)
+    delta_psi = delta_epsilon = 0.0
+    for multiples, (a, b, c, d) in NUTATION_TERMS:
+        argument = math.radians(sum(m * xj for m, xj in zip(multiples, x)))
+        delta_psi += (a + b * jce) * math.sin(argument)
+        delta_epsilon += (c + d * jce) * math.cos(argument)
+    return delta_psi / 36000000, delta_epsilon / 36000000
+
+def mean_obliquity(jme):
+    """Returns the mean obliquity of the ecliptic (degrees)."""
+    u = jme / 10
+    arcsec = 84381.448
+    for coefficient, power in ((-4680.93, 1), (-1.55, 2), (1999.25, 3), (-51.38, 4), (-249.67, 5), (-39.05, 6),
+                               (7.12, 7), (27.87, 8), (5.79, 9), (2.45, 10)):
+        arcsec += coefficient * u ** power
+    return arcsec / 3600
+
+def mean_sidereal_time(unix_time):
+    """Returns the mean sidereal time at Greenwich (degrees) at a Unix time (UT)."""
+    days = (unix_time - J2000_UNIX) / 86400
+    jc = days / 36525
+    return (280.46061837 + 360.98564736629 * days + 0.000387933 * jc ** 2 - jc ** 3 / 38710000) % 360
+
+def geocentric_sun(unix_time, delta_t=DELTA_T_S):
+    """
+    The slowly varying part of the SPA: the sun's geocentric position at a Unix time.
+
+    Returns:
+        (right ascension, declination, equatorial horizontal parallax, equation of the equinoxes),
+        all in degrees. The apparent sidereal time is mean_sidereal_time() plus the last of these.
+    """
+    jce = (unix_time + delta_t - J2000_UNIX) / 86400 / 36525
+    jme = jce / 10
+    longitude, latitude, radius = heliocentric_position(jme)
+    delta_psi, delta_epsilon = nutation(jce)
+    epsilon = math.radians(mean_obliquity(jme) + delta_epsilon)
+    # Geocentric longitude and latitude, with nutation and aberration
+    apparent = math.radians((longitude + 180) % 360 + delta_psi - 20.4898 / (3600 * radius))
+    beta = math.radians(-latitude)
+    alpha = math.degrees(math.atan2(math.sin(apparent) * math.cos(epsilon) - math.tan(beta) * math.sin(epsilon),
+                                    math.cos(apparent))) % 360
+    delta = math.degrees(math.asin(math.sin(beta) * math.cos(epsilon)
+                                   + math.cos(beta) * math.sin(epsilon) * math.sin(apparent)))
+    return alpha, delta, 8.794 / (3600 * radius), delta_psi * math.cos(epsilon)
+
+def site_constants(lat, elevation=ELEVATION_M):
+    """Returns the site's (x, y) terms of the parallax correction, which depend only on latitude and elevation."""
+    phi = math.radians(lat)
+    u = math.atan(0.99664719 * math.tan(phi))
+    return (math.cos(u) + elevation / EARTH_RADIUS_M * math.cos(phi),
+            0.99664719 * math.sin(u) + elevation / EARTH_RADIUS_M * math.sin(phi))
+
+def refraction(altitude, pressure=PRESSURE_MBAR, temperature=TEMPERATURE_C):
+    """Atmospheric refraction (degrees) to add to a true altitude, 0 once the sun is fully below the horizon."""
+    if altitude < -(SUN_RADIUS_DEG + ATMOSPHERIC_REFRACTION_DEG):
+        return 0.0
+    return (pressure / 1010) * (283 / (273 + temperature)) * 1.02 / (
+        60 * math.tan(math.radians(altitude + 10.3 / (altitude + 5.11))))
+
+def topocentric_horizon(alpha, delta, parallax, hour_angle, lat, x, y, pressure=PRESSURE_MBAR,
+                        temperature=TEMPERATURE_C):
+    """
+    Converts a geocentric position and its local hour angle to the topocentric altitude
+    (with refraction) and azimuth (eastward from north), all in degrees.
+    """
+    phi = math.radians(lat)
+    h = math.radians(hour_angle)
+    d = math.radians(delta)
+    sin_xi = math.sin(math.radians(parallax))
+    denominator = math.cos(d) - x * sin_xi * math.cos(h)
+    delta_alpha = math.atan2(-x * sin_xi * math.sin(h), denominator)
+    delta_p = math.atan2((math.sin(d) - y * sin_xi) * math.cos(delta_alpha), denominator)
+    h_p = h - delta_alpha
+    altitude = math.degrees(math.asin(math.sin(phi) * math.sin(delta_p)
+                                      + math.cos(phi) * math.cos(delta_p) * math.cos(h_p)))
+    azimuth = math.degrees(math.atan2(math.sin(h_p), math.cos(h_p) * math.sin(phi) - math.tan(delta_p) * math.cos(phi)))
+    return altitude + refraction(altitude, pressure, temperature), (azimuth + 180) % 360
+
+def spa_position(unix_time, lat, lon, elevation=ELEVATION_M, pressure=PRESSURE_MBAR, temperature=TEMPERATURE_C,
+                 delta_t=DELTA_T_S):
+    """
+    The full SPA at one Unix time, with no caching (about 300 trig calls).
+
+    Returns:
+        (altitude, azimuth) in degrees, azimuth eastward from north.
+    """
+    alpha, delta, parallax, equinoxes = geocentric_sun(unix_time, delta_t)
+    hour_angle = (mean_sidereal_time(unix_time) + equinoxes + lon - alpha) % 360
+    x, y = site_constants(lat, elevation)
+    return topocentric_horizon(alpha, delta, parallax, hour_angle, lat, x, y, pressure, temperature)
+
+class CachedSolarPosition:
+    """
+    SPA-grade sun position for one site at close to the cost of the simple formula.
+
+    Everything that changes slowly (the Earth's heliocentric position, nutation, obliquity,
+    aberration and so the sun's right ascension, declination and parallax) is computed with
+    the full series once per node, every NODE_INTERVAL_S of a UTC day, when the day is first
+    needed. A call interpolates those between the two nearest nodes and does only the fast
+    part itself: sidereal time, hour angle, the parallax correction and refraction.
+    """
+
+    def __init__(self, lat, lon, elevation=ELEVATION_M, pressure=PRESSURE_MBAR, temperature=TEMPERATURE_C,
+                 delta_t=DELTA_T_S, node_interval_s=NODE_INTERVAL_S):
+        if 86400 % node_interval_s:
+            raise ValueError("node_interval_s must divide a day evenly")
+        self.lat = lat
+        self.lon = lon
+        self.pressure = pressure
+        self.temperature = temperature
+        self.delta_t = delta_t
+        self.node_interval_s = node_interval_s
+        self.x, self.y = site_constants(lat, elevation)
+        self.days = {}  # UTC day number -> (alpha, delta, parallax, equinoxes) node lists
+        self.nodes_computed = 0
+
+    def nodes(self, day):
+        """Returns the node lists for a UTC day (days since 1970-01-01), computing them on first use."""
+        nodes = self.days.get(day)
+        if nodes is None:
+            start = day * 86400
+            values = [geocentric_sun(start + i * self.node_interval_s, self.delta_t)
+                      for i in range(86400 // self.node_interval_s + 1)]
+            self.nodes_computed += len(values)
+            alpha = [values[0][0]]
+            for value in values[1:]:
+                # Unwrapped, so interpolating across 360 -> 0 (at the March equinox) stays continuous
+                alpha.append(value[0] + 360 * round((alpha[-1] - value[0]) / 360))
+            nodes = (alpha,) + tuple([value[i] for value in values] for i in (1, 2, 3))
+            if len(self.days) >= CACHED_DAYS:
+                del self.days[min(self.days)]
+            self.days[day] = nodes
+        return nodes
+
+    def geocentric(self, unix_time):
+        """Returns the interpolated (alpha, delta, parallax, equinoxes) at a Unix time."""
+        day = int(unix_time // 86400)
+        alpha, delta, parallax, equinoxes = self.nodes(day)
+        position = (unix_time - day * 86400) / self.node_interval_s
+        i = int(position)
+        f = position - i
+        return (alpha[i] + f * (alpha[i + 1] - alpha[i]), delta[i] + f * (delta[i + 1] - delta[i]),
+                parallax[i] + f * (parallax[i + 1] - parallax[i]), equinoxes[i] + f * (equinoxes[i + 1] - equinoxes[i]))
+
+    def position(self, unix_time):
+        """Returns (altitude, azimuth) in degrees at a Unix time, azimuth eastward from north."""
+        alpha, delta, parallax, equinoxes = self.geocentric(unix_time)
+        hour_angle = (mean_sidereal_time(unix_time) + equinoxes + self.lon - alpha) % 360
+        return topocentric_horizon(alpha, delta, parallax, hour_angle, self.lat, self.x, self.y, self.pressure,
+                                   self.temperature)
+
+    def positions(self, unix_times):
+        """Vectorized position(): returns (altitude, azimuth) NumPy arrays for an array of Unix times."""
+        import numpy as np
+
+        t = np.asarray(unix_times, dtype=float)
+        days = np.floor(t / 86400).astype(np.int64)
+        unique_days, day_index = np.unique(days, return_inverse=True)
+        table = np.array([self.nodes(int(day)) for day in unique_days])  # (days, 4, nodes)
+        position = (t - days * 86400.0) / self.node_interval_s
+        i = np.minimum(position.astype(np.int64), table.shape[2] - 2)
+        f = position - i
+        low = table[day_index, :, i]
+        high = table[day_index, :, i + 1]
+        alpha, delta, parallax, equinoxes = (low + f[:, None] * (high - low)).T
+
+        elapsed = (t - J2000_UNIX) / 86400
+        jc = elapsed / 36525
+        sidereal = 280.46061837 + 360.98564736629 * elapsed + 0.000387933 * jc ** 2 - jc ** 3 / 38710000
+        h = np.radians((sidereal + equinoxes + self.lon - alpha) % 360)
+        d = np.radians(delta)
+        phi = math.radians(self.lat)
+        sin_xi = np.sin(np.radians(parallax))
+        denominator = np.cos(d) - self.x * sin_xi * np.cos(h)
+        delta_alpha = np.arctan2(-self.x * sin_xi * np.sin(h), denominator)
+        delta_p = np.arctan2((np.sin(d) - self.y * sin_xi) * np.cos(delta_alpha), denominator)
+        h_p = h - delta_alpha
+        altitude = np.degrees(np.arcsin(math.sin(phi) * np.sin(delta_p) + math.cos(phi) * np.cos(delta_p) * np.cos(h_p)))
+        azimuth = np.degrees(np.arctan2(np.sin(h_p), np.cos(h_p) * math.sin(phi) - np.tan(delta_p) * math.cos(phi)))
+        # Same refraction as refraction(), only where the sun is not fully below the horizon
+        visible = altitude >= -(SUN_RADIUS_DEG + ATMOSPHERIC_REFRACTION_DEG)
+        safe = np.where(visible, altitude, 0.0)
+        bend = (self.pressure / 1010) * (283 / (273 + self.temperature)) * 1.02 / (
+            60 * np.tan(np.radians(safe + 10.3 / (safe + 5.11))))
+        return altitude + np.where(visible, bend, 0.0), (azimuth + 180) % 360
+
+# One cache per site, shared by every caller in the process
+_sites = {}
+
+def get_solar_position(lat, lon):
+    """Returns the shared CachedSolarPosition for a site."""
+    key = (round(lat, 6), round(lon, 6))
+    if key not in _sites:
+        _sites[key] = CachedSolarPosition(lat, lon)
+    return _sites[key]
+
+def solar_position(when, lat, lon, utc_offset):
+    """Returns (altitude, azimuth) in degrees at a local (naive) datetime with a UTC offset in hours."""
+    unix_time = (when - UNIX_EPOCH).total_seconds() - utc_offset * 3600
+    return get_solar_position(lat, lon).position(unix_time)
+
+def solar_angles_batch(times, lat, lon, utc_offset):
+    """
+    Returns (altitude, azimuth) arrays for local datetime64 timestamps and UTC offsets in hours
+    (scalar or per timestamp), for calculate_solar_angles_batch() in optimal_angles.py.
+    """
+    import numpy as np
+
+    unix_times = (np.asarray(times, dtype="datetime64[ms]").astype(np.int64) / 1000.0
+                  - np.asarray(utc_offset, dtype=float) * 3600)
+    return get_solar_position(lat, lon).positions(unix_times)
@@ -0,0 +1,173 @@
+import datetime
+import os
+import threading
+
+import numpy as np
+
+from optimal_angles import SOLAR_MODE, calculate_optimal_tilts, calculate_solar_angles_batch
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Seconds between table entries
+DEFAULT_RESOLUTION_S = 30
+# Directory where each day's table is saved so a restart can reload it
+TABLE_DIR = os.path.join(BASE_DIR, "sun_path_tables")
+# Tables for days older than this are removed when a new one is saved
+KEEP_DAYS = 2
+
+class SunPathTable:
+    """
+    Sun altitude and azimuth for one site and one local day, sampled every resolution_s seconds.
+
+    lookup() linearly interpolates between the two nearest entries, so a query is a couple of
+    list reads and multiplications instead of the full trig chain.
+    """
+
+    def __init__(self, date, lat, lon, resolution_s, altitude, azimuth, mode=SOLAR_MODE):
+        self.date = date
+        self.lat = lat
+        self.lon = lon
+        self.resolution_s = resolution_s
+        self.mode = mode  # sun position model the table was computed with (see optimal_angles.py)
+        self.altitude = np.asarray(altitude, dtype=float)
+        # Unwrapped so interpolation never crosses the 360 -> 0 jump
+        self.azimuth = np.asarray(azimuth, dtype=float)
+        # Plain lists are much faster than NumPy for single-element reads
+        self._altitude = self.altitude.tolist()
+        self._azimuth = self.azimuth.tolist()
+
+    @classmethod
+    def build(cls, date, lat, lon, resolution_s=DEFAULT_RESOLUTION_S, mode=SOLAR_MODE):
+        """Computes the table for a local date, from midnight to the following midnight."""
+        if 86400 % resolution_s:
+            raise ValueError("resolution_s must divide a day evenly")
+        start = np.datetime64(date, "ms")
+        times = start + np.arange(86400 // resolution_s + 1) * np.timedelta64(resolution_s * 1000, "ms")
+        angles = calculate_solar_angles_batch(times, lat, lon, mode=mode)
+        azimuth = np.unwrap(angles["azimuth"], period=360)
+        return cls(date, lat, lon, resolution_s, angles["altitude"], azimuth, mode)
+
+    def matches(self, date, lat, lon, resolution_s, mode=SOLAR_MODE):
+        """Returns True if this table was built for the given day, site, resolution and sun position model."""
+        return (self.date == date and round(self.lat, 4) == round(lat, 4)
+                and round(self.lon, 4) == round(lon, 4) and self.resolution_s == resolution_s and self.mode == mode)
+
+    def lookup(self, when):
+        """
+        Interpolates the sun position at a local datetime on this table's date.
+
+        Returns:
+            (altitude, azimuth, ns_tilt, ew_tilt) in degrees.
+        """
+        seconds = (when.hour * 3600 + when.minute * 60 + when.second + when.microsecond / 1e6)
+        position = seconds / self.resolution_s
+        i = int(position)
+        if i >= len(self._altitude) - 1:
+            i = len(self._altitude) - 2
+        fraction = position - i
+        altitude = self._altitude[i] + fraction * (self._altitude[i + 1] - self._altitude[i])
+        azimuth = (self._azimuth[i] + fraction * (self._azimuth[i + 1] - self._azimuth[i])) % 360
+        ns_tilt, ew_tilt = calculate_optimal_tilts(altitude, azimuth)
+        return altitude, azimuth, ns_tilt, ew_tilt
+
+    def save(self, path):
+        """Saves the table, writing to a temporary file first so a power cut cannot leave half a file."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, date=self.date.isoformat(), lat=self.lat, lon=self.lon, resolution_s=self.resolution_s,
+                     altitude=self.altitude, azimuth=self.azimuth, mode=self.mode)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a table written by save()."""
+        with np.load(path) as data:
+            date = datetime.date.fromisoformat(str(data["date"]))
+            # Tables saved before the mode switch were all computed with the formula
+            mode = str(data["mode"]) if "mode" in data.files else "formula"
+            return cls(date, float(data["lat"]), float(data["lon"]), int(data["resolution_s"]),
+                       data["altitude"], data["azimuth"], mode)
+
+class DailySunPath:
+    """
+    Keeps the current day's SunPathTable for a fixed site.
+
+    The table is built on first use each day (or loaded from TABLE_DIR if it was already built
+    before a restart) and replaced the first time it is queried after local midnight.
+    lookup_nowait() does the building or loading on a worker thread instead, for a UI.
+    """
+
+    def __init__(self, lat, lon, resolution_s=DEFAULT_RESOLUTION_S, table_dir=TABLE_DIR, mode=SOLAR_MODE):
+        self.lat = lat
+        self.lon = lon
+        self.resolution_s = resolution_s
+        self.table_dir = table_dir
+        self.mode = mode
+        self.table = None
+        self._worker = None
+
+    def table_path(self, date):
+        """Returns the file a day's table is saved to."""
+        suffix = "_spa" if self.mode == "spa" else ""
+        name = f"sun_path_{date.isoformat()}_{self.lat:.4f}_{self.lon:.4f}_{self.resolution_s}s{suffix}.npz"
+        return os.path.join(self.table_dir, name)
+
+    def table_for(self, date):
+        """Returns the table for a local date, loading or building it if needed."""
+        if self.table is not None and self.table.matches(date, self.lat, self.lon, self.resolution_s, self.mode):
+            return self.table
+        path = self.table_path(date)
+        table = None
+        if os.path.exists(path):
+            try:
+                table = SunPathTable.load(path)
+                if not table.matches(date, self.lat, self.lon, self.resolution_s, self.mode):
+                    table = None
+            except Exception as e:
+                print(f"Error loading sun path table {path}: {e}")
+                table = None
+        if table is None:
+            table = SunPathTable.build(date, self.lat, self.lon, self.resolution_s, self.mode)
+            try:
+                os.makedirs(self.table_dir, exist_ok=True)
+                table.save(path)
+                self.remove_old_tables(date)
+            except Exception as e:
+                print(f"Error saving sun path table {path}: {e}")
+        self.table = table
+        return table
+
+    def remove_old_tables(self, today):
+        """Deletes saved tables for days more than KEEP_DAYS before today."""
+        cutoff = (today - datetime.timedelta(days=KEEP_DAYS)).isoformat()
+        for name in os.listdir(self.table_dir):
+            if name.startswith("sun_path_") and name.endswith(".npz") and name[9:19] < cutoff:
+                os.remove(os.path.join(self.table_dir, name))
+
+    def lookup(self, when=None):
+        """Returns (altitude, azimuth, ns_tilt, ew_tilt) at a local datetime, defaulting to now."""
+        if when is None:
+            when = datetime.datetime.now()
+        return self.table_for(when.date()).lookup(when)
+
+    def lookup_nowait(self, when=None):
+        """
+        Like lookup(), but returns None instead of waiting if the day's table is not ready yet,
+        and starts loading or building it on a worker thread (at most one at a time).
+        """
+        if when is None:
+            when = datetime.datetime.now()
+        table = self.table
+        if table is not None and table.matches(when.date(), self.lat, self.lon, self.resolution_s, self.mode):
+            return table.lookup(when)
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._prepare, args=(when.date(),), daemon=True)
+            self._worker.start()
+        return None
+
+    def _prepare(self, date):
+        try:
+            self.table_for(date)
+        except Exception as e:
+            print(f"Error preparing the sun path table for {date}: {e}")
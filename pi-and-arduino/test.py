@@ -1,42 +1,39 @@
-import smbus
 import struct
-import time
-import os
-
-# I2C bus
-bus = smbus.SMBus(1)  # 1 for /dev/i2c-1
+from hardware import get_i2c_bus
+from actuator_state import ActuatorStateStore
+from actuator_protocol import ActuatorError, ActuatorRejected, get_client
+import hardware
 
 # Arduino I2C address
 arduino_address = 0x08
-# File to store actuator extensions
-EXTENSION_FILE = "actuator_extensions.txt"
+
+# Actuator extensions are kept in a crash-safe state file with a move journal, see actuator_state.py
+_state = None
+
+def get_state():
+    """Returns the shared actuator state store, opening it on first use."""
+    global _state
+    if _state is None:
+        _state = ActuatorStateStore()
+        check_recovered_move(_state, get_client())
+    return _state
+
+def check_recovered_move(state, client):
+    """Checks a move replayed from the journal against the Arduino's positions, if there was one."""
+    if state.recovered is None:
+        return
+    try:
+        state.check_recovered(client.status().positions)
+    except ActuatorError as e:
+        print(f"Error checking the recovered move: {e}")
 
 def read_extensions():
-    """Reads the current actuator extensions from the file."""
-    extensions = {1: 0.0, 2: 0.0}  # Default values
-    if os.path.exists(EXTENSION_FILE):
-        try:
-            with open(EXTENSION_FILE, "r") as f:
-                lines = f.readlines()
-                if len(lines) >= 2:
-                    try:
-                        extensions[1] = float(lines[0].strip())
-                        extensions[2] = float(lines[1].strip())
-                    except ValueError:
-                         print("Error: Invalid data in extension file.  Resetting to 0.")
-                         extensions = {1: 0.0, 2: 0.0}
-        except Exception as e:
-            print(f"Error reading extension file: {e}")
-    return extensions
+    """Reads the current actuator extensions."""
+    return dict(get_state().extensions)
 
 def write_extensions(extensions):
-    """Writes the current actuator extensions to the file."""
-    try:
-        with open(EXTENSION_FILE, "w") as f:
-            f.write(str(extensions[1]) + "\n")
-            f.write(str(extensions[2]) + "\n")
-    except Exception as e:
-        print(f"Error writing to extension file: {e}")
+    """Stores the current actuator extensions."""
+    get_state().save(extensions)
 
 def send_actuator_data(actuator_num, mm_value):
     """
@@ -49,12 +46,32 @@ def send_actuator_data(actuator_num, mm_value):
     try:
         # Pack the data (Big Endian)
         data = struct.pack('>if', actuator_num, mm_value)  # '>if' for int, float
-        bus.write_i2c_block_data(arduino_address, 0, list(data))
+        get_i2c_bus().write_i2c_block_data(arduino_address, 0, list(data))
         print(f"Sent: Actuator = {actuator_num}, MM = {mm_value}")
     except Exception as e:
         print(f"Error sending data: {e}")
 
+def move_actuators(moves):
+    """
+    Moves actuators ({actuator_num: mm}, relative) with one protocol v2 command and waits until they stop.
 
+    The move is journaled before it is sent and the new extensions are stored once the Arduino
+    reports it finished. Returns the new extensions.
+    """
+    state = get_state()
+    extensions = state.begin_moves(moves, get_client().idle_positions())
+    try:
+        status = get_client().move(moves)
+    except ActuatorRejected as e:
+        print(f"Error moving actuators: {e}")
+        state.save(state.extensions)  # nothing moved (rejected, or the frame never went out)
+        return dict(state.extensions)
+    except ActuatorError as e:
+        print(f"Error moving actuators: {e}")  # sent but not confirmed finished
+    else:
+        print(f"Moved {moves}. Arduino position: {status.positions}")
+    state.save(extensions)
+    return extensions
 
 if __name__ == "__main__":
     try:
@@ -64,30 +81,27 @@ if __name__ == "__main__":
 
         # Example usage:
         move1_mm = 15.5
-        send_actuator_data(1, move1_mm)
-        time.sleep(1)
-        current_extensions[1] += move1_mm
-        write_extensions(current_extensions)
+        current_extensions = move_actuators({1: move1_mm})
         print(f"New extensions: Actuator 1 = {current_extensions[1]} mm, Actuator 2 = {current_extensions[2]} mm")
 
         move2_mm = -10.2
-        send_actuator_data(2, move2_mm)
-        time.sleep(1)
-        current_extensions[2] += move2_mm
-        write_extensions(current_extensions)
+        current_extensions = move_actuators({2: move2_mm})
         print(f"New extensions: Actuator 1 = {current_extensions[1]} mm, Actuator 2 = {current_extensions[2]} mm")
 
         move3_mm = 0.0
-        send_actuator_data(1, move3_mm)
-        time.sleep(1)
-        current_extensions[1] += move3_mm
-        write_extensions(current_extensions)
+        current_extensions = move_actuators({1: move3_mm})
         print(f"New extensions: Actuator 1 = {current_extensions[1]} mm, Actuator 2 = {current_extensions[2]} mm")
         
+        # Both actuators in one command
+        current_extensions = move_actuators({1: -move1_mm, 2: -move2_mm})
+        print(f"New extensions: Actuator 1 = {current_extensions[1]} mm, Actuator 2 = {current_extensions[2]} mm")
+
         final_extensions = read_extensions()
-        print(f"Final extensions from file: Actuator 1 = {final_extensions[1]} mm, Actuator 2 = {final_extensions[2]} mm")
+        print(f"Final extensions from the state file: Actuator 1 = {final_extensions[1]} mm, Actuator 2 = {final_extensions[2]} mm")
 
     except KeyboardInterrupt:
         print("Script stopped by user")
     finally:
-        bus.close()
\ No newline at end of file
+        if _state is not None:
+            _state.close()
+        hardware.close()
\ No newline at end of file
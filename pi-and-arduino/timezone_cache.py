@@ -0,0 +1,113 @@
+import datetime
+
+# TimezoneFinder loads its polygon data when it is created, so build it once per process
+_timezone_finder = None
+# Timezone per (lat, lon), rounded so GPS/IP jitter does not defeat the cache
+_timezone_cache = {}
+# Number of days of DST transitions kept per site
+MAX_CACHED_DAYS = 32
+
+def get_timezone_finder():
+    """Returns the shared TimezoneFinder, creating it on first use."""
+    global _timezone_finder
+    if _timezone_finder is None:
+        from timezonefinder import TimezoneFinder
+        _timezone_finder = TimezoneFinder()
+    return _timezone_finder
+
+def get_timezone(lat, lon):
+    """Returns the pytz timezone for a location, or None if it is not in any time zone."""
+    import pytz
+
+    key = (round(lat, 4), round(lon, 4))
+    if key not in _timezone_cache:
+        timezone_name = get_timezone_finder().timezone_at(lat=lat, lng=lon)
+        _timezone_cache[key] = pytz.timezone(timezone_name) if timezone_name else None
+    return _timezone_cache[key]
+
+class SiteTimezone:
+    """
+    Timezone context for one site.
+
+    The timezone is resolved once and the UTC offsets for each local day (including the
+    time of any DST change that day) are cached, so a lookup is a dict hit plus at most
+    two comparisons. Works for any date, not just today.
+    """
+
+    def __init__(self, lat, lon):
+        self.lat = lat
+        self.lon = lon
+        self.timezone = get_timezone(lat, lon)
+        if self.timezone is None:
+            raise ValueError(f"Time zone not found for {lat}, {lon}")
+        self._days = {}
+
+    def _offset_at(self, local_dt):
+        # is_dst=False picks standard time for the repeated hour and shifts the skipped hour
+        return self.timezone.localize(local_dt, is_dst=False).utcoffset().total_seconds() / 3600
+
+    def day_offsets(self, date):
+        """
+        Returns [(local start time, UTC offset in hours), ...] for a local date.
+
+        There is one entry on most days and two on days with a DST change.
+        """
+        offsets = self._days.get(date)
+        if offsets is None:
+            midnight = datetime.datetime.combine(date, datetime.time())
+            start = self._offset_at(midnight)
+            end = self._offset_at(midnight + datetime.timedelta(hours=23, minutes=59))
+            offsets = [(datetime.time(), start)]
+            if start != end:
+                # Binary search for the first minute of the day on the new offset
+                low, high = 0, 23 * 60 + 59
+                while low < high:
+                    mid = (low + high) // 2
+                    if self._offset_at(midnight + datetime.timedelta(minutes=mid)) == end:
+                        high = mid
+                    else:
+                        low = mid + 1
+                offsets.append((datetime.time(low // 60, low % 60), end))
+            if len(self._days) >= MAX_CACHED_DAYS:
+                self._days.clear()
+            self._days[date] = offsets
+        return offsets
+
+    def utc_offset(self, when=None):
+        """Returns the UTC offset in hours at a local (naive) or aware datetime, defaulting to now."""
+        if when is None:
+            when = datetime.datetime.now()
+        if when.tzinfo is not None:
+            when = when.astimezone(self.timezone).replace(tzinfo=None)
+        offset = None
+        for start, day_offset in self.day_offsets(when.date()):
+            if when.time() >= start:
+                offset = day_offset
+        return offset
+
+    def utc_offsets(self, timestamps):
+        """Returns an array of UTC offsets (hours) for an array of local datetime64 timestamps."""
+        import numpy as np
+
+        times = np.asarray(timestamps, dtype="datetime64[ms]")
+        # Every offset change (midnight of each day, plus any DST change) in time order, then
+        # one binary search per timestamp for the last change at or before it
+        starts, values = [], []
+        for day in np.unique(times.astype("datetime64[D]")):
+            for start, day_offset in self.day_offsets(day.astype(datetime.date)):
+                starts.append(day + np.timedelta64(start.hour * 60 + start.minute, "m"))
+                values.append(day_offset)
+        if not starts:
+            return np.empty(times.shape, dtype=float)
+        index = np.searchsorted(np.array(starts, dtype="datetime64[ms]"), times, side="right") - 1
+        return np.array(values, dtype=float)[index]
+
+# One context per site, shared by get_utc_offset() callers
+_sites = {}
+
+def get_site_timezone(lat, lon):
+    """Returns the cached SiteTimezone for a location."""
+    key = (round(lat, 4), round(lon, 4))
+    if key not in _sites:
+        _sites[key] = SiteTimezone(lat, lon)
+    return _sites[key]
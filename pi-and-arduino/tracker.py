@@ -0,0 +1,244 @@
+import argparse
+import datetime
+import json
+import math
+import os
+import time
+
+from test import get_state
+from actuator_protocol import ACTUATOR_SPEED_MM_S, ActuatorError, ActuatorRejected, get_client
+from site_location import SiteLocationStore, REFRESH_TIMEOUT_S
+from sun_path_table import DailySunPath
+from kinematics import ACTUATOR_AXES, extension_to_tilt, tilt_to_extension
+import hardware
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRACKER_METRICS_FILE = os.path.join(BASE_DIR, f"tracker_metrics{hardware.RUNTIME_SUFFIX}.json")
+
+TRACK_INTERVAL_S = 60  # How often the target is recomputed
+DEADBAND_DEG = 2.0  # Pointing error tolerated before the panel is moved
+MAX_LEAD_S = 3600  # Furthest ahead a move may aim
+LEAD_STEP_S = 60  # Resolution of the look-ahead search
+MIN_MOVE_DEG = 0.1  # Axis corrections smaller than this are not sent
+MIN_ALTITUDE_DEG = 0.0  # Below this the panel is stowed flat
+PREPOSITION_S = 900  # Move to the sunrise position this long before sunrise
+STOW_TILTS = (0.0, 0.0)  # (ns, ew) tilt while the sun is down
+METRICS_HISTORY_DAYS = 60
+
+def pointing_error(a, b):
+    """Angle in degrees between two (ns, ew) tilt pairs, treating the axes as independent."""
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+def target_tilts(sun_path, when):
+    """Returns the (ns, ew) tilt a panel should have at a local datetime."""
+    altitude, _, ns_tilt, ew_tilt = sun_path.lookup(when)
+    if altitude >= MIN_ALTITUDE_DEG:
+        return ns_tilt, ew_tilt
+    # Wait at the sunrise position if the sun is about to come up, otherwise stow
+    altitude, _, ns_tilt, ew_tilt = sun_path.lookup(when + datetime.timedelta(seconds=PREPOSITION_S))
+    if altitude >= MIN_ALTITUDE_DEG:
+        return ns_tilt, ew_tilt
+    return STOW_TILTS
+
+def aim_tilts(sun_path, when, deadband_deg=DEADBAND_DEG, max_lead_s=MAX_LEAD_S):
+    """Returns the target furthest ahead (up to max_lead_s) that stays within the deadband of the current target."""
+    target = target_tilts(sun_path, when)
+    aim = target
+    for lead in range(LEAD_STEP_S, max_lead_s + 1, LEAD_STEP_S):
+        future = target_tilts(sun_path, when + datetime.timedelta(seconds=lead))
+        if pointing_error(future, target) > deadband_deg:
+            break
+        aim = future
+    return aim
+
+class TrackerMetrics:
+    """
+    Daily counters for the tracker: moves (commands sent), actuator-seconds and pointing error.
+
+    Pointing error is sampled on every tracking tick while the sun is up. A finished day is appended to the
+    history in TRACKER_METRICS_FILE, which also holds the day in progress.
+    """
+
+    def __init__(self, metrics_file=TRACKER_METRICS_FILE):
+        self.metrics_file = metrics_file
+        self.history = []
+        if os.path.exists(metrics_file):
+            try:
+                with open(metrics_file, "r") as f:
+                    self.history = json.load(f).get("history", [])
+            except Exception as e:
+                print(f"Error reading tracker metrics {metrics_file}: {e}")
+        self._reset(None)
+
+    def _reset(self, day):
+        self.day = day
+        self.moves = 0
+        self.actuator_seconds = 0.0
+        self.error_samples = 0
+        self.error_sum = 0.0
+        self.error_sum_sq = 0.0
+        self.max_error = 0.0
+
+    def _roll_over(self, when):
+        day = when.date().isoformat()
+        if day != self.day:
+            if self.day is not None:
+                self.history = (self.history + [self.summary()])[-METRICS_HISTORY_DAYS:]
+                print(self.format_summary())
+            self._reset(day)
+
+    def record_error(self, when, error_deg):
+        self._roll_over(when)
+        self.error_samples += 1
+        self.error_sum += error_deg
+        self.error_sum_sq += error_deg * error_deg
+        self.max_error = max(self.max_error, error_deg)
+
+    def record_move(self, when, seconds):
+        self._roll_over(when)
+        self.moves += 1
+        self.actuator_seconds += seconds
+
+    def summary(self):
+        """Returns the day in progress as a dict."""
+        n = self.error_samples
+        return {"day": self.day, "moves": self.moves, "actuator_seconds": round(self.actuator_seconds, 2),
+                "mean_error_deg": round(self.error_sum / n, 3) if n else None,
+                "rms_error_deg": round(math.sqrt(self.error_sum_sq / n), 3) if n else None,
+                "max_error_deg": round(self.max_error, 3) if n else None}
+
+    def format_summary(self):
+        s = self.summary()
+        if s["mean_error_deg"] is None:
+            return f"{s['day']}: {s['moves']} moves, {s['actuator_seconds']:.1f} actuator-seconds"
+        return (f"{s['day']}: {s['moves']} moves, {s['actuator_seconds']:.1f} actuator-seconds, pointing error "
+                f"mean {s['mean_error_deg']:.2f}°, RMS {s['rms_error_deg']:.2f}°, max {s['max_error_deg']:.2f}°")
+
+    def save(self):
+        """Writes the history and the day in progress (write-then-rename)."""
+        tmp_path = self.metrics_file + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"history": self.history, "today": self.summary()}, f)
+            os.replace(tmp_path, self.metrics_file)
+        except Exception as e:
+            print(f"Error writing tracker metrics {self.metrics_file}: {e}")
+
+class Tracker:
+    """
+    Points the panel at the sun with as few actuator moves as possible.
+
+    Every tick the target tilts are looked up on the day's sun path and compared with the
+    tilts implied by the stored actuator extensions. Nothing is sent while the error is
+    within the deadband. When it is exceeded, the panel is moved to where the target will be
+    furthest ahead while still inside the deadband of the current target, so the panel first
+    leads the sun and then lags it by up to the deadband. That coalesces what would be many
+    small corrections into one larger move. Both axes are corrected by the same command.
+    """
+
+    def __init__(self, sun_path, send=None, state=None,
+                 metrics=None, deadband_deg=DEADBAND_DEG, max_lead_s=MAX_LEAD_S, sleep=time.sleep, positions=None):
+        """
+        Args:
+            sun_path: A DailySunPath (anything with lookup(datetime) -> (altitude, azimuth, ns, ew)).
+            send: Called as send({actuator_num: relative_mm}) for each move and returns once it has
+                  finished (default: ActuatorClient.move over protocol v2).
+            state: ActuatorStateStore holding the extensions (default: the shared store from test.py).
+            positions: Returns the Arduino's positions before a move, or None, for the move journal
+                       (default: the last idle status read by the ActuatorClient, if send is the default).
+        """
+        self.sun_path = sun_path
+        self.send = send if send is not None else get_client().move
+        if positions is None:
+            positions = get_client().idle_positions if send is None else lambda: None
+        self.positions = positions
+        self.state = state if state is not None else get_state()
+        self.metrics = metrics if metrics is not None else TrackerMetrics()
+        self.deadband_deg = deadband_deg
+        self.max_lead_s = max_lead_s
+        self.sleep = sleep
+
+    def target(self, when):
+        """Returns the (ns, ew) tilt the panel should have at a local datetime."""
+        return target_tilts(self.sun_path, when)
+
+    def current(self):
+        """Returns the (ns, ew) tilt implied by the stored extensions."""
+        return tuple(extension_to_tilt(axis, self.state.extensions[num]) for num, axis in ACTUATOR_AXES.items())
+
+    def aim(self, when):
+        """Returns the target furthest ahead (up to max_lead_s) that stays within the deadband of the current target."""
+        return aim_tilts(self.sun_path, when, self.deadband_deg, self.max_lead_s)
+
+    def step(self, when=None):
+        """
+        Runs one tracking tick at a local datetime (default now).
+
+        Returns:
+            List of (actuator_num, relative_mm) moves that were sent (as one command).
+        """
+        if when is None:
+            when = datetime.datetime.now()
+        error = pointing_error(self.target(when), self.current())
+        # Pointing error only matters while the sun is up (not while stowing or prepositioning)
+        if self.sun_path.lookup(when)[0] >= MIN_ALTITUDE_DEG:
+            self.metrics.record_error(when, error)
+        if error <= self.deadband_deg:
+            return []
+        aim = self.aim(when)
+        moves = {}
+        for (num, axis), tilt in zip(ACTUATOR_AXES.items(), aim):
+            if abs(tilt - extension_to_tilt(axis, self.state.extensions[num])) >= MIN_MOVE_DEG:
+                moves[num] = tilt_to_extension(axis, tilt) - self.state.extensions[num]
+        if not moves:
+            return []
+        extensions = self.state.begin_moves(moves, self.positions())
+        try:
+            self.send(moves)
+        except ActuatorRejected as e:
+            print(f"Error moving actuators: {e}")
+            # Nothing moved (rejected, or the frame never went out), so supersede the journaled
+            # move with the unchanged extensions
+            self.state.save(self.state.extensions)
+            return []
+        except ActuatorError as e:
+            # Sent but not confirmed finished (also a bus error after the frame went out): assume it ran
+            print(f"Error moving actuators: {e}")
+        self.state.save(extensions)
+        self.metrics.record_move(when, sum(abs(mm) for mm in moves.values()) / ACTUATOR_SPEED_MM_S)
+        return list(moves.items())
+
+    def run(self, interval_s=TRACK_INTERVAL_S):
+        """Tracks until interrupted, one step every interval_s seconds."""
+        next_tick = time.monotonic()
+        while True:
+            moves = self.step()
+            if moves:
+                print(f"Moved {', '.join(f'actuator {num} {mm:+.2f} mm' for num, mm in moves)}. "
+                      f"{self.metrics.format_summary()}")
+                self.metrics.save()
+            next_tick += interval_s
+            self.sleep(max(0.0, next_tick - time.monotonic()))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sun tracking daemon")
+    parser.add_argument("--interval", type=float, default=TRACK_INTERVAL_S, help="seconds between target updates")
+    parser.add_argument("--deadband", type=float, default=DEADBAND_DEG, help="pointing error (degrees) tolerated before moving")
+    parser.add_argument("--max-lead", type=int, default=MAX_LEAD_S, help="furthest ahead (seconds) a move may aim")
+    args = parser.parse_args()
+
+    lat, lon = SiteLocationStore().get(wait=REFRESH_TIMEOUT_S)
+    if lat is None or lon is None:
+        print("Error: Site location unknown. Set CAPSTONE_LATITUDE/CAPSTONE_LONGITUDE or site_config.json.")
+        exit(1)
+    tracker = Tracker(DailySunPath(lat, lon), deadband_deg=args.deadband, max_lead_s=args.max_lead)
+    print(f"Tracking at {lat:.4f}, {lon:.4f} with a {args.deadband}° deadband")
+    try:
+        tracker.run(args.interval)
+    except KeyboardInterrupt:
+        print("Script stopped by user")
+        print(tracker.metrics.format_summary())
+    finally:
+        tracker.metrics.save()
+        tracker.state.close()
+        hardware.close()